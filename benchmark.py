@@ -0,0 +1,192 @@
+"""
+End-to-end benchmark against the local fake upstream (fake_upstream.py).
+
+Starts the fake Bilibili/Douyin server in a background thread, points the
+platform base URLs at it, then drives the real web app (in-process, through
+its ASGI interface) with concurrent requests and reports p50/p95/p99
+latency plus upstream calls per request:
+
+    python benchmark.py                          # all scenarios, cold caches
+    python benchmark.py -n 200 -c 16 --latency-ms 80 --jitter-ms 40 --error-rate 0.05
+    python benchmark.py --scenarios analyze --warm --json bench.json
+
+Caches, the creator store and the WBI key file live in a temp dir, so every
+run starts from the same state (--warm keeps caches on between requests of
+a run). The rate limiter is lifted for the fake host unless
+--keep-rate-limits is given.
+
+The Douyin keyword search runs in Playwright, so only the Bilibili /analyze
+path is benchmarked; /creator/{mid} is covered for both platforms.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+SCENARIOS = ("analyze", "creator_bilibili", "creator_douyin")
+
+
+def _configure_env(args, base_url: str, work_dir: Path):
+    # Must happen before web_app (and the platform modules) are imported
+    os.environ.update({
+        "BILIBILI_API_BASE": base_url,
+        "DOUYIN_API_BASE": base_url,
+        "DOUYIN_COOKIE": "s_v_web_id=verify_bench; tt_webid=1;",
+        "COLLECTOR_ENABLED": "0",
+        "RESPONSE_CACHE_DB": str(work_dir / "responses.sqlite3"),
+        "CREATOR_STORE_DB": str(work_dir / "creators.sqlite3"),
+        "JOB_DB": str(work_dir / "jobs.sqlite3"),
+        "WBI_KEY_CACHE_FILE": str(work_dir / "wbi_keys.json"),
+        "IMG_CACHE_DIR": str(work_dir / "images"),
+    })
+    if not args.warm:
+        os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+        os.environ["CREATOR_STORE_FRESH_SECONDS"] = "0"
+        os.environ["SINGLEFLIGHT_ENABLED"] = "0"
+    if not args.keep_rate_limits:
+        host = base_url.split("://", 1)[1]
+        os.environ["RATE_LIMITS"] = f"{host}=100000:100000"
+
+
+def _start_fake(args):
+    import uvicorn
+    from fake_upstream import FakeConfig, create_app
+
+    config = FakeConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                        creators=args.creators)
+    app = create_app(config)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            sys.exit(f"Fake upstream did not start on port {args.port}")
+        time.sleep(0.05)
+    return app, server
+
+
+def _percentile(values, pct):
+    # Nearest-rank
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _request_for(scenario: str, i: int, creators: int):
+    from fake_upstream import bili_mid, dy_sec_uid
+
+    if scenario == "analyze":
+        # A handful of distinct tracks, so repeated ones can hit warm caches
+        return "POST", "/analyze", {"data": {"track": f"benchmark track {i % 5}", "platform_input": "bilibili"}}
+    if scenario == "creator_bilibili":
+        return "GET", f"/creator/{bili_mid(i % creators)}", {}
+    return "GET", f"/creator/{dy_sec_uid(i % creators)}", {"params": {"platform": "douyin"}}
+
+
+async def _run_scenario(client, fake_app, scenario: str, args) -> dict:
+    fake_app.state.calls.clear()
+    latencies, statuses = [], Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i):
+        method, path, kwargs = _request_for(scenario, i, args.creators)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    wall = time.perf_counter() - started
+
+    calls = Counter({k: v for k, v in fake_app.state.calls.items() if not k.endswith("[error]")})
+    errors = sum(v for k, v in fake_app.state.calls.items() if k.endswith("[error]"))
+    return {
+        "scenario": scenario,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(args.requests / wall, 2) if wall else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+        "statuses": dict(statuses),
+        "upstream_calls": sum(calls.values()),
+        "upstream_calls_per_request": round(sum(calls.values()) / args.requests, 2),
+        "upstream_errors_injected": errors,
+        "upstream_by_endpoint": dict(calls.most_common()),
+    }
+
+
+def _print_report(results):
+    print()
+    print(f"{'scenario':<18}{'req':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>9}{'up/req':>9}")
+    for r in results:
+        print(f"{r['scenario']:<18}{r['requests']:>6}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['throughput_rps']:>9}{r['upstream_calls_per_request']:>9}")
+    for r in results:
+        print(f"\n[{r['scenario']}] statuses={r['statuses']} injected_errors={r['upstream_errors_injected']}")
+        for endpoint, count in r["upstream_by_endpoint"].items():
+            print(f"    {count:>6}  {endpoint}")
+
+
+async def _main(args, fake_app):
+    import httpx
+    import web_app
+
+    transport = httpx.ASGITransport(app=web_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        results = []
+        for scenario in args.scenarios:
+            print(f"[Bench] {scenario}: {args.requests} requests, concurrency {args.concurrency}")
+            results.append(await _run_scenario(client, fake_app, scenario, args))
+    await web_app.aclose_all()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /analyze and /creator against fake_upstream.py")
+    parser.add_argument("-n", "--requests", type=int, default=50, help="requests per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma list of {', '.join(SCENARIOS)}")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--creators", type=int, default=40)
+    parser.add_argument("--warm", action="store_true", help="keep response cache / store freshness on")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="don't lift the limiter for the fake host")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as work_dir:
+        _configure_env(args, f"http://127.0.0.1:{args.port}", Path(work_dir))
+        fake_app, server = _start_fake(args)
+        try:
+            results = asyncio.run(_main(args, fake_app))
+        finally:
+            server.should_exit = True
+
+    _print_report(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n[Bench] Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
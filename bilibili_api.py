@@ -4,6 +4,9 @@ import json
 import os
 from datetime import datetime
 from dotenv import load_dotenv
+from platforms.hedge import get_hedged_chain
+from platforms.http_client import HTTP_REJECT_STATUSES
+from platforms.ratelimit import get_rate_limiter
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +19,9 @@ if not SESSDATA:
 
 COOKIE_STR = f"buvid3=infoc; SESSDATA={SESSDATA};"
 
+# Point at a local stand-in (fake_upstream.py) for offline benchmarks
+API_BASE = os.getenv("BILIBILI_API_BASE", "https://api.bilibili.com").rstrip("/")
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
     "Referer": "https://www.bilibili.com/",
@@ -25,8 +31,26 @@ HEADERS = {
     "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
 }
 
+# Bilibili risk-control answers (come back as HTTP 200)
+RISK_CONTROL_CODES = {-352, -412}
+
 import re
 
+def _get(url, **kwargs):
+    """requests.get, paced by the shared per-host rate limiter."""
+    limiter = get_rate_limiter()
+    limiter.acquire(url)
+    response = requests.get(url, **kwargs)
+    rejected = response.status_code in HTTP_REJECT_STATUSES
+    if not rejected:
+        try:
+            data = response.json()
+            rejected = isinstance(data, dict) and data.get('code') in RISK_CONTROL_CODES
+        except ValueError:
+            pass
+    limiter.feedback(url, rejected)
+    return response
+
 def clean_text(text):
     """Remove HTML tags like <em class="keyword">."""
     if not text:
@@ -35,7 +59,7 @@ def clean_text(text):
 
 def search_raw_videos(keyword, limit=50):
     """Search Bilibili for videos to aggregate creators."""
-    url = "https://api.bilibili.com/x/web-interface/search/type"
+    url = f"{API_BASE}/x/web-interface/search/type"
     params = {
         "keyword": keyword,
         "search_type": "video",
@@ -45,7 +69,7 @@ def search_raw_videos(keyword, limit=50):
     }
     
     try:
-        response = requests.get(url, headers=HEADERS, params=params)
+        response = _get(url, headers=HEADERS, params=params)
         if response.status_code != 200:
             print(f"API Request Failed: {response.status_code}")
             return []
@@ -67,11 +91,11 @@ def get_creator_info(mid):
 
 def get_user_stats(mid):
     """Get user stats (fans) using the more robust relation API."""
-    url = "https://api.bilibili.com/x/relation/stat"
+    url = f"{API_BASE}/x/relation/stat"
     params = {"vmid": mid}
     try:
         # This API is much more lenient and often works without cookies
-        response = requests.get(url, headers=HEADERS, params=params)
+        response = _get(url, headers=HEADERS, params=params)
         data = response.json()
         if data['code'] == 0:
             return data['data'] # Contains 'follower'
@@ -82,10 +106,10 @@ def get_user_stats(mid):
 def get_user_card(mid):
     """Get basic user info (fans, intro)."""
     # ... legacy function, heavily rate limited ...
-    url = "https://api.bilibili.com/x/web-interface/card"
+    url = f"{API_BASE}/x/web-interface/card"
     params = {"mid": mid}
     try:
-        response = requests.get(url, headers=HEADERS, params=params)
+        response = _get(url, headers=HEADERS, params=params)
         data = response.json()
         if data['code'] == 0:
             card = data['data']['card']
@@ -104,10 +128,14 @@ def get_user_card(mid):
 
 def get_user_info_via_search(mid):
     """
-    Fallback: Get user info by searching for their MID.
+    Fallback: Get user info by searching for their MID (user search, then video search).
     This often bypasses the -352 Risk Check on direct profile lookup.
     """
-    url = "https://api.bilibili.com/x/web-interface/search/type"
+    return get_user_info_via_user_search(mid) or get_user_info_via_video_search(mid)
+
+def get_user_info_via_user_search(mid):
+    """Search bili_user for the MID itself."""
+    url = f"{API_BASE}/x/web-interface/search/type"
     params = {
         "keyword": str(mid),
         "search_type": "bili_user",
@@ -115,7 +143,7 @@ def get_user_info_via_search(mid):
         "page_size": 1
     }
     try:
-        res = requests.get(url, headers=HEADERS, params=params)
+        res = _get(url, headers=HEADERS, params=params)
         data = res.json()
         print(f"DEBUG SEARCH: Code={data.get('code')}, Data={str(data.get('data'))[:100]}")
         if data['code'] == 0:
@@ -141,9 +169,14 @@ def get_user_info_via_search(mid):
             print(f"DEBUG SEARCH: API Error {data['message']}")
     except Exception as e:
         print(f"Search User Info Fallback Failed: {e}")
+    return None
 
-    # Fallback 2: Search for Video (to extract author)
-    # This is useful if the user is hidden from 'bili_user' search but has videos.
+def get_user_info_via_video_search(mid):
+    """
+    Fallback 2: Search for Video (to extract author)
+    This is useful if the user is hidden from 'bili_user' search but has videos.
+    """
+    url = f"{API_BASE}/x/web-interface/search/type"
     try:
         print(f"Trying Video Search Fallback for {mid}...")
         video_params = {
@@ -151,7 +184,7 @@ def get_user_info_via_search(mid):
             "search_type": "video",
             "page": 1
         }
-        res = requests.get(url, headers=HEADERS, params=video_params)
+        res = _get(url, headers=HEADERS, params=video_params)
         data = res.json()
         print(f"DEBUG VIDEO SEARCH: Code={data.get('code')}")
         if data['code'] == 0:
@@ -170,7 +203,7 @@ def get_user_info_via_search(mid):
                     return {
                         "mid": mid,
                         "name": v['author'], # or v['uname']
-                        "fans": 0, # Video search doesn't give fans
+                        "fans": None, # Video search doesn't give fans
                         "sign": "Found via Video Search",
                         "avatar": "https:" + v['upic'] if v['upic'].startswith("//") else v['upic']
                     }
@@ -181,98 +214,86 @@ def get_user_info_via_search(mid):
 
     return None
 
-def get_user_info_robust(mid):
-    """
-    Robust User Info Fetcher:
-    1. Try standard `get_user_card`
-    2. Try `get_space_feed_videos` (extract author info)
-    3. Try `get_user_stats` (fans only) and return minimal info
-    """
-    # 1. Standard
-    card = get_user_card(mid)
-    if card: return card
-    
-    print(f"Card API failed for {mid}. Trying robust fallback...")
-    
-    # 2. Priority Fallback: Search (Most reliable when blocked)
-    print(f"Trying Search Fallback for user info {mid}...")
-    search_info = get_user_info_via_search(mid)
-    if search_info:
-        return search_info
-
-    # 3. Feed Fallback (Extract name/avatar from video items)
-    # We ask for limit=1 just to get the author module
-    feed_items = get_space_feed_videos(mid, limit=1)
-    
-    if feed_items:
-        # Note: get_space_feed_videos returns simplified list. 
-        # But we need the RAW response to get author info properly if we didn't save it.
-        # WAIT: get_space_feed_videos returns processed "processed" list.
-        # We need to hack it OR fetch again? 
-        # Actually, get_space_feed_videos helper in this file filters everything out.
-        # Let's write a targeted "get_feed_author" helper or just inline the request here for robustness.
-        pass
-
-    # Let's do a raw request here to be sure
-    url = "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/space"
-    params = {"host_mid": mid, "timezone_offset": -480}
-    
-    name = "Unknown"
-    avatar = "https://via.placeholder.com/80"
-    sign = "Profile Unavailable (Rate Limit)"
-    
-    # Try Acc Info Fallback first (often better than feed)
+def get_user_info_via_acc(mid):
+    """Acc Info Fallback (often better than feed). Acc info doesn't have fans, need stats."""
     try:
-        acc_url = "https://api.bilibili.com/x/space/wbi/acc/info"
-        acc_res = requests.get(acc_url, headers=HEADERS, params={"mid": mid})
+        acc_url = f"{API_BASE}/x/space/wbi/acc/info"
+        acc_res = _get(acc_url, headers=HEADERS, params={"mid": mid})
         acc_data = acc_res.json()
         if acc_data['code'] == 0:
             info = acc_data['data']
+            stats = get_user_stats(mid)
             return {
                 "mid": mid,
                 "name": info['name'],
-                "fans": get_user_stats(mid)['follower'] if get_user_stats(mid) else 0, # Acc info doesn't have fans, need stats
+                "fans": stats['follower'] if stats else 0,
                 "sign": info['sign'],
                 "avatar": info['face']
             }
     except Exception as e:
         print(f"Acc Info Fallback failed: {e}")
+    return None
 
-
-
+def get_user_info_via_feed(mid):
+    """Feed Fallback: extract name/avatar from the author module of dynamic items."""
+    url = f"{API_BASE}/x/polymer/web-dynamic/v1/feed/space"
+    params = {"host_mid": mid, "timezone_offset": -480}
     try:
-        res = requests.get(url, headers=HEADERS, params=params)
+        res = _get(url, headers=HEADERS, params=params)
         data = res.json()
         if data['code'] == 0 and 'items' in data['data']:
-            items = data['data']['items']
-            for item in items:
+            for item in data['data']['items']:
                 # Try to find author module
                 if 'modules' in item and 'module_author' in item['modules']:
                     author = item['modules']['module_author']
-                    name = author.get('name', name)
-                    avatar = author.get('face', avatar)
+                    stats = get_user_stats(mid)
                     # sign isn't usually in feed author module, but that's fine
-                    break
+                    return {
+                        "mid": mid,
+                        "name": author.get('name', "Unknown"),
+                        "fans": stats['follower'] if stats else 0,
+                        "sign": "Profile Unavailable (Rate Limit)",
+                        "avatar": author.get('face', "https://via.placeholder.com/80")
+                    }
     except Exception as e:
         print(f"Feed Author Fallback failed: {e}")
-        
-    # 3. Fans Fallback
-    stats = get_user_stats(mid)
-    fans = stats['follower'] if stats else 0
-    
+    return None
+
+def get_user_info_robust(mid):
+    """
+    Robust User Info Fetcher:
+    card -> bili_user search -> acc/info -> feed -> video search, hedged
+    (platforms/hedge.py): the next strategy starts after a short delay instead
+    of waiting for a risk-controlled call to fail, the first answer wins (video
+    search only if nothing better answers), and whichever strategy answered
+    recently is tried first next time.
+    Last resort: `get_user_stats` (fans only) with minimal info.
+    """
+    info = get_hedged_chain("bilibili_api.user_info", last_resort=["video_search"]).run([
+        ("card", lambda: get_user_card(mid)),
+        ("user_search", lambda: get_user_info_via_user_search(mid)),
+        ("video_search", lambda: get_user_info_via_video_search(mid)),
+        ("acc_info", lambda: get_user_info_via_acc(mid)),
+        ("feed", lambda: get_user_info_via_feed(mid)),
+    ])
+    if info:
+        return info
+
+    # Fans Fallback
     # If we still have "Unknown" name, we might be truly blocked or ID invalid.
     # But return what we have.
+    stats = get_user_stats(mid)
     return {
         "mid": mid,
-        "name": name,
-        "fans": fans,
-        "sign": sign,
-        "avatar": avatar
+        "name": "Unknown",
+        "fans": stats['follower'] if stats else 0,
+        "sign": "Profile Unavailable (Rate Limit)",
+        "avatar": "https://via.placeholder.com/80"
     }
 
 def get_space_feed_videos(mid, limit=10):
     """Fallback: Get user videos via 'feed/space' (Dynamic) endpoint."""
-    url = "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/space"
+    url = f"{API_BASE}/x/polymer/web-dynamic/v1/feed/space"
     params = {
         "host_mid": mid,
         "offset": "",
@@ -281,7 +302,7 @@ def get_space_feed_videos(mid, limit=10):
     
     try:
         print(f"Requesting Feed Fallback for {mid}...")
-        response = requests.get(url, headers=HEADERS, params=params)
+        response = _get(url, headers=HEADERS, params=params)
         data = response.json()
         
         if data['code'] == 0 and 'items' in data['data']:
@@ -337,7 +358,7 @@ def get_search_videos_fallback(mid, limit=10, known_name=None):
             return []
         
         print(f"Trying Search Fallback for {name} (mid={mid})...")
-        url = "https://api.bilibili.com/x/web-interface/search/type"
+        url = f"{API_BASE}/x/web-interface/search/type"
         params = {
             "keyword": name,
             "search_type": "video",
@@ -345,7 +366,7 @@ def get_search_videos_fallback(mid, limit=10, known_name=None):
             "page": 1,
             "page_size": 20
         }
-        res = requests.get(url, headers=HEADERS, params=params)
+        res = _get(url, headers=HEADERS, params=params)
         data = res.json()
         
         if data['code'] == 0:
@@ -371,7 +392,7 @@ def get_search_videos_fallback(mid, limit=10, known_name=None):
 
 def get_recent_videos(mid, limit=5, known_name=None):
     """Get recent videos using Search API -> Feed Fallback -> Name Search Fallback."""
-    url = "https://api.bilibili.com/x/space/arc/search"
+    url = f"{API_BASE}/x/space/arc/search"
     params = {
         "mid": mid,
         "ps": limit,
@@ -382,7 +403,7 @@ def get_recent_videos(mid, limit=5, known_name=None):
     }
     
     try:
-        response = requests.get(url, headers=HEADERS, params=params)
+        response = _get(url, headers=HEADERS, params=params)
         data = response.json()
         if data['code'] == 0:
             vlist = data['data']['list']['vlist']
@@ -415,17 +436,17 @@ def get_video_comments(bvid):
     """Fetch top comments for a video."""
     # First get AID
     try:
-        view_url = "https://api.bilibili.com/x/web-interface/view"
-        res = requests.get(view_url, params={"bvid": bvid}, headers=HEADERS)
+        view_url = f"{API_BASE}/x/web-interface/view"
+        res = _get(view_url, params={"bvid": bvid}, headers=HEADERS)
         data = res.json()
         if data['code'] != 0: return []
         aid = data['data']['aid']
         
         # Get Replies
         # type=1 (video), sort=1 (hot)
-        reply_url = "https://api.bilibili.com/x/v2/reply"
+        reply_url = f"{API_BASE}/x/v2/reply"
         params = {"type": 1, "oid": aid, "sort": 1, "ps": 20}
-        res = requests.get(reply_url, params=params, headers=HEADERS)
+        res = _get(reply_url, params=params, headers=HEADERS)
         data = res.json()
         
         comments = []
@@ -451,11 +472,11 @@ def get_video_subtitles(bvid):
     print(f"Using Robust Fetcher for {bvid}")
     
     # 1. Standard View API
-    url = "https://api.bilibili.com/x/web-interface/view"
+    url = f"{API_BASE}/x/web-interface/view"
     params = {"bvid": bvid}
     
     try:
-        response = requests.get(url, headers=HEADERS, params=params)
+        response = _get(url, headers=HEADERS, params=params)
         data = response.json()
         if data['code'] != 0: return f"Metadata Error: {data['message']}"
         
@@ -467,7 +488,7 @@ def get_video_subtitles(bvid):
         if subtitle_list:
              sub_url = subtitle_list[0].get('url')
              if sub_url.startswith('//'): sub_url = 'https:' + sub_url
-             res = requests.get(sub_url, headers=HEADERS)
+             res = _get(sub_url, headers=HEADERS)
              if res.status_code == 200:
                  sub_json = res.json()
                  body = sub_json.get('body', [])
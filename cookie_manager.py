@@ -1,29 +1,61 @@
+
+"""
+Douyin cookie bootstrap.
+
+Capturing cookies means launching Chromium and waiting for the search page
+to settle (up to ~20s), so it never blocks startup: DouyinCookieJar applies
+cookies persisted by an earlier run right away (if they haven't expired) and
+does any browser work in a background task. Captured cookies are written to
+DOUYIN_COOKIE_CACHE_FILE with their expiry times and refreshed
+DOUYIN_COOKIE_REFRESH_AHEAD seconds before the jar expires.
+
+The jar expires when ttwid does (or the earliest cookie with an expiry if
+ttwid is missing), but is never trusted for longer than DOUYIN_COOKIE_MAX_AGE.
+"""
 import asyncio
+import json
 import os
-from playwright.async_api import async_playwright
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
 
-async def fetch_douyin_cookies():
+from platforms.browser_pool import get_browser_pool
+
+DOUYIN_COOKIE_CACHE_FILE = Path(os.getenv("DOUYIN_COOKIE_CACHE_FILE", ".cache/douyin_cookies.json"))
+DOUYIN_COOKIE_MAX_AGE = int(os.getenv("DOUYIN_COOKIE_MAX_AGE", str(24 * 3600)))
+DOUYIN_COOKIE_REFRESH_AHEAD = int(os.getenv("DOUYIN_COOKIE_REFRESH_AHEAD", "1800"))
+# Pause after a failed capture (and the minimum gap between two captures)
+DOUYIN_COOKIE_RETRY = int(os.getenv("DOUYIN_COOKIE_RETRY", "300"))
+
+def _cookie_pool():
+    return get_browser_pool(
+        "douyin_cookies",
+        headless=True,
+        size=1,
+        context_options={
+            "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "viewport": {"width": 1280, "height": 800},
+        },
+    )
+
+def _cookie_header(cookies: List[Dict]) -> str:
+    return "".join(f"{c['name']}={c['value']}; " for c in cookies)
+
+async def capture_douyin_cookies() -> Optional[List[Dict]]:
     """
-    Launches a headless browser to visit Douyin and capture the initial cookies (ttwid).
+    Uses a pooled headless browser to visit Douyin and capture the initial cookies (ttwid).
+    Returns Playwright cookie dicts (name, value, domain, expires...), None on failure.
     """
-    print("[CookieManager] Launching Playwright to fetch Douyin cookies...")
+    print("[CookieManager] Fetching Douyin cookies via browser pool...")
     try:
-        async with async_playwright() as p:
-            # Check if chromium is installed, if not, might fail. 
-            # Assuming widely available or installed via previous step.
-            browser = await p.chromium.launch(headless=True)
-            
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                viewport={"width": 1280, "height": 800}
-            )
-            page = await context.new_page()
-            
+        async with _cookie_pool().page() as page:
+            context = page.context
+
             # Go to Douyin Search page directly to trigger ttwid
             # Using a harmless search to ensure search-related cookies are primed?
             # Or just home. Search page seems to trigger 'hit_shark' checks which sets cookies.
             target_url = "https://www.douyin.com/search/AI"
-            
+
             print(f"[CookieManager] Navigating to {target_url}...")
             try:
                 # Wait until network is idle or just commit
@@ -33,26 +65,154 @@ async def fetch_douyin_cookies():
 
             # Wait a bit for JS to execute and cookies to set
             await asyncio.sleep(2)
-            
+
             # Get cookies
             cookies = await context.cookies()
-            cookie_str = ""
-            ttwid_found = False
-            for c in cookies:
-                cookie_str += f"{c['name']}={c['value']}; "
-                if c['name'] == "ttwid":
-                    ttwid_found = True
-            
-            await browser.close()
-            
-            if ttwid_found:
+            if any(c['name'] == "ttwid" for c in cookies):
                 print("[CookieManager] Success: ttwid found.")
-                return cookie_str
             else:
                 print("[CookieManager] Warning: ttwid NOT found in captured cookies.")
                 # Return what we have anyway, might work for some things
-                return cookie_str
-                
+            return cookies
+
     except Exception as e:
         print(f"[CookieManager] Failed to fetch cookies: {e}")
         return None
+
+async def fetch_douyin_cookies():
+    """Captured cookies as a Cookie header string (no caching, see DouyinCookieJar)."""
+    cookies = await capture_douyin_cookies()
+    return _cookie_header(cookies) if cookies is not None else None
+
+
+class DouyinCookieJar:
+    def __init__(self, cache_file: Optional[Path] = DOUYIN_COOKIE_CACHE_FILE, max_age: int = DOUYIN_COOKIE_MAX_AGE,
+                 refresh_ahead: int = DOUYIN_COOKIE_REFRESH_AHEAD, retry: int = DOUYIN_COOKIE_RETRY):
+        self.cache_file = cache_file
+        self.max_age = max_age
+        self.refresh_ahead = min(refresh_ahead, max_age // 2)
+        self.retry = retry
+        self.cookies: List[Dict] = []
+        self.captured_at = 0.0
+        self.expires_at = 0.0
+        self._apply: Optional[Callable[[str], None]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"captures": 0, "failures": 0, "loaded_from_disk": False}
+        self._load()
+
+    # --- State ---
+
+    def _expiry(self, cookies: List[Dict], captured_at: float) -> float:
+        expiries = [c["expires"] for c in cookies if c.get("expires", -1) > 0]
+        ttwid = [c["expires"] for c in cookies if c["name"] == "ttwid" and c.get("expires", -1) > 0]
+        expires_at = captured_at + self.max_age
+        if ttwid:
+            expires_at = min(expires_at, ttwid[0])
+        elif expiries:
+            expires_at = min(expires_at, min(expiries))
+        return expires_at
+
+    def _set(self, cookies: List[Dict], captured_at: Optional[float] = None):
+        # Only what we need to rebuild the header, not Playwright's full dicts
+        self.cookies = [{"name": c["name"], "value": c["value"], "domain": c.get("domain", ""),
+                         "expires": c.get("expires", -1)} for c in cookies]
+        self.captured_at = captured_at or time.time()
+        self.expires_at = self._expiry(self.cookies, self.captured_at)
+
+    def is_valid(self) -> bool:
+        return bool(self.cookies) and time.time() < self.expires_at
+
+    def header(self) -> str:
+        # Drops individual cookies that ran out before the jar did
+        now = time.time()
+        return _cookie_header([c for c in self.cookies if c["expires"] <= 0 or c["expires"] > now])
+
+    # --- Disk Persistence ---
+
+    def _load(self):
+        if not self.cache_file or not self.cache_file.exists():
+            return
+        try:
+            data = json.loads(self.cache_file.read_text())
+            self._set(data["cookies"], data["captured_at"])
+            if self.is_valid():
+                self.stats["loaded_from_disk"] = True
+                print(f"[CookieManager] Loaded cached cookies from '{self.cache_file}' "
+                      f"(expire in {(self.expires_at - time.time()) / 3600:.1f}h)")
+            else:
+                self.cookies = []
+        except Exception as e:
+            print(f"[CookieManager] Ignoring unreadable cookie cache: {e}")
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps({
+                "captured_at": self.captured_at,
+                "expires_at": self.expires_at,
+                "cookies": self.cookies,
+            }))
+            tmp.replace(self.cache_file)
+        except Exception as e:
+            print(f"[CookieManager] Failed to persist cookies: {e}")
+
+    # --- Lifecycle ---
+
+    def start(self, apply: Callable[[str], None]):
+        """Applies cached cookies now (if still valid) and keeps them fresh in the background.
+        `apply` gets the Cookie header string every time the jar changes."""
+        if self._task is not None:
+            return
+        self._apply = apply
+        if self.is_valid():
+            apply(self.header())
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        wait = self.expires_at - self.refresh_ahead - time.time() if self.is_valid() else 0
+        while True:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            cookies = await capture_douyin_cookies()
+            if cookies:
+                self.stats["captures"] += 1
+                self._set(cookies)
+                self._save()
+                self._apply(self.header())
+                wait = max(self.expires_at - self.refresh_ahead - time.time(), self.retry)
+            else:
+                self.stats["failures"] += 1
+                print(f"[CookieManager] No cookies captured, retrying in {self.retry}s. Douyin search may be limited.")
+                wait = self.retry
+
+    def snapshot(self) -> Dict:
+        return {
+            **self.stats,
+            "running": self._task is not None,
+            "valid": self.is_valid(),
+            "cookies": len(self.cookies),
+            "captured_at": self.captured_at or None,
+            "expires_in": round(self.expires_at - time.time()) if self.cookies else None,
+        }
+
+
+_cookie_jar: Optional[DouyinCookieJar] = None
+
+
+def get_douyin_cookie_jar() -> DouyinCookieJar:
+    global _cookie_jar
+    if _cookie_jar is None:
+        _cookie_jar = DouyinCookieJar()
+    return _cookie_jar
@@ -0,0 +1,312 @@
+"""
+Local stand-in for the Bilibili and Douyin APIs, for offline benchmarks.
+
+Serves canned but parameterized fixtures for every endpoint the platform
+classes (and bilibili_api.py) call, with injectable latency and error rates:
+
+    python fake_upstream.py --port 8900 --latency-ms 80 --jitter-ms 40 --error-rate 0.05
+
+then start the app against it:
+
+    BILIBILI_API_BASE=http://127.0.0.1:8900 DOUYIN_API_BASE=http://127.0.0.1:8900 python web_app.py
+
+Fixtures are deterministic (same mid -> same creator, same videos), so runs
+are comparable. Injected errors look like the real ones: Bilibili answers
+-352 (risk control) or HTTP 412, Douyin an empty 200 body.
+
+Control endpoints:
+    GET  /__fake/stats   calls per endpoint since the last reset
+    POST /__fake/reset   zero the counters
+    POST /__fake/config  JSON body with any of latency_ms, jitter_ms, error_rate, endpoint_latency_ms
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+
+# Fixture timestamps are relative to this, so "recent" videos stay recent
+EPOCH = int(time.time())
+
+
+def _seed(*parts) -> int:
+    return int(hashlib.md5("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:8], 16)
+
+
+class FakeConfig:
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 creators: int = 40, videos_per_creator: int = 60, seed: int = 1,
+                 endpoint_latency_ms: Optional[Dict[str, float]] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.creators = creators
+        self.videos_per_creator = videos_per_creator
+        self.seed = seed
+        # Per-path overrides, e.g. {"/x/web-interface/card": 800} to simulate one slow endpoint
+        self.endpoint_latency_ms = endpoint_latency_ms or {}
+
+    def update(self, values: Dict):
+        for key in ("latency_ms", "jitter_ms", "error_rate", "endpoint_latency_ms"):
+            if key in values:
+                setattr(self, key, values[key])
+
+    def to_dict(self) -> Dict:
+        return {k: v for k, v in vars(self).items()}
+
+
+# --- Fixtures ---
+
+def bili_mid(index: int) -> int:
+    return 10000 + index
+
+
+def bili_creator(mid: int) -> Dict:
+    rng = random.Random(_seed("bili", mid))
+    return {
+        "mid": mid,
+        "name": f"测试UP主{mid}",
+        "fans": rng.randint(1000, 3_000_000),
+        "sign": f"Fake creator {mid} for benchmarks",
+        "face": f"https://i0.hdslb.com/bfs/face/fake{mid}.jpg",
+    }
+
+
+def bili_videos(mid: int, count: int) -> List[Dict]:
+    rng = random.Random(_seed("bili-videos", mid))
+    videos = []
+    for k in range(count):
+        videos.append({
+            "bvid": f"BV1fk{mid}{k:04d}",
+            "aid": mid * 10000 + k,
+            "title": f"视频 {k} by {mid}",
+            "play": rng.randint(500, 2_000_000),
+            "created": EPOCH - k * 129600 - rng.randint(0, 3600),  # about one every 1.5 days
+            "pic": f"//i0.hdslb.com/bfs/archive/fake{mid}_{k}.jpg",
+            "length": f"{rng.randint(1, 20)}:{rng.randint(0, 59):02d}",
+            "description": "Benchmark fixture",
+        })
+    return videos
+
+
+def dy_sec_uid(index: int) -> str:
+    return f"MS4wLjABAAAAfake{index:05d}"
+
+
+def dy_author(sec_uid: str) -> Dict:
+    rng = random.Random(_seed("dy", sec_uid))
+    return {
+        "sec_uid": sec_uid,
+        "uid": str(_seed("dy-uid", sec_uid)),
+        "nickname": f"抖音作者{sec_uid[-5:]}",
+        "signature": "Fake Douyin creator",
+        "follower_count": rng.randint(1000, 5_000_000),
+        "avatar_thumb": {"url_list": [f"https://p3.douyinpic.com/aweme/fake_{sec_uid[-5:]}.jpeg"]},
+    }
+
+
+def dy_aweme(sec_uid: str, k: int) -> Dict:
+    rng = random.Random(_seed("dy-aweme", sec_uid, k))
+    aweme_id = str(7300000000000000000 + _seed(sec_uid) % 10_000_000 * 1000 + k)
+    return {
+        "aweme_id": aweme_id,
+        "desc": f"抖音视频 {k} #{sec_uid[-5:]}",
+        "create_time": EPOCH - k * 86400 - rng.randint(0, 3600),
+        "duration": rng.randint(5, 180) * 1000,
+        "statistics": {"play_count": rng.randint(1000, 9_000_000), "digg_count": rng.randint(10, 500_000)},
+        "video": {"cover": {"url_list": [f"https://p3.douyinpic.com/tos/fake_{aweme_id}.jpeg"]}},
+        "author": dy_author(sec_uid),
+    }
+
+
+def _keyword_indices(keyword: str, creators: int, count: int) -> List[int]:
+    rng = random.Random(_seed("kw", keyword))
+    return [rng.randrange(creators) for _ in range(count)]
+
+
+# --- App ---
+
+def create_app(config: Optional[FakeConfig] = None) -> FastAPI:
+    config = config or FakeConfig()
+    app = FastAPI()
+    app.state.config = config
+    app.state.calls = Counter()
+    rng = random.Random(config.seed)
+
+    def ok(data: Dict) -> JSONResponse:
+        return JSONResponse({"code": 0, "message": "0", "ttl": 1, "data": data})
+
+    @app.middleware("http")
+    async def inject(request: Request, call_next):
+        path = request.url.path
+        if path.startswith("/__fake"):
+            return await call_next(request)
+        app.state.calls[path] += 1
+        latency = config.endpoint_latency_ms.get(path, config.latency_ms)
+        if config.jitter_ms:
+            latency += rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+        if config.error_rate and rng.random() < config.error_rate:
+            app.state.calls[f"{path} [error]"] += 1
+            if path.startswith("/x/"):
+                if rng.random() < 0.5:
+                    return Response(status_code=412)
+                return JSONResponse({"code": -352, "message": "风控校验失败", "ttl": 1})
+            return Response(b"", media_type="application/json")  # Douyin: blocked = empty body
+        return await call_next(request)
+
+    # --- Control ---
+
+    @app.get("/__fake/stats")
+    async def stats():
+        return {"calls": dict(app.state.calls), "total": sum(v for k, v in app.state.calls.items()
+                                                              if not k.endswith("[error]")),
+                "config": config.to_dict()}
+
+    @app.post("/__fake/reset")
+    async def reset():
+        app.state.calls.clear()
+        return {"ok": True}
+
+    @app.post("/__fake/config")
+    async def update_config(request: Request):
+        config.update(await request.json())
+        return config.to_dict()
+
+    # --- Bilibili ---
+
+    @app.get("/x/web-interface/nav")
+    async def nav():
+        return ok({"isLogin": False, "wbi_img": {
+            "img_url": "https://i0.hdslb.com/bfs/wbi/7cd084941338484aae1ad9425b84077c.png",
+            "sub_url": "https://i0.hdslb.com/bfs/wbi/4932caff0ff746eab6f01bf08b70ac45.png",
+        }})
+
+    @app.get("/x/web-interface/search/type")
+    async def search_type(keyword: str = "", search_type: str = "video", page: int = 1, page_size: int = 20):
+        if search_type == "bili_user":
+            mid = int(keyword) if keyword.isdigit() else bili_mid(_keyword_indices(keyword, config.creators, 1)[0])
+            c = bili_creator(mid)
+            return ok({"result": [{"mid": mid, "uname": c["name"], "fans": c["fans"], "usign": c["sign"],
+                                   "upic": c["face"]}]})
+        if keyword.isdigit():
+            # Video search by mid (author lookup fallback)
+            mids = [int(keyword)]
+        else:
+            mids = [bili_mid(i) for i in _keyword_indices(keyword, config.creators, page_size)]
+        results = []
+        for n, mid in enumerate(mids):
+            c = bili_creator(mid)
+            v = bili_videos(mid, n % 3 + 1)[-1]
+            results.append({"type": "video", "mid": mid, "author": c["name"], "upic": c["face"],
+                            "bvid": v["bvid"], "aid": v["aid"], "title": f"<em class=\"keyword\">{keyword}</em> {v['title']}",
+                            "play": v["play"], "pic": v["pic"], "pubdate": v["created"], "duration": v["length"]})
+        return ok({"page": page, "pagesize": page_size, "numResults": len(results), "result": results})
+
+    @app.get("/x/web-interface/card")
+    async def card(mid: int):
+        c = bili_creator(mid)
+        return ok({"card": {"mid": str(mid), "name": c["name"], "fans": c["fans"], "sign": c["sign"],
+                            "face": c["face"]}, "follower": c["fans"]})
+
+    @app.get("/x/relation/stat")
+    async def relation_stat(vmid: int):
+        c = bili_creator(vmid)
+        return ok({"mid": vmid, "following": 100, "follower": c["fans"]})
+
+    @app.get("/x/space/wbi/acc/info")
+    async def acc_info(mid: int):
+        c = bili_creator(mid)
+        return ok({"mid": mid, "name": c["name"], "sign": c["sign"], "face": c["face"]})
+
+    @app.get("/x/space/wbi/arc/search")
+    @app.get("/x/space/arc/search")
+    async def arc_search(mid: int, ps: int = 30, pn: int = 1):
+        videos = bili_videos(mid, config.videos_per_creator)
+        page = videos[(pn - 1) * ps: pn * ps]
+        return ok({"list": {"vlist": page}, "page": {"pn": pn, "ps": ps, "count": len(videos)}})
+
+    @app.get("/x/polymer/web-dynamic/v1/feed/space")
+    async def feed_space(host_mid: int = 0):
+        c = bili_creator(host_mid)
+        items = [{"modules": {"module_author": {"mid": host_mid, "name": c["name"], "face": c["face"]},
+                              "module_dynamic": {"major": {"archive": {"bvid": v["bvid"], "title": v["title"],
+                                                                       "cover": v["pic"],
+                                                                       "stat": {"play": str(v["play"])}}}}}}
+                 for v in bili_videos(host_mid, 10)]
+        return ok({"items": items, "has_more": False})
+
+    @app.get("/x/web-interface/view")
+    async def view(bvid: str):
+        return ok({"bvid": bvid, "aid": _seed(bvid) % 10**9, "title": f"Fixture video {bvid}",
+                   "desc": "Benchmark fixture description. " * 8, "owner": {"mid": 10000},
+                   "subtitle": {"list": []}})
+
+    @app.get("/x/v2/reply")
+    async def reply(oid: int, ps: int = 20):
+        rng_local = random.Random(_seed("reply", oid))
+        return ok({"replies": [{"content": {"message": f"评论 {i}"}, "like": rng_local.randint(0, 5000)}
+                               for i in range(min(ps, 20))]})
+
+    # --- Douyin ---
+
+    @app.get("/aweme/v1/web/general/search/single/")
+    async def dy_search(keyword: str = "", count: int = 10):
+        data = [{"type": 1, "aweme_info": dy_aweme(dy_sec_uid(i), 0)}
+                for i in _keyword_indices(keyword, config.creators, count)]
+        return {"status_code": 0, "data": data, "has_more": 1}
+
+    @app.get("/aweme/v1/web/user/profile/other/")
+    async def dy_profile(sec_user_id: str):
+        return {"status_code": 0, "user": dy_author(sec_user_id)}
+
+    @app.get("/aweme/v1/web/aweme/post/")
+    async def dy_posts(sec_user_id: str, count: int = 10, max_cursor: int = 0):
+        # Cursor = index of the next post, newest first
+        start = int(max_cursor)
+        end = min(start + int(count), config.videos_per_creator)
+        return {"status_code": 0, "aweme_list": [dy_aweme(sec_user_id, k) for k in range(start, end)],
+                "max_cursor": end, "has_more": 1 if end < config.videos_per_creator else 0}
+
+    @app.get("/aweme/v1/web/aweme/detail/")
+    async def dy_detail(aweme_id: str):
+        index = int(aweme_id) % config.creators
+        return {"status_code": 0, "aweme_detail": {**dy_aweme(dy_sec_uid(index), 0), "aweme_id": aweme_id}}
+
+    @app.get("/share/video/{aweme_id}")
+    async def dy_share_page(aweme_id: str):
+        item = {**dy_aweme(dy_sec_uid(int(aweme_id) % config.creators), 0), "aweme_id": aweme_id}
+        router_data = {"loaderData": {"video_(id)/page": {"videoInfoRes": {"item_list": [item]}}}}
+        return HTMLResponse(f"<html><body><script>window._ROUTER_DATA = "
+                            f"{json.dumps(router_data, ensure_ascii=False)};</script></body></html>")
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Bilibili/Douyin upstream for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--creators", type=int, default=40)
+    parser.add_argument("--videos-per-creator", type=int, default=60)
+    args = parser.parse_args()
+
+    config = FakeConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                        creators=args.creators, videos_per_creator=args.videos_per_creator)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
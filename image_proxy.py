@@ -0,0 +1,330 @@
+"""
+Caching image proxy behind /img_proxy.
+
+Covers and avatars are stored content-addressed on disk (blobs/<sha256>), with
+a small SQLite index mapping source URL -> blob + validators. Fresh entries are
+served straight from disk, stale ones are revalidated with
+If-None-Match / If-Modified-Since, and concurrent requests for the same URL
+share one upstream fetch. The directory is capped at IMG_CACHE_MAX_MB and
+evicted least-recently-used first.
+
+Resized / transcoded variants (width, quality, format) are produced with
+OpenCV on a worker pool and cached next to their source blob.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from platforms.http_client import HttpClient
+
+IMG_CACHE_DIR = Path(os.getenv("IMG_CACHE_DIR", ".cache/images"))
+IMG_CACHE_MAX_MB = float(os.getenv("IMG_CACHE_MAX_MB", "512"))
+# How long a cached image is served without asking the CDN again
+IMG_FRESH_SECONDS = int(os.getenv("IMG_FRESH_SECONDS", str(24 * 3600)))
+# Browser-side Cache-Control max-age
+IMG_BROWSER_MAX_AGE = int(os.getenv("IMG_BROWSER_MAX_AGE", str(7 * 24 * 3600)))
+IMG_MAX_BYTES = 10 * 1024 * 1024
+# OpenCV releases the GIL while resizing/encoding, so threads scale fine
+IMG_WORKERS = int(os.getenv("IMG_WORKERS", str(min(4, os.cpu_count() or 1))))
+IMG_DEFAULT_QUALITY = 80
+IMG_MAX_WIDTH = 2048
+
+VARIANT_FORMATS = {
+    "webp": ("image/webp", ".webp"),
+    "jpeg": ("image/jpeg", ".jpg"),
+    "png": ("image/png", ".png"),
+}
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+@dataclass
+class CachedImage:
+    path: Path
+    digest: str
+    content_type: str
+
+
+class ImageProxy:
+    def __init__(self, cache_dir: Path = IMG_CACHE_DIR, max_bytes: int = int(IMG_CACHE_MAX_MB * 1024 * 1024),
+                 fresh_seconds: int = IMG_FRESH_SECONDS):
+        self.cache_dir = cache_dir
+        self.blob_dir = cache_dir / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.variant_dir = cache_dir / "variants"
+        self.variant_dir.mkdir(parents=True, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=IMG_WORKERS, thread_name_prefix="img")
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self.http = HttpClient("img_proxy", track_health=False, rate_limit=False, use_cassette=False)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "revalidated": 0, "fetched": 0, "coalesced": 0, "errors": 0, "evictions": 0,
+                      "variant_hits": 0, "variants_built": 0}
+
+        self._db = sqlite3.connect(str(cache_dir / "index.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            " url TEXT PRIMARY KEY, digest TEXT NOT NULL, content_type TEXT NOT NULL,"
+            " etag TEXT, last_modified TEXT, size INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS images_last_access ON images(last_access)")
+        self._total_bytes = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM images)"
+        ).fetchone()[0]
+        self._total_bytes += sum(f.stat().st_size for f in self.variant_dir.glob("*/*") if f.is_file())
+
+    # --- Index ---
+
+    def _lookup(self, url: str):
+        with self._lock:
+            return self._db.execute(
+                "SELECT digest, content_type, etag, last_modified, fetched_at FROM images WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _touch(self, url: str, revalidated: bool = False):
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self._db.execute("UPDATE images SET last_access = ?, fetched_at = ? WHERE url = ?", (now, now, url))
+            else:
+                self._db.execute("UPDATE images SET last_access = ? WHERE url = ?", (now, url))
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    def _store(self, url: str, body: bytes, content_type: str, etag: Optional[str], last_modified: Optional[str]) -> CachedImage:
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        now = time.time()
+        with self._lock:
+            new_blob = not path.exists()
+            if new_blob:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_bytes(body)
+                tmp.replace(path)
+                self._total_bytes += len(body)
+            old = self._db.execute("SELECT digest FROM images WHERE url = ?", (url,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO images (url, digest, content_type, etag, last_modified, size, fetched_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, content_type, etag, last_modified, len(body), now, now),
+            )
+            if old and old[0] != digest:
+                self._drop_blob_if_orphan(old[0])
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return CachedImage(path, digest, content_type)
+
+    def _drop_blob_if_orphan(self, digest: str):
+        if self._db.execute("SELECT 1 FROM images WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return
+        path = self._blob_path(digest)
+        try:
+            self._total_bytes -= path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        for variant in (self.variant_dir / digest[:2]).glob(f"{digest}-*"):
+            try:
+                self._total_bytes -= variant.stat().st_size
+                variant.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        target = self.max_bytes * 0.9
+        while self._total_bytes > target:
+            rows = self._db.execute("SELECT url, digest FROM images ORDER BY last_access LIMIT 50").fetchall()
+            if not rows:
+                break
+            for url, digest in rows:
+                self._db.execute("DELETE FROM images WHERE url = ?", (url,))
+                self._drop_blob_if_orphan(digest)
+                self.stats["evictions"] += 1
+                if self._total_bytes <= target:
+                    break
+
+    # --- Fetching ---
+
+    def _headers_for(self, url: str) -> Dict:
+        # Determine Referer based on domain
+        referer = "https://www.bilibili.com/"
+        if "douyin" in url or "amemv" in url or "tiktok" in url:
+            referer = "https://www.douyin.com/"
+        return {"User-Agent": USER_AGENT, "Referer": referer}
+
+    async def get(self, url: str) -> Optional[CachedImage]:
+        """Returns the cached image for `url`, fetching/revalidating if needed."""
+        row = self._lookup(url)
+        if row:
+            digest, content_type, _, _, fetched_at = row
+            path = self._blob_path(digest)
+            if time.time() - fetched_at < self.fresh_seconds and path.exists():
+                self.stats["hits"] += 1
+                self._touch(url)
+                return CachedImage(path, digest, content_type)
+
+        # Single-flight: everyone asking for this URL right now awaits the same fetch
+        return await self._shared(url, lambda: self._fetch_safe(url, row))
+
+    async def _shared(self, key: str, coro_factory):
+        """One task per key, like platforms/singleflight.py. Shielded, so the client
+        that started it disconnecting doesn't cancel (or strand) the others."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = self._inflight[key] = asyncio.ensure_future(coro_factory())
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_safe(self, url: str, row) -> Optional[CachedImage]:
+        try:
+            return await self._fetch(url, row)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Proxy Error: {e}")
+            return None
+
+    async def _fetch(self, url: str, row) -> Optional[CachedImage]:
+        headers = self._headers_for(url)
+        stale = None
+        if row:
+            digest, content_type, etag, last_modified, _ = row
+            if self._blob_path(digest).exists():
+                stale = CachedImage(self._blob_path(digest), digest, content_type)
+                if etag: headers["If-None-Match"] = etag
+                if last_modified: headers["If-Modified-Since"] = last_modified
+
+        r = await self.http.aget(url, headers=headers, follow_redirects=True)
+
+        if r.status_code == 304 and stale:
+            self.stats["revalidated"] += 1
+            self._touch(url, revalidated=True)
+            return stale
+
+        # Check if we got a valid image
+        content_type = r.headers.get("content-type", "image/jpeg")
+        if r.status_code != 200 or not content_type.startswith("image/") or len(r.content) > IMG_MAX_BYTES:
+            print(f"Proxy Failed ({r.status_code}, {content_type}) for: {url}")
+            return stale
+
+        self.stats["fetched"] += 1
+        return await asyncio.to_thread(
+            self._store, url, r.content, content_type, r.headers.get("etag"), r.headers.get("last-modified")
+        )
+
+    # --- Variants (resize / transcode) ---
+
+    async def get_variant(self, url: str, width: Optional[int] = None, quality: Optional[int] = None,
+                          fmt: Optional[str] = None) -> Optional[CachedImage]:
+        """Original image scaled down to `width` and re-encoded as `fmt`
+        (the source format when not given, see _source_format).
+        Falls back to the original if OpenCV cannot decode it (e.g. GIF)."""
+        image = await self.get(url)
+        if image is None or not (width or quality or fmt):
+            return image
+
+        fmt = fmt if fmt in VARIANT_FORMATS else _source_format(image.content_type)
+        width = max(16, min(int(width), IMG_MAX_WIDTH)) if width else 0
+        quality = max(1, min(int(quality), 100)) if quality else IMG_DEFAULT_QUALITY
+        content_type, ext = VARIANT_FORMATS[fmt]
+        path = self.variant_dir / image.digest[:2] / f"{image.digest}-w{width}-q{quality}{ext}"
+        variant = CachedImage(path, f"{image.digest}-w{width}-q{quality}-{fmt}", content_type)
+
+        if path.exists():
+            self.stats["variant_hits"] += 1
+            return variant
+
+        # Coalesce identical variant builds the same way as upstream fetches
+        return await self._shared(f"variant:{path.name}",
+                                  lambda: self._build_variant(image, variant, width, quality, fmt))
+
+    async def _build_variant(self, image: CachedImage, variant: CachedImage, width: int, quality: int,
+                             fmt: str) -> CachedImage:
+        try:
+            size = await asyncio.get_running_loop().run_in_executor(
+                self._pool, _transcode, image.path, variant.path, width, quality, fmt
+            )
+            if not size:
+                return image
+            self.stats["variants_built"] += 1
+            with self._lock:
+                self._total_bytes += size
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+            return variant
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Proxy Transcode Error: {e}")
+            return image
+
+    def snapshot(self) -> Dict:
+        return {**self.stats, "inflight": len(self._inflight), "disk_bytes": self._total_bytes}
+
+
+def _source_format(content_type: str) -> str:
+    # Keep PNG/WebP as they are so transparent avatars keep their alpha channel;
+    # anything else we can't encode (GIF, AVIF...) goes to WebP, which has alpha too
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    for fmt, (variant_type, _) in VARIANT_FORMATS.items():
+        if content_type == variant_type or (fmt == "jpeg" and content_type == "image/jpg"):
+            return fmt
+    return "webp"
+
+
+def _transcode(src: Path, dst: Path, width: int, quality: int, fmt: str) -> int:
+    """Runs on the worker pool. Returns the variant size, or 0 if the source
+    could not be decoded."""
+    import cv2
+    import numpy as np
+
+    img = cv2.imdecode(np.fromfile(str(src), dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if img is None:
+        return 0
+
+    h, w = img.shape[:2]
+    if width and w > width:
+        img = cv2.resize(img, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+
+    if fmt == "webp":
+        ok, buf = cv2.imencode(".webp", img, [cv2.IMWRITE_WEBP_QUALITY, quality])
+    elif fmt == "png":
+        ok, buf = cv2.imencode(".png", img)
+    else:
+        if img.ndim == 3 and img.shape[2] == 4:
+            # Explicit JPEG of a transparent source: composite onto white instead of black
+            top = float(np.iinfo(img.dtype).max)
+            alpha = img[:, :, 3:4].astype(np.float32) / top
+            img = (img[:, :, :3] * alpha + top * (1.0 - alpha)).astype(img.dtype)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return 0
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_suffix(dst.suffix + ".tmp")
+    buf.tofile(str(tmp))
+    tmp.replace(dst)
+    return len(buf)
+
+
+_image_proxy: Optional[ImageProxy] = None
+
+
+def get_image_proxy() -> ImageProxy:
+    global _image_proxy
+    if _image_proxy is None:
+        _image_proxy = ImageProxy()
+    return _image_proxy
@@ -0,0 +1,217 @@
+"""
+Background job queue for long track analyses.
+
+POST /jobs (or /analyze with job=true) enqueues a (platform, track) analysis
+and returns a job id right away; a small pool of asyncio workers runs the
+normal analyze pipeline and the result is stored in SQLite, so
+
+- the analysis survives the browser disconnecting / the proxy timing out,
+- GET /jobs/{id} can be polled for status and the result,
+- an identical job submitted again within JOB_RESULT_TTL gets the stored
+  result instantly (and one that is still queued/running is joined).
+
+The web app starts the workers on startup; if that hook never ran (an ASGI
+client without lifespan), the first submit starts them.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_DB = Path(os.getenv("JOB_DB", ".cache/jobs.sqlite3"))
+# Finished results are reused for identical submissions this long
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", str(6 * 3600)))
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "900"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def job_key(platform: str, track: str) -> str:
+    track = track.strip()
+    # Keywords are case-insensitive, links are not (share short codes like v.douyin.com/iRNBho6/)
+    if "://" not in track:
+        track = track.lower()
+    return hashlib.sha1(f"{platform}\n{track}".encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    def __init__(self, runner: Callable[[str, str], Awaitable[Dict]], workers: int = JOB_WORKERS,
+                 db_path: Path = JOB_DB):
+        # runner(platform, track) -> JSON-serializable result
+        self.runner = runner
+        self.workers = workers
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, key TEXT NOT NULL, platform TEXT NOT NULL, track TEXT NOT NULL,"
+            " status TEXT NOT NULL, result TEXT, error TEXT,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_by_key ON jobs(key, finished_at)")
+        self._lock = threading.Lock()
+        # Exists from the start so submit() works before the workers run
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks = []
+        self.busy = 0
+        self.stats = {"submitted": 0, "reused": 0, "joined": 0, "done": 0, "failed": 0}
+        # (queue wait, run time) of the last jobs, for /status
+        self._timings = deque(maxlen=100)
+
+    def _execute(self, sql: str, args=()):
+        with self._lock:
+            return self._db.execute(sql, tuple(args)).fetchall()
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._tasks:
+            return
+        if self.runner is None:
+            raise RuntimeError("JobQueue has no runner, pass one to get_job_queue() first")
+        # The DB is the source of truth: drop anything enqueued so far and requeue from it.
+        # Jobs that were queued/running when the process died are picked up again too.
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+        for row in self._execute("SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)):
+            self._execute("UPDATE jobs SET status = ? WHERE id = ?", (QUEUED, row['id']))
+            self._queue.put_nowait(row['id'])
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        print(f"[JobQueue] Started {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    # --- Submit / Lookup ---
+
+    def submit(self, platform: str, track: str) -> Dict:
+        key = job_key(platform, track)
+        rows = self._execute(
+            "SELECT * FROM jobs WHERE key = ? AND (status IN (?, ?) OR (status = ? AND finished_at >= ?))"
+            " ORDER BY created_at DESC LIMIT 1",
+            (key, QUEUED, RUNNING, DONE, time.time() - JOB_RESULT_TTL),
+        )
+        if rows:
+            self.stats["reused" if rows[0]['status'] == DONE else "joined"] += 1
+            return self._public(rows[0])
+
+        if not self._tasks and self.runner is None:
+            # Checked before the INSERT: a row nobody can run would be "joined" forever
+            raise RuntimeError("JobQueue has no runner, pass one to get_job_queue() first")
+
+        job_id = uuid.uuid4().hex[:16]
+        self._execute(
+            "INSERT INTO jobs (id, key, platform, track, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, key, platform, track.strip(), QUEUED, time.time()),
+        )
+        self.stats["submitted"] += 1
+        if self._tasks:
+            self._queue.put_nowait(job_id)
+        else:
+            # No startup hook ran (e.g. an ASGI test client without lifespan): start the
+            # workers now, start() enqueues this job from the DB with the others
+            self.start()
+        return self.get(job_id)
+
+    def get(self, job_id: str, with_result: bool = False) -> Optional[Dict]:
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._public(rows[0], with_result) if rows else None
+
+    def _public(self, row, with_result: bool = False) -> Dict:
+        job = {
+            "job_id": row['id'],
+            "platform": row['platform'],
+            "track": row['track'],
+            "status": row['status'],
+            "error": row['error'],
+            "created_at": row['created_at'],
+            "started_at": row['started_at'],
+            "finished_at": row['finished_at'],
+        }
+        if row['started_at']:
+            job["queue_seconds"] = round(row['started_at'] - row['created_at'], 3)
+        if row['finished_at'] and row['started_at']:
+            job["run_seconds"] = round(row['finished_at'] - row['started_at'], 3)
+        if with_result and row['result']:
+            job["result"] = json.loads(row['result'])
+        return job
+
+    # --- Workers ---
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"[JobQueue] Worker {index} crashed on {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows or rows[0]['status'] != QUEUED:
+            return
+        job = rows[0]
+        started = time.time()
+        self._execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (RUNNING, started, job_id))
+        self.busy += 1
+        print(f"[JobQueue] Running {job_id}: {job['platform']} / {job['track']}")
+        try:
+            result = await asyncio.wait_for(self.runner(job['platform'], job['track']), JOB_TIMEOUT)
+            status, payload, error = DONE, json.dumps(result, ensure_ascii=False), None
+        except asyncio.TimeoutError:
+            status, payload, error = FAILED, None, f"Timed out after {JOB_TIMEOUT:.0f}s"
+        except Exception as e:
+            status, payload, error = FAILED, None, str(e)
+        finally:
+            self.busy -= 1
+        finished = time.time()
+        self._execute("UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                      (status, payload, error, finished, job_id))
+        self.stats[status] += 1
+        self._timings.append((started - job['created_at'], finished - started))
+
+    def snapshot(self) -> Dict:
+        waits = [t[0] for t in self._timings]
+        runs = [t[1] for t in self._timings]
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "busy": self.busy,
+            "queue_depth": self._queue.qsize(),
+            "avg_queue_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "avg_run_seconds": round(sum(runs) / len(runs), 3) if runs else 0.0,
+            "max_run_seconds": round(max(runs), 3) if runs else 0.0,
+        }
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue(runner: Optional[Callable[[str, str], Awaitable[Dict]]] = None) -> JobQueue:
+    """Process-wide queue; the web app passes the runner on first use."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(runner)
+    elif runner is not None and _job_queue.runner is None:
+        _job_queue.runner = runner
+    return _job_queue
@@ -1,9 +1,15 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional
 
+from .store import get_creator_store
+
 class BasePlatform(ABC):
     """Abstract Base Class for Social Media Platforms"""
 
+    # Platform key for rows in the local creator store (platforms/store.py)
+    store_name: Optional[str] = None
+
     @abstractmethod
     def search_users(self, keyword: str) -> List[Dict]:
         """
@@ -27,10 +33,59 @@ class BasePlatform(ABC):
         Returns: List of dicts with keys: bvid/id, title, play, created, pic, length
         """
         pass
-    
+
     @abstractmethod
     def get_post_detail(self, post_id: str) -> Optional[Dict]:
          """
          Get detail for a single post (including subtitles/comments if possible).
          """
          pass
+
+    # --- Async Variants ---
+    # Used by the web routes. The defaults push the sync call to a worker thread
+    # so the event loop keeps running; platforms override them with native
+    # implementations on their pooled async client.
+
+    async def search_users_async(self, keyword: str) -> List[Dict]:
+        return await asyncio.to_thread(self.search_users, keyword)
+
+    async def get_user_info_async(self, user_id: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.get_user_info, user_id)
+
+    async def get_recent_posts_async(self, user_id: str, limit: int = 10) -> List[Dict]:
+        return await asyncio.to_thread(self.get_recent_posts, user_id, limit)
+
+    async def get_post_detail_async(self, post_id: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.get_post_detail, post_id)
+
+    async def sample_videos_async(self, user_id: str, count: int = 50) -> Optional[List[Dict]]:
+        """Fresh play (and like, if known) counts of the user's latest videos,
+        for the view collector. None = not supported / failed."""
+        return None
+
+    # --- Local Store ---
+    # Failures here never break a fetch, the store is only an optimization.
+
+    def remember_creator(self, info: Optional[Dict]) -> Optional[Dict]:
+        store = get_creator_store()
+        if store and info and self.store_name:
+            try:
+                store.upsert_creator(self.store_name, info)
+            except Exception as e:
+                print(f"[CreatorStore] Write failed: {e}")
+        return info
+
+    async def remember_creator_async(self, info: Optional[Dict]) -> Optional[Dict]:
+        # sqlite write, kept off the event loop
+        return await asyncio.to_thread(self.remember_creator, info)
+
+    def record_snapshot(self, user_id: str, stats: Dict, fans=None, video_count: int = 0):
+        store = get_creator_store()
+        if store and self.store_name:
+            try:
+                store.add_snapshot(self.store_name, user_id, stats, fans=fans, video_count=video_count)
+            except Exception as e:
+                print(f"[CreatorStore] Snapshot failed: {e}")
+
+    async def record_snapshot_async(self, user_id: str, stats: Dict, fans=None, video_count: int = 0):
+        await asyncio.to_thread(self.record_snapshot, user_id, stats, fans, video_count)
@@ -0,0 +1,253 @@
+"""
+Long-lived Playwright browser pool.
+
+Chromium is launched lazily on first use and shared by every pool with the
+same headless setting. Each pool hands out warm pages (one context + page per
+slot), recycles a slot after BROWSER_CONTEXT_MAX_USES uses or when its page /
+browser crashed, and keeps simple utilization counters for /status.
+
+Every context also gets a request-routing profile: by default media, images,
+fonts and known telemetry hosts are aborted, since callers only read the
+HTML/JSON. Captcha images are always let through (the solver screenshots
+them): anything whose host+path, or its frame's, matches BROWSER_BLOCK_ALLOW
+(ByteDance serves slider images from p*-catpcha.byteimg.com, sic) unless the
+host is on the telemetry block list, and a caller can borrow a page with allow_images=True when it does
+need covers rendered.
+
+    async with get_browser_pool("douyin_search").page(cookies=...) as page:
+        await page.goto(...)
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_CONTEXT_MAX_USES = int(os.getenv("BROWSER_CONTEXT_MAX_USES", "20"))
+BROWSER_LAUNCH_ARGS = ['--disable-blink-features=AutomationControlled', '--no-sandbox']
+
+# Resource types aborted per profile ("none" disables routing altogether)
+BLOCK_PROFILES = {
+    "none": set(),
+    "lean": {"media", "image", "font"},
+    "strict": {"media", "image", "font", "stylesheet", "manifest", "texttrack"},
+}
+BROWSER_BLOCK_PROFILE = os.getenv("BROWSER_BLOCK_PROFILE", "lean")
+# Telemetry / tracking hosts, aborted whenever a profile is active
+BROWSER_BLOCK_HOSTS = [h for h in os.getenv(
+    "BROWSER_BLOCK_HOSTS", "mcs.zijieapi.com,mon.zijieapi.com,mssdk.bytedance.com,google-analytics.com"
+).split(",") if h]
+# Host+path substrings that always load (slider captcha backgrounds), matched on the request
+# or on its frame (the captcha iframe), never on the query: telemetry carries verifyFp=verify_...
+# "catpcha" is ByteDance's own spelling of the image host (p*-catpcha.byteimg.com)
+BROWSER_BLOCK_ALLOW = [p for p in os.getenv("BROWSER_BLOCK_ALLOW", "captcha,catpcha").split(",") if p]
+
+_playwright = None
+_playwright_starting: Optional[asyncio.Task] = None
+_browsers: Dict[bool, object] = {}
+_launch_lock: Optional[asyncio.Lock] = None
+_pools: Dict[str, "BrowserPool"] = {}
+
+
+async def _get_browser(headless: bool):
+    """One Chromium process per headless mode, relaunched if it disconnected."""
+    global _playwright, _playwright_starting, _launch_lock
+    if _launch_lock is None:
+        _launch_lock = asyncio.Lock()
+    async with _launch_lock:
+        if _playwright is None:
+            if _playwright_starting is None:
+                from playwright.async_api import async_playwright
+                _playwright_starting = asyncio.ensure_future(async_playwright().start())
+            # Shielded: a caller cancelled halfway through (e.g. the background cookie
+            # capture at shutdown) must not orphan the driver, shutdown still stops it
+            try:
+                _playwright = await asyncio.shield(_playwright_starting)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _playwright_starting = None
+                raise
+            _playwright_starting = None
+        browser = _browsers.get(headless)
+        if browser is None or not browser.is_connected():
+            print(f"[BrowserPool] Launching Chromium (headless={headless})...")
+            browser = await _playwright.chromium.launch(headless=headless, args=BROWSER_LAUNCH_ARGS)
+            _browsers[headless] = browser
+        return browser
+
+
+class _Slot:
+    def __init__(self, browser, context, page):
+        self.browser = browser
+        self.context = context
+        self.page = page
+        self.uses = 0
+        self.broken = False
+        self.allow_images = False
+
+    def is_healthy(self) -> bool:
+        return not self.broken and not self.page.is_closed() and self.browser.is_connected()
+
+
+class BrowserPool:
+    def __init__(self, name: str, headless: bool = True, size: int = BROWSER_POOL_SIZE,
+                 max_uses: int = BROWSER_CONTEXT_MAX_USES, context_options: Optional[Dict] = None,
+                 page_init: Optional[Callable[[object], Awaitable[None]]] = None,
+                 block_profile: str = BROWSER_BLOCK_PROFILE):
+        self.name = name
+        self.headless = headless
+        self.size = size
+        self.max_uses = max_uses
+        self.context_options = context_options or {}
+        self.page_init = page_init
+        if block_profile not in BLOCK_PROFILES:
+            print(f"[BrowserPool] Unknown block profile '{block_profile}', using 'lean'")
+            block_profile = "lean"
+        self.block_profile = block_profile
+        self.blocked_types = BLOCK_PROFILES[block_profile]
+        self._idle: List[_Slot] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_use = 0
+        self.stats = {"acquired": 0, "created": 0, "recycled": 0, "crashed": 0, "wait_seconds": 0.0,
+                      "blocked_requests": 0}
+
+    async def _new_slot(self) -> _Slot:
+        browser = await _get_browser(self.headless)
+        context = await browser.new_context(**self.context_options)
+        page = await context.new_page()
+        slot = _Slot(browser, context, page)
+        if self.block_profile != "none":
+            # Context-level so popups / iframes of this page are covered too
+            await context.route("**/*", lambda route: self._route(slot, route))
+        page.on("crash", lambda *_: setattr(slot, "broken", True))
+        if self.page_init:
+            await self.page_init(page)
+        self.stats["created"] += 1
+        return slot
+
+    def _should_block(self, slot: _Slot, resource_type: str, url: str, frame_url: str = "") -> bool:
+        parts = urlsplit(url)
+        if any(h in parts.netloc for h in BROWSER_BLOCK_HOSTS):
+            return True
+        frame = urlsplit(frame_url)
+        where = f"{parts.netloc}{parts.path} {frame.netloc}{frame.path}"
+        if any(p in where for p in BROWSER_BLOCK_ALLOW):
+            return False
+        if resource_type == "image" and slot.allow_images:
+            return False
+        return resource_type in self.blocked_types
+
+    async def _route(self, slot: _Slot, route):
+        request = route.request
+        try:
+            try:
+                frame_url = request.frame.url
+            except Exception:
+                frame_url = ""  # service worker requests have no frame
+            if self._should_block(slot, request.resource_type, request.url, frame_url):
+                self.stats["blocked_requests"] += 1
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+        except Exception:
+            pass  # page/context closed while the request was in flight
+
+    async def _discard(self, slot: _Slot):
+        try:
+            await slot.context.close()
+        except Exception:
+            pass  # browser already gone
+
+    @asynccontextmanager
+    async def page(self, cookies: Optional[List[Dict]] = None, allow_images: bool = False):
+        """Borrow a warm page. Cookies (Playwright format) are added to its context.
+        allow_images lets images through the block profile for this borrow only."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        started = time.monotonic()
+        async with self._semaphore:
+            self.stats["wait_seconds"] += time.monotonic() - started
+
+            slot = None
+            while self._idle:
+                candidate = self._idle.pop()
+                if candidate.is_healthy():
+                    slot = candidate
+                    break
+                self.stats["crashed"] += 1
+                await self._discard(candidate)
+            if slot is None:
+                slot = await self._new_slot()
+
+            if cookies:
+                await slot.context.add_cookies(cookies)
+
+            slot.allow_images = allow_images
+            self.in_use += 1
+            self.stats["acquired"] += 1
+            try:
+                yield slot.page
+            except Exception:
+                # Page state is unknown after an error escaping the caller, don't reuse it
+                slot.broken = True
+                raise
+            finally:
+                self.in_use -= 1
+                slot.uses += 1
+                if slot.is_healthy() and slot.uses < self.max_uses:
+                    self._idle.append(slot)
+                else:
+                    if not slot.is_healthy():
+                        self.stats["crashed"] += 1
+                    self.stats["recycled"] += 1
+                    await self._discard(slot)
+
+    async def close(self):
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+    def snapshot(self) -> Dict:
+        return {
+            **self.stats,
+            "size": self.size,
+            "block_profile": self.block_profile,
+            "in_use": self.in_use,
+            "idle": len(self._idle),
+            "utilization": round(self.in_use / self.size, 2) if self.size else 0.0,
+        }
+
+
+def get_browser_pool(name: str, **kwargs) -> BrowserPool:
+    """Named pool registry. kwargs only apply when the pool is first created."""
+    pool = _pools.get(name)
+    if pool is None:
+        pool = _pools[name] = BrowserPool(name, **kwargs)
+    return pool
+
+
+def browser_pool_stats() -> Dict:
+    return {name: pool.snapshot() for name, pool in _pools.items()}
+
+
+async def shutdown_browser_pools():
+    global _playwright, _playwright_starting
+    for pool in _pools.values():
+        await pool.close()
+    for browser in list(_browsers.values()):
+        try:
+            await browser.close()
+        except Exception:
+            pass
+    _browsers.clear()
+    if _playwright is None and _playwright_starting is not None:
+        try:
+            _playwright = await _playwright_starting
+        except Exception:
+            pass
+        _playwright_starting = None
+    if _playwright is not None:
+        await _playwright.stop()
+        _playwright = None
@@ -0,0 +1,205 @@
+"""
+Response cache shared by the platform HttpClients.
+
+Two tiers, both keyed by endpoint + normalized params:
+- an in-memory LRU (per-endpoint TTLs come from the platform modules)
+- a size-bounded SQLite file that survives restarts
+
+Only successful API payloads are stored (each platform decides what counts as
+success), so risk-control errors are never replayed to users.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") != "0"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_DB = Path(os.getenv("RESPONSE_CACHE_DB", ".cache/responses.sqlite3"))
+RESPONSE_CACHE_DB_MAX_MB = float(os.getenv("RESPONSE_CACHE_DB_MAX_MB", "200"))
+
+# Signing / anti-bot params that change on every call but not the answer
+VOLATILE_PARAMS = {"wts", "w_rid", "X-Bogus", "a_bogus", "msToken", "_signature"}
+
+
+def cache_key(url: str, params: Optional[Dict] = None) -> str:
+    parts = urlsplit(url)
+    items = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        items += [(str(k), str(v)) for k, v in params.items()]
+    items = sorted((k, v) for k, v in items if k not in VOLATILE_PARAMS)
+    query = "&".join(f"{k}={v}" for k, v in items)
+    return f"{parts.netloc}{parts.path}?{query}"
+
+
+class CachedResponse:
+    """Replays a stored body through the subset of the requests/httpx
+    Response API the platform parsers use."""
+
+    def __init__(self, url: str, text: str, status_code: int = 200):
+        self.url = url
+        self.text = text
+        self.status_code = status_code
+        self.headers = {"content-type": "application/json"}
+        self.from_cache = True
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        pass
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, db_path: Optional[Path] = RESPONSE_CACHE_DB,
+                 db_max_bytes: int = int(RESPONSE_CACHE_DB_MAX_MB * 1024 * 1024)):
+        self.max_entries = max_entries
+        self.db_max_bytes = db_max_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, text)
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._db = None
+        self._db_bytes = 0
+        if db_path:
+            self._open_db(db_path)
+
+    # --- Disk Tier ---
+
+    def _open_db(self, db_path: Path):
+        try:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, body TEXT NOT NULL, expires_at REAL NOT NULL,"
+                " size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+            self._db.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            self._db_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        except Exception as e:
+            print(f"[ResponseCache] Disk tier disabled: {e}")
+            self._db = None
+
+    def _disk_get(self, key: str, now: float):
+        row = self._db.execute("SELECT body, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        body, expires_at = row
+        if expires_at < now:
+            self._disk_delete(key)
+            return None
+        self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        return body, expires_at
+
+    def _disk_delete(self, key: str):
+        row = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db_bytes -= row[0]
+
+    def _disk_set(self, key: str, text: str, expires_at: float, now: float):
+        size = len(text.encode("utf-8"))
+        self._disk_delete(key)
+        self._db.execute(
+            "INSERT INTO responses (key, body, expires_at, size, last_access) VALUES (?, ?, ?, ?, ?)",
+            (key, text, expires_at, size, now),
+        )
+        self._db_bytes += size
+        if self._db_bytes > self.db_max_bytes:
+            self._disk_evict(now)
+
+    def _disk_evict(self, now: float):
+        # Expired rows first, then least recently used until we are back under 90%
+        self._db.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        self._db_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        target = self.db_max_bytes * 0.9
+        while self._db_bytes > target:
+            rows = self._db.execute("SELECT key, size FROM responses ORDER BY last_access LIMIT 100").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db_bytes -= size
+                self.stats["evictions"] += 1
+                if self._db_bytes <= target:
+                    break
+
+    # --- Public API ---
+
+    def get(self, url: str, params: Optional[Dict] = None) -> Optional[CachedResponse]:
+        key = cache_key(url, params)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] >= now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return CachedResponse(url, entry[1])
+            if entry:
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._disk_get(key, now)
+                except sqlite3.Error as e:
+                    print(f"[ResponseCache] Disk read failed: {e}")
+                    row = None
+                if row:
+                    body, expires_at = row
+                    self._memory_set(key, body, expires_at)
+                    self.stats["disk_hits"] += 1
+                    return CachedResponse(url, body)
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, url: str, params: Optional[Dict], text: str, ttl: float):
+        key = cache_key(url, params)
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._memory_set(key, text, expires_at)
+            self.stats["stores"] += 1
+            if self._db is not None:
+                try:
+                    self._disk_set(key, text, expires_at, now)
+                except sqlite3.Error as e:
+                    print(f"[ResponseCache] Disk write failed: {e}")
+
+    def _memory_set(self, key: str, text: str, expires_at: float):
+        self._memory[key] = (expires_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._db_bytes,
+            }
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache shared by all platforms (None when disabled)."""
+    global _response_cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,179 @@
+"""
+Record / replay of platform HTTP traffic ("cassettes").
+
+    HTTP_CASSETTE_MODE=record HTTP_CASSETTE=.cache/cassettes/prod.jsonl.gz python web_app.py
+    HTTP_CASSETTE_MODE=replay HTTP_CASSETTE=.cache/cassettes/prod.jsonl.gz python web_app.py
+
+In record mode every real call HttpClient makes is appended to the cassette
+(gzipped JSON lines: request key, status, content type, body, final URL and
+the latency we saw). In replay mode nothing goes out: each call is answered
+from the cassette and delayed like the original, or by a fixed
+HTTP_CASSETTE_LATENCY_MS, times HTTP_CASSETTE_LATENCY_SCALE.
+
+Requests are matched like the response cache matches them (endpoint +
+params, minus the per-call signing params). A request recorded several
+times is replayed in the recorded order, and the last answer repeats after
+that. A request that was never recorded raises CassetteMiss, which callers
+treat like a network error. Record and replay with the same cache settings
+(ideally RESPONSE_CACHE_ENABLED=0), or cache hits during recording show up
+as misses during replay.
+"""
+import asyncio
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+from .cache import CachedResponse, cache_key
+
+HTTP_CASSETTE_MODE = os.getenv("HTTP_CASSETTE_MODE", "off")  # off | record | replay
+HTTP_CASSETTE = Path(os.getenv("HTTP_CASSETTE", ".cache/cassettes/default.jsonl.gz"))
+# Empty = use the recorded latency of each call
+HTTP_CASSETTE_LATENCY_MS = os.getenv("HTTP_CASSETTE_LATENCY_MS", "")
+HTTP_CASSETTE_LATENCY_SCALE = float(os.getenv("HTTP_CASSETTE_LATENCY_SCALE", "1.0"))
+
+
+class CassetteMiss(Exception):
+    """Replay mode got a request that is not on the cassette."""
+
+
+class ReplayedResponse(CachedResponse):
+    def __init__(self, entry: Dict):
+        super().__init__(entry["url"], entry["body"], entry["status"])
+        self.headers = {"content-type": entry.get("content_type") or "application/json"}
+        self.content = self.text.encode("utf-8")
+        self.from_cache = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} (replayed) for {self.url}")
+
+
+class Cassette:
+    def __init__(self, path: Path, mode: str, latency_ms: Optional[float] = None,
+                 latency_scale: float = HTTP_CASSETTE_LATENCY_SCALE):
+        self.path = path
+        self.mode = mode
+        self.latency_ms = latency_ms
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._writer = None
+        self._entries: Dict[str, List[Dict]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "replay":
+            self._load()
+        elif mode == "record":
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # CLI scripts never reach the web app's shutdown hook
+            atexit.register(self.close)
+        print(f"[Cassette] {mode} mode, {path}")
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    # --- Record ---
+
+    def record(self, url: str, params: Optional[Dict], response, latency: float):
+        content_type = response.headers.get("content-type", "")
+        if content_type.startswith(("image/", "video/")):
+            return  # bodies we don't parse, not worth the space
+        entry = {
+            "key": cache_key(url, params),
+            "url": str(response.url),
+            "status": response.status_code,
+            "content_type": content_type,
+            "latency": round(latency, 4),
+            "body": response.text,
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._writer is None:
+                self._writer = gzip.open(self.path, "ab")
+            self._writer.write(line)
+            # Sync flush: readable up to here even if the process dies
+            self._writer.flush()
+            self.stats["recorded"] += 1
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    # --- Replay ---
+
+    def _load(self):
+        if not self.path.exists():
+            print(f"[Cassette] {self.path} not found, every call will miss")
+            return
+        count = 0
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]].append(entry)
+                        count += 1
+            except (EOFError, json.JSONDecodeError):
+                pass  # recording was cut off mid-write, keep what we have
+        print(f"[Cassette] Loaded {count} responses for {len(self._entries)} requests")
+
+    def _next(self, url: str, params: Optional[Dict]) -> Dict:
+        key = cache_key(url, params)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"Not on cassette: {key}")
+            index = min(self._cursor[key], len(entries) - 1)
+            self._cursor[key] += 1
+            self.stats["replayed"] += 1
+            return entries[index]
+
+    def _delay(self, entry: Dict) -> float:
+        latency = self.latency_ms / 1000 if self.latency_ms is not None else entry.get("latency", 0)
+        return max(0.0, latency * self.latency_scale)
+
+    def replay(self, url: str, params: Optional[Dict] = None) -> ReplayedResponse:
+        entry = self._next(url, params)
+        delay = self._delay(entry)
+        if delay:
+            time.sleep(delay)
+        return ReplayedResponse(entry)
+
+    async def replay_async(self, url: str, params: Optional[Dict] = None) -> ReplayedResponse:
+        entry = self._next(url, params)
+        delay = self._delay(entry)
+        if delay:
+            await asyncio.sleep(delay)
+        return ReplayedResponse(entry)
+
+    def snapshot(self) -> Dict:
+        return {**self.stats, "mode": self.mode, "path": str(self.path), "requests": len(self._entries)}
+
+
+_cassette: Optional[Cassette] = None
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Process-wide cassette, None unless HTTP_CASSETTE_MODE is record/replay."""
+    global _cassette
+    if HTTP_CASSETTE_MODE not in ("record", "replay"):
+        return None
+    if _cassette is None:
+        latency = float(HTTP_CASSETTE_LATENCY_MS) if HTTP_CASSETTE_LATENCY_MS else None
+        _cassette = Cassette(HTTP_CASSETTE, HTTP_CASSETTE_MODE, latency)
+    return _cassette
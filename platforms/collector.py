@@ -0,0 +1,155 @@
+"""
+Background view-count collector.
+
+Every COLLECTOR_TICK seconds it picks the creators (from the local store)
+whose recent videos are due for a new sample and re-fetches one page of
+their latest videos. One request therefore samples up to
+COLLECTOR_PAGE_SIZE videos, and the number of requests per tick is capped
+(COLLECTOR_BATCH creators, COLLECTOR_CONCURRENCY in flight, at least
+COLLECTOR_MIN_INTERVAL seconds between request starts).
+
+Samples go into store.video_samples and give us views-per-hour velocity
+and growth curves per video and per creator (see trend helpers below).
+"""
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+
+from .store import CreatorStore, get_creator_store
+
+COLLECTOR_ENABLED = os.getenv("COLLECTOR_ENABLED", "1") != "0"
+COLLECTOR_TICK = float(os.getenv("COLLECTOR_TICK", "60"))
+# Re-sample each tracked creator at most this often
+COLLECTOR_INTERVAL = float(os.getenv("COLLECTOR_INTERVAL", "3600"))
+# Only videos published in the last N days are tracked
+COLLECTOR_TRACK_DAYS = float(os.getenv("COLLECTOR_TRACK_DAYS", "14"))
+COLLECTOR_BATCH = int(os.getenv("COLLECTOR_BATCH", "20"))
+COLLECTOR_PAGE_SIZE = int(os.getenv("COLLECTOR_PAGE_SIZE", "50"))
+COLLECTOR_CONCURRENCY = int(os.getenv("COLLECTOR_CONCURRENCY", "2"))
+COLLECTOR_MIN_INTERVAL = float(os.getenv("COLLECTOR_MIN_INTERVAL", "1.0"))
+
+
+def _tracked_since() -> int:
+    return int(time.time() - COLLECTOR_TRACK_DAYS * 86400)
+
+
+class ViewCollector:
+    def __init__(self, platforms: Dict[str, object], store: Optional[CreatorStore] = None):
+        # store_name -> platform instance
+        self.platforms = platforms
+        self.store = store or get_creator_store()
+        self._task: Optional[asyncio.Task] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pace_lock: Optional[asyncio.Lock] = None
+        self._last_start = 0.0
+        self.stats = {"ticks": 0, "creators_sampled": 0, "samples": 0, "failures": 0, "last_tick": 0.0}
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self.store is None or self._task is not None:
+            return
+        self._semaphore = asyncio.Semaphore(COLLECTOR_CONCURRENCY)
+        self._pace_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+        print(f"[Collector] Started (tick={COLLECTOR_TICK}s, interval={COLLECTOR_INTERVAL}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"[Collector] Tick failed: {e}")
+            await asyncio.sleep(COLLECTOR_TICK)
+
+    # --- Sampling ---
+
+    async def _paced(self):
+        # Spread request starts out instead of bursting the whole batch
+        async with self._pace_lock:
+            wait = self._last_start + COLLECTOR_MIN_INTERVAL - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_start = time.monotonic()
+
+    async def _sample_creator(self, platform_name: str, mid: str):
+        platform = self.platforms.get(platform_name)
+        if platform is None:
+            await asyncio.to_thread(self.store.mark_sampled, platform_name, mid)
+            return
+        async with self._semaphore:
+            await self._paced()
+            videos = await platform.sample_videos_async(mid, COLLECTOR_PAGE_SIZE)
+        if videos is None:
+            self.stats["failures"] += 1
+            await asyncio.to_thread(self.store.mark_sampled, platform_name, mid)
+            return
+        self.stats["samples"] += await asyncio.to_thread(self.store.add_samples, platform_name, mid, videos, _tracked_since())
+        self.stats["creators_sampled"] += 1
+
+    async def tick(self):
+        # sqlite calls go through a thread, the loop is serving /analyze meanwhile
+        due = await asyncio.to_thread(self.store.due_for_sampling, _tracked_since(),
+                                      time.time() - COLLECTOR_INTERVAL, COLLECTOR_BATCH)
+        self.stats["ticks"] += 1
+        self.stats["last_tick"] = time.time()
+        if not due:
+            return
+        results = await asyncio.gather(*(self._sample_creator(p, mid) for p, mid in due), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self.stats["failures"] += 1
+                print(f"[Collector] Sample failed: {result}")
+
+    def snapshot(self) -> Dict:
+        return {**self.stats, "running": self._task is not None and not self._task.done()}
+
+
+# --- Trends ---
+
+def _views_per_hour(curve) -> Optional[float]:
+    points = [p for p in curve if p['play'] is not None]
+    if len(points) < 2:
+        return None
+    first, last = points[0], points[-1]
+    hours = (last['ts'] - first['ts']) / 3600
+    return round((last['play'] - first['play']) / hours, 1) if hours > 0 else None
+
+
+def video_trend(store: CreatorStore, platform: str, bvid: str, window_hours: float = 24) -> Dict:
+    """Velocity over the last window_hours plus the full growth curve."""
+    curve = store.video_curve(platform, bvid)
+    recent = [p for p in curve if p['ts'] >= time.time() - window_hours * 3600]
+    return {
+        "bvid": bvid,
+        "views_per_hour": _views_per_hour(recent),
+        "samples": len(curve),
+        "curve": curve,
+    }
+
+
+def creator_trend(store: CreatorStore, platform: str, mid: str, window_hours: float = 24) -> Dict:
+    since = time.time() - window_hours * 3600
+    videos = []
+    for bvid in store.creator_video_ids(platform, mid, _tracked_since()):
+        velocity = _views_per_hour(store.video_curve(platform, bvid, since))
+        if velocity is not None:
+            videos.append({"bvid": bvid, "views_per_hour": velocity})
+    videos.sort(key=lambda v: v["views_per_hour"], reverse=True)
+    curve = store.creator_curve(platform, mid)
+    return {
+        "mid": mid,
+        "views_per_hour": round(sum(v["views_per_hour"] for v in videos), 1) if videos else None,
+        "videos": videos,
+        "curve": curve,
+    }
@@ -1,16 +1,47 @@
 from typing import Dict, List, Optional
 from .base import BasePlatform
-import requests
+from .http_client import HttpClient
+from .singleflight import coalesce
+from .store import IncrementalRefresh, get_creator_store
+import asyncio
 import json
 import time
 import os
-from douyin_tiktok_scraper.scraper import Scraper
+
+# Point at a local stand-in (fake_upstream.py) for offline benchmarks
+DOUYIN_API_BASE = os.getenv("DOUYIN_API_BASE", "https://www.douyin.com").rstrip("/")
+
+SEARCH_URL = f"{DOUYIN_API_BASE}/aweme/v1/web/general/search/single/"
+USER_PROFILE_URL = f"{DOUYIN_API_BASE}/aweme/v1/web/user/profile/other/"
+USER_POST_URL = f"{DOUYIN_API_BASE}/aweme/v1/web/aweme/post/"
+POST_DETAIL_URL = f"{DOUYIN_API_BASE}/aweme/v1/web/aweme/detail/"
+
+# Response cache TTLs (seconds) per endpoint, see platforms/cache.py
+CACHE_TTLS = {
+    SEARCH_URL: int(os.getenv("DOUYIN_CACHE_TTL_SEARCH", "600")),
+    USER_PROFILE_URL: int(os.getenv("DOUYIN_CACHE_TTL_PROFILE", "3600")),
+    USER_POST_URL: int(os.getenv("DOUYIN_CACHE_TTL_POSTS", "900")),
+    POST_DETAIL_URL: int(os.getenv("DOUYIN_CACHE_TTL_DETAIL", "3600")),
+}
+
+def _is_cacheable(data) -> bool:
+    # Blocked calls come back as an empty body or a non-zero status_code
+    return bool(data) and data.get('status_code', 0) == 0
+
+# Use Mobile UA for Share Page
+SHARE_PAGE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1"
+}
 
 class DouyinPlatform(BasePlatform):
     """Douyin Platform Implementation"""
+    store_name = "douyin"
     
     def __init__(self):
-        self.scraper = Scraper()
+        self._scraper = None
+        self.http = HttpClient("douyin", cache_ttls=CACHE_TTLS, is_cacheable=_is_cacheable)
+        # Share links are a different host+path each, keep them out of the per-endpoint breakers
+        self.share_http = HttpClient("douyin_share", track_health=False)
         # Load Cookie from Env
         self.cookie = os.getenv("DOUYIN_COOKIE", "s_v_web_id=verify_lya5; tt_webid=1;")
         self.headers = {
@@ -19,18 +50,39 @@ class DouyinPlatform(BasePlatform):
             "Cookie": self.cookie,
         }
 
+    @property
+    def scraper(self):
+        # douyin_tiktok_scraper pulls in aiohttp & co, only load it on the first signed request
+        if self._scraper is None:
+            from douyin_tiktok_scraper.scraper import Scraper
+            self._scraper = Scraper()
+        return self._scraper
+
     def update_cookies(self, cookie_str: str):
         """Update the cookie used for requests"""
         self.cookie = cookie_str
         self.headers['Cookie'] = cookie_str
         print(f"[DouyinPlatform] Cookies updated. Length: {len(cookie_str)}")
 
+    def _unsigned_url(self, base_url: str, params: Dict) -> str:
+        # Construct full URL for signing
+        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
+        return f"{base_url}?{query_string}"
+
+    def _signed_url(self, base_url: str, params: Dict) -> str:
+        return self.scraper.generate_x_bogus_url(self._unsigned_url(base_url, params))
 
-    def search_users(self, keyword: str) -> List[Dict]:
-        """Search Douyin Users"""
+    async def _signed_url_async(self, base_url: str, params: Dict) -> str:
+        # X-Bogus runs the signing JS through execjs (a node process per call, ~120ms),
+        # so keep it off the event loop or concurrent requests queue up behind it
+        scraper = self.scraper
+        return await asyncio.to_thread(scraper.generate_x_bogus_url, self._unsigned_url(base_url, params))
+
+    # --- Search ---
+
+    def _search_params(self, keyword: str) -> Dict:
         # Douyin General Search API
-        base_url = "https://www.douyin.com/aweme/v1/web/general/search/single/"
-        params = {
+        return {
             "device_platform": "webapp",
             "aid": "6383",
             "channel": "channel_pc_web",
@@ -44,249 +96,330 @@ class DouyinPlatform(BasePlatform):
             "offset": "0",
             "count": "10"
         }
-        
-        # Construct full URL for signing
-        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-        full_url = f"{base_url}?{query_string}"
-        
+
+    def _parse_search_users(self, data) -> List[Dict]:
+        # Parse result
+        users = []
+        if 'data' in data:
+            for item in data['data']:
+                if 'aweme_info' in item: # Video result
+                    # Extract author from video
+                    author = item['aweme_info']['author']
+                    user_info = {
+                        "mid": author['sec_uid'], # Use sec_uid as Douyin ID
+                        "name": author['nickname'],
+                        "fans": "N/A", # Search result might not have fans count
+                        "sign": author.get('signature', ''),
+                        "avatar": author['avatar_thumb']['url_list'][0]
+                    }
+                    users.append(user_info)
+                elif 'user_list' in item: # Direct user result?
+                     # Douyin search structure varies. Assuming video search primarily.
+                     pass
+
+        # Simple dedup based on mid
+        unique_users = {}
+        for u in users:
+            unique_users[u['mid']] = u
+        return list(unique_users.values())
+
+    def search_users(self, keyword: str) -> List[Dict]:
+        """Search Douyin Users"""
         try:
-            signed_url = self.scraper.generate_x_bogus_url(full_url)
-            res = requests.get(signed_url, headers=self.headers)
+            signed_url = self._signed_url(SEARCH_URL, self._search_params(keyword))
+            res = self.http.get(signed_url, headers=self.headers)
             print(f"Douyin Search URL: {signed_url}")
-            data = res.json()
-            
-            # Parse result
-            users = []
-            if 'data' in data:
-                for item in data['data']:
-                    if 'aweme_info' in item: # Video result
-                        # Extract author from video
-                        author = item['aweme_info']['author']
-                        user_info = {
-                            "mid": author['sec_uid'], # Use sec_uid as Douyin ID
-                            "name": author['nickname'],
-                            "fans": "N/A", # Search result might not have fans count
-                            "sign": author.get('signature', ''),
-                            "avatar": author['avatar_thumb']['url_list'][0]
-                        }
-                        users.append(user_info)
-                    elif 'user_list' in item: # Direct user result?
-                         # Douyin search structure varies. Assuming video search primarily.
-                         pass
-            
-            # Simple dedup based on mid
-            unique_users = {}
-            for u in users:
-                unique_users[u['mid']] = u
-            return list(unique_users.values())
+            return self._parse_search_users(res.json())
+        except Exception as e:
+            print(f"Douyin Search Failed: {e}")
+            return []
 
+    @coalesce
+    async def search_users_async(self, keyword: str) -> List[Dict]:
+        try:
+            signed_url = await self._signed_url_async(SEARCH_URL, self._search_params(keyword))
+            res = await self.http.aget(signed_url, headers=self.headers)
+            print(f"Douyin Search URL: {signed_url}")
+            return self._parse_search_users(res.json())
         except Exception as e:
             print(f"Douyin Search Failed: {e}")
             return []
 
-    def get_user_info(self, sec_uid: str) -> Optional[Dict]:
-        # Need user profile API. 
-        # https://www.douyin.com/aweme/v1/web/user/profile/other/
-        base_url = "https://www.douyin.com/aweme/v1/web/user/profile/other/"
-        params = {
+    # --- User Info ---
+
+    def _user_info_params(self, sec_uid: str) -> Dict:
+        return {
              "device_platform": "webapp",
              "aid": "6383",
              "channel": "channel_pc_web",
              "sec_user_id": sec_uid
         }
-        # Sign
-        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-        full_url = f"{base_url}?{query_string}"
-         
+
+    def _parse_user_info(self, sec_uid: str, data) -> Optional[Dict]:
+        if 'user' in data:
+            user = data['user']
+            info = {
+                "mid": sec_uid,
+                "name": user['nickname'],
+                "fans": user['follower_count'],
+                "sign": user['signature'],
+                "avatar": user['avatar_thumb']['url_list'][0]
+            }
+            return info
+        return None
+
+    def get_user_info(self, sec_uid: str) -> Optional[Dict]:
+        # Need user profile API. 
         try:
-             signed_url = self.scraper.generate_x_bogus_url(full_url)
-             res = requests.get(signed_url, headers=self.headers)
-             data = res.json()
-             if 'user' in data:
-                 user = data['user']
-                 return {
-                     "mid": sec_uid,
-                     "name": user['nickname'],
-                     "fans": user['follower_count'],
-                     "sign": user['signature'],
-                     "avatar": user['avatar_thumb']['url_list'][0]
-                 }
+             signed_url = self._signed_url(USER_PROFILE_URL, self._user_info_params(sec_uid))
+             res = self.http.get(signed_url, headers=self.headers)
+             return self.remember_creator(self._parse_user_info(sec_uid, res.json()))
         except Exception as e:
             print(f"Get User Info Failed: {e}")
         return None
 
-    def get_recent_posts(self, sec_uid: str, limit: int = 10) -> List[Dict]:
-        # User Post API
-        # https://www.douyin.com/aweme/v1/web/aweme/post/
-        base_url = "https://www.douyin.com/aweme/v1/web/aweme/post/"
-        params = {
+    @coalesce
+    async def get_user_info_async(self, sec_uid: str) -> Optional[Dict]:
+        try:
+             signed_url = await self._signed_url_async(USER_PROFILE_URL, self._user_info_params(sec_uid))
+             res = await self.http.aget(signed_url, headers=self.headers)
+             info = self._parse_user_info(sec_uid, res.json())
+             return await self.remember_creator_async(info) if info else None
+        except Exception as e:
+            print(f"Get User Info Failed: {e}")
+        return None
+
+    # --- Posts ---
+
+    def _recent_posts_params(self, sec_uid: str, limit: int, max_cursor=0) -> Dict:
+        return {
             "device_platform": "webapp",
             "aid": "6383",
             "channel": "channel_pc_web",
             "sec_user_id": sec_uid,
-            "max_cursor": "0",
+            "max_cursor": str(max_cursor),
             "count": str(limit)
         }
-        
-        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-        full_url = f"{base_url}?{query_string}"
 
+    def _parse_posts(self, data) -> List[Dict]:
+        posts = []
+        if 'aweme_list' in data:
+            for item in data['aweme_list']:
+                posts.append({
+                    "bvid": item['aweme_id'],
+                    "title": item['desc'],
+                    "play": item['statistics']['play_count'],
+                    "like": item['statistics'].get('digg_count'),
+                    "created": item['create_time'],
+                    "pic": item['video']['cover']['url_list'][0],
+                    "length": f"{item['duration']//1000}s"
+                })
+        return posts
+
+    def _parse_posts_page(self, data):
+        # (posts, next cursor, has_more) for paging newest-first
+        return self._parse_posts(data), data.get('max_cursor', 0), bool(data.get('has_more'))
+
+    def _fetch_posts_page(self, sec_uid: str, count: int, max_cursor=0):
         try:
-            signed_url = self.scraper.generate_x_bogus_url(full_url)
-            res = requests.get(signed_url, headers=self.headers)
-            data = res.json()
-            
-            posts = []
-            if 'aweme_list' in data:
-                for item in data['aweme_list']:
-                    posts.append({
-                        "bvid": item['aweme_id'],
-                        "title": item['desc'],
-                        "play": item['statistics']['play_count'],
-                        "created": item['create_time'],
-                        "pic": item['video']['cover']['url_list'][0],
-                        "length": f"{item['duration']//1000}s"
-                    })
-            return posts
+            signed_url = self._signed_url(USER_POST_URL, self._recent_posts_params(sec_uid, count, max_cursor))
+            res = self.http.get(signed_url, headers=self.headers)
+            return self._parse_posts_page(res.json())
         except Exception as e:
              print(f"Get Posts Failed: {e}")
-             return []
+             return None
 
-    def get_post_detail(self, aweme_id: str) -> Optional[Dict]:
-        """Fetch video detail by ID"""
-        base_url = "https://www.douyin.com/aweme/v1/web/aweme/detail/"
-        params = {
+    async def _fetch_posts_page_async(self, sec_uid: str, count: int, max_cursor=0, use_cache=True):
+        try:
+            signed_url = await self._signed_url_async(USER_POST_URL, self._recent_posts_params(sec_uid, count, max_cursor))
+            res = await self.http.aget(signed_url, headers=self.headers, use_cache=use_cache)
+            return self._parse_posts_page(res.json())
+        except Exception as e:
+             print(f"Get Posts Failed: {e}")
+             return None
+
+    def get_recent_posts(self, sec_uid: str, limit: int = 10) -> List[Dict]:
+        # User Post API, incremental against the local store
+        refresh = IncrementalRefresh(get_creator_store(), self.store_name, sec_uid, limit)
+        if refresh.cached is not None: return refresh.cached
+        cursor = 0
+        for _ in range(refresh.max_pages):
+            page = self._fetch_posts_page(sec_uid, refresh.page_size, cursor)
+            if page is None: break
+            posts, cursor, has_more = page
+            if not refresh.feed(posts) or not has_more: break
+        return refresh.finish()
+
+    @coalesce
+    async def get_recent_posts_async(self, sec_uid: str, limit: int = 10) -> List[Dict]:
+        refresh = await IncrementalRefresh.create_async(get_creator_store(), self.store_name, sec_uid, limit)
+        if refresh.cached is not None: return refresh.cached
+        cursor = 0
+        for _ in range(refresh.max_pages):
+            page = await self._fetch_posts_page_async(sec_uid, refresh.page_size, cursor)
+            if page is None: break
+            posts, cursor, has_more = page
+            if not await refresh.feed_async(posts) or not has_more: break
+        return await refresh.finish_async()
+
+    async def sample_videos_async(self, sec_uid: str, count: int = 50) -> Optional[List[Dict]]:
+        # Latest play/like counts for the collector, never from the response cache
+        page = await self._fetch_posts_page_async(sec_uid, count, use_cache=False)
+        return page[0] if page else None
+
+    # --- Post Detail ---
+
+    def _post_detail_params(self, aweme_id: str) -> Dict:
+        return {
             "device_platform": "webapp",
             "aid": "6383",
             "channel": "channel_pc_web",
             "aweme_id": aweme_id
         }
-        
-        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-        full_url = f"{base_url}?{query_string}"
 
+    def _parse_post_detail(self, aweme_id: str, res) -> Optional[Dict]:
         try:
-            signed_url = self.scraper.generate_x_bogus_url(full_url)
+            data = res.json()
+        except:
+            print(f"JSON Parse Error. Raw: {res.text[:500]}")
+            return None
+
+        if 'aweme_detail' in data and data['aweme_detail']:
+            item = data['aweme_detail']
+            # Extract owner info if possible
+            author = item.get('author', {})
+
+            return {
+                "id": aweme_id,
+                "title": item.get('desc', ''),
+                "pic": item.get('video', {}).get('cover', {}).get('url_list', [''])[0],
+                "created": item.get('create_time', 0),
+                "play": item.get('statistics', {}).get('play_count', 0),
+                "author": {
+                    "mid": author.get('sec_uid', ''),
+                    "name": author.get('nickname', 'Unknown'),
+                    "face": author.get('avatar_thumb', {}).get('url_list', [''])[0],
+                    "fans": author.get('follower_count', 0)
+                },
+                "subtitles": "No subtitles available", # Douyin subtitles harder to get
+                "comments": [] # Comments require separate API
+            }
+        print(f"Detail API returned no data: {data.keys()}")
+        return None
+
+    def get_post_detail(self, aweme_id: str) -> Optional[Dict]:
+        """Fetch video detail by ID"""
+        try:
+            signed_url = self._signed_url(POST_DETAIL_URL, self._post_detail_params(aweme_id))
             # Use headers with cookie (crucial)
-            res = requests.get(signed_url, headers=self.headers) 
-            try:
-                data = res.json()
-            except:
-                print(f"JSON Parse Error. Raw: {res.text[:500]}")
-                return None
-            
-            if 'aweme_detail' in data and data['aweme_detail']:
-                item = data['aweme_detail']
-                # Extract owner info if possible
-                author = item.get('author', {})
-                
-                return {
-                    "id": aweme_id,
-                    "title": item.get('desc', ''),
-                    "pic": item.get('video', {}).get('cover', {}).get('url_list', [''])[0],
-                    "created": item.get('create_time', 0),
-                    "play": item.get('statistics', {}).get('play_count', 0),
-                    "author": {
-                        "mid": author.get('sec_uid', ''),
-                        "name": author.get('nickname', 'Unknown'),
-                        "face": author.get('avatar_thumb', {}).get('url_list', [''])[0],
-                        "fans": author.get('follower_count', 0)
-                    },
-                    "subtitles": "No subtitles available", # Douyin subtitles harder to get
-                    "comments": [] # Comments require separate API
-                }
-            print(f"Detail API returned no data: {data.keys()}")
+            res = self.http.get(signed_url, headers=self.headers)
+            return self._parse_post_detail(aweme_id, res)
+        except Exception as e:
+            print(f"Get Post Detail Failed: {e}")
             return None
+
+    @coalesce
+    async def get_post_detail_async(self, aweme_id: str) -> Optional[Dict]:
+        try:
+            signed_url = await self._signed_url_async(POST_DETAIL_URL, self._post_detail_params(aweme_id))
+            res = await self.http.aget(signed_url, headers=self.headers)
+            return self._parse_post_detail(aweme_id, res)
         except Exception as e:
             print(f"Get Post Detail Failed: {e}")
             return None
 
+    # --- Share Page Scrape ---
+
+    def _parse_share_page(self, final_url: str, html: str) -> Dict:
+        import re
+        import json
+        video_data = {}
+
+        # 2. Robust JSON extraction from _ROUTER_DATA
+        # Douyin embeds data in window._ROUTER_DATA = {...};
+        json_match = re.search(r'window\._ROUTER_DATA\s*=\s*(\{.+?\});', html, re.DOTALL)
+        if not json_match:
+             json_match = re.search(r'window\._ROUTER_DATA\s*=\s*(\{.+?\})\s*</script>', html, re.DOTALL)
+
+        if json_match:
+            try:
+                json_str = json_match.group(1)
+                if json_str.endswith(';'): json_str = json_str[:-1]
+                data = json.loads(json_str)
+                
+                loader_data = data.get('loaderData', {})
+                # Find key like "video_(id)/page"
+                video_key = next((k for k in loader_data.keys() if 'video_' in k and 'page' in k), None)
+                
+                if video_key:
+                    info = loader_data[video_key].get('videoInfoRes', {}).get('item_list', [{}])[0]
+                    stats = info.get('statistics', {})
+                    author = info.get('author', {})
+                    video = info.get('video', {})
+                    
+                    video_data = {
+                        "title": info.get('desc'),
+                        "created": info.get('create_time'),
+                        "play": stats.get('play_count', 0),
+                        "likes": stats.get('digg_count', 0),
+                        "author_name": author.get('nickname'),
+                        "author_id": author.get('sec_uid'),
+                        "author_fans": author.get('follower_count'), # Often None in share page
+                        "cover": video.get('cover', {}).get('url_list', [''])[0],
+                        "author_avatar": author.get('avatar_thumb', {}).get('url_list', [''])[0]
+                    }
+            except Exception as e:
+                print(f"JSON Parsing Logic Failed: {e}")
+
+        # Fallback to Regex if JSON failed or fields missing
+        if not video_data.get('title'):
+            desc_match = re.search(r'"desc":"(.*?)"', html)
+            if desc_match:
+                title = desc_match.group(1)
+                try: title = title.encode('utf-8').decode('unicode_escape')
+                except: pass
+                video_data['title'] = title
+
+        # Extract ID from URL
+        vid_match = re.search(r'video/(\d+)', final_url)
+        vid = vid_match.group(1) if vid_match else "unknown"
+        
+        # Use Likes as Proxy for Plays if Plays is 0 (Common in Share Page)
+        play_count = video_data.get('play', 0)
+        if play_count == 0 and video_data.get('likes'):
+            play_count = video_data.get('likes') # Proxy
+
+        return {
+            "id": vid,
+            "title": video_data.get('title', "Douyin Video"),
+            "pic": video_data.get('cover') or "https://via.placeholder.com/150",
+            "created": video_data.get('created', 0),
+            "play": play_count,
+            "author": {
+                "mid": video_data.get('author_id', 'unknown'),
+                "name": video_data.get('author_name', 'Douyin Creator'),
+                "face": video_data.get('author_avatar', ''),
+                "fans": video_data.get('author_fans') or "Unknown"
+            },
+            "subtitles": f"Likes: {video_data.get('likes', 0)} (No subtitles via Link)",
+            "comments": []
+        }
+
     def get_video_via_html(self, share_url: str) -> Optional[Dict]:
         """Fetch video info by scraping the Share Page HTML (Bypasses API Block)"""
         try:
-            import re
-            import json
-            session = requests.Session()
-            # Use Mobile UA for Share Page
-            headers = {
-                "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1"
-            }
             # 1. Follow Redirects to get final ID/URL
-            res = session.get(share_url, headers=headers, allow_redirects=True, timeout=10)
-            final_url = res.url
-            html = res.text
-            
-            video_data = {}
-            
-            # 2. Robust JSON extraction from _ROUTER_DATA
-            # Douyin embeds data in window._ROUTER_DATA = {...};
-            json_match = re.search(r'window\._ROUTER_DATA\s*=\s*(\{.+?\});', html, re.DOTALL)
-            if not json_match:
-                 json_match = re.search(r'window\._ROUTER_DATA\s*=\s*(\{.+?\})\s*</script>', html, re.DOTALL)
-
-            if json_match:
-                try:
-                    json_str = json_match.group(1)
-                    if json_str.endswith(';'): json_str = json_str[:-1]
-                    data = json.loads(json_str)
-                    
-                    loader_data = data.get('loaderData', {})
-                    # Find key like "video_(id)/page"
-                    video_key = next((k for k in loader_data.keys() if 'video_' in k and 'page' in k), None)
-                    
-                    if video_key:
-                        info = loader_data[video_key].get('videoInfoRes', {}).get('item_list', [{}])[0]
-                        stats = info.get('statistics', {})
-                        author = info.get('author', {})
-                        video = info.get('video', {})
-                        
-                        video_data = {
-                            "title": info.get('desc'),
-                            "created": info.get('create_time'),
-                            "play": stats.get('play_count', 0),
-                            "likes": stats.get('digg_count', 0),
-                            "author_name": author.get('nickname'),
-                            "author_id": author.get('sec_uid'),
-                            "author_fans": author.get('follower_count'), # Often None in share page
-                            "cover": video.get('cover', {}).get('url_list', [''])[0],
-                            "author_avatar": author.get('avatar_thumb', {}).get('url_list', [''])[0]
-                        }
-                except Exception as e:
-                    print(f"JSON Parsing Logic Failed: {e}")
-
-            # Fallback to Regex if JSON failed or fields missing
-            if not video_data.get('title'):
-                desc_match = re.search(r'"desc":"(.*?)"', html)
-                if desc_match:
-                    title = desc_match.group(1)
-                    try: title = title.encode('utf-8').decode('unicode_escape')
-                    except: pass
-                    video_data['title'] = title
-
-            # Extract ID from URL
-            vid_match = re.search(r'video/(\d+)', final_url)
-            vid = vid_match.group(1) if vid_match else "unknown"
-            
-            # Use Likes as Proxy for Plays if Plays is 0 (Common in Share Page)
-            play_count = video_data.get('play', 0)
-            if play_count == 0 and video_data.get('likes'):
-                play_count = video_data.get('likes') # Proxy
+            res = self.share_http.get(share_url, headers=SHARE_PAGE_HEADERS, allow_redirects=True, timeout=10)
+            return self._parse_share_page(res.url, res.text)
+        except Exception as e:
+            print(f"HTML Scrape Failed: {e}")
+            return None
 
-            return {
-                "id": vid,
-                "title": video_data.get('title', "Douyin Video"),
-                "pic": video_data.get('cover') or "https://via.placeholder.com/150",
-                "created": video_data.get('created', 0),
-                "play": play_count,
-                "author": {
-                    "mid": video_data.get('author_id', 'unknown'),
-                    "name": video_data.get('author_name', 'Douyin Creator'),
-                    "face": video_data.get('author_avatar', ''),
-                    "fans": video_data.get('author_fans') or "Unknown"
-                },
-                "subtitles": f"Likes: {video_data.get('likes', 0)} (No subtitles via Link)",
-                "comments": []
-            }
+    @coalesce
+    async def get_video_via_html_async(self, share_url: str) -> Optional[Dict]:
+        try:
+            res = await self.share_http.aget(share_url, headers=SHARE_PAGE_HEADERS, follow_redirects=True)
+            return self._parse_share_page(str(res.url), res.text)
         except Exception as e:
             print(f"HTML Scrape Failed: {e}")
             return None
@@ -1,5 +1,5 @@
 import asyncio
-from playwright.async_api import async_playwright
+from .browser_pool import get_browser_pool
 try:
     from playwright_stealth import stealth_async
 except ImportError:
@@ -9,17 +9,100 @@ import urllib.parse
 import json
 import os
 import random
-import cv2
-import numpy as np
-import requests
+
+# "xhr": parse the search API responses the page loads itself (real author/stats),
+# falling back to DOM cards if none arrive. "dom": DOM cards only.
+DOUYIN_SEARCH_CAPTURE = os.getenv("DOUYIN_SEARCH_CAPTURE", "xhr")
+# Covers come from the XHR payload, so images are blocked on the search page unless asked for
+DOUYIN_LOAD_COVERS = os.getenv("DOUYIN_LOAD_COVERS", "0") == "1"
+SEARCH_XHR_PATHS = ("/aweme/v1/web/search/item/", "/aweme/v1/web/general/search/single/")
+
+def _first_url(obj):
+    urls = (obj or {}).get('url_list') or []
+    return urls[0] if urls else ""
+
+def parse_search_payload(payload):
+    """Turn a search XHR JSON body into result dicts (same shape as the DOM path)."""
+    results = []
+    for entry in payload.get('data') or []:
+        info = entry.get('aweme_info')
+        if not info or not info.get('aweme_id'): continue
+        author = info.get('author') or {}
+        stats = info.get('statistics') or {}
+        video = info.get('video') or {}
+        vid = info['aweme_id']
+        results.append({
+            "id": vid,
+            "title": (info.get('desc') or f"Video {vid}")[:50],
+            "cover": _first_url(video.get('cover')) or _first_url(video.get('origin_cover')),
+            "author": author.get('nickname') or "Douyin User",
+            "author_id": author.get('sec_uid', ''),
+            "author_avatar": _first_url(author.get('avatar_thumb')),
+            "author_fans": author.get('follower_count'),
+            "play": stats.get('play_count', 0),
+            "digg": stats.get('digg_count', 0),
+            "created": info.get('create_time', 0),
+            "link": f"https://www.douyin.com/video/{vid}"
+        })
+    return results
+
+# Collects every search result card in a single page.evaluate.
+# Links are normalized and deduplicated by video id inside the page.
+EXTRACT_CARDS_JS = """
+() => {
+    const seen = new Set();
+    const cards = [];
+    for (const link of document.querySelectorAll('a[href*="/video/"]')) {
+        let href = link.getAttribute('href');
+        if (!href) continue;
+        if (href.startsWith('//')) href = 'https:' + href;
+        else if (href.startsWith('/')) href = 'https://www.douyin.com' + href;
+
+        const match = href.match(/video\\/(\\d+)/);
+        if (!match || seen.has(match[1])) continue;
+        seen.add(match[1]);
+
+        // Title from the link itself or its parent
+        const text = link.innerText || (link.parentElement ? link.parentElement.innerText : '') || '';
+
+        // Douyin sometimes uses data-src
+        const img = link.querySelector('img');
+        let cover = img ? (img.getAttribute('src') || img.getAttribute('data-src') || '') : '';
+        if (cover.startsWith('//')) cover = 'https:' + cover;
+
+        // Author line lives somewhere in the surrounding card
+        let author = '';
+        const card = link.closest('li') || link.parentElement;
+        if (card) {
+            const el = card.querySelector('[class*="author"], [class*="nickname"]');
+            const at = el || Array.from(card.querySelectorAll('span')).find(s => s.innerText.trim().startsWith('@'));
+            if (at) author = at.innerText.trim().replace(/^@/, '');
+        }
+
+        cards.push({id: match[1], href: href, text: text, cover: cover, author: author});
+    }
+    return cards;
+}
+"""
 
 class DouyinBrowser:
-    def __init__(self, cookie_file="douyin_cookie.txt", headless=False):
+    def __init__(self, cookie_file="douyin_cookie.txt", headless=False, capture=DOUYIN_SEARCH_CAPTURE):
         self.cookie_file = cookie_file
         self.headless = headless
+        self.capture = capture
+        self.pool = get_browser_pool(
+            "douyin_search",
+            headless=headless,
+            context_options={
+                "user_agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                "viewport": {"width": 1280, "height": 720},
+            },
+            page_init=self._prepare_page,
+        )
 
     def _bezier_curve(self, points, steps):
         """Calculate Bezier curve points"""
+        import numpy as np
         n = len(points) - 1
         curve = []
         for t in np.linspace(0, 1, steps):
@@ -78,6 +161,8 @@ class DouyinBrowser:
         await page.mouse.up()
 
     async def _solve_captcha(self, page):
+        # OpenCV is only needed once a captcha actually shows up (and costs ~100ms+ to import)
+        import cv2
         print("[DouyinBrowser] Attempting Auto-Solve Captcha (Scanning Frames)...")
         try:
              # Find the Captcha Frame
@@ -193,36 +278,33 @@ class DouyinBrowser:
                 print(f"[DouyinBrowser] Cookie Parse Error: {e}")
         return cookies
 
+    async def _prepare_page(self, page):
+        # Runs once per pooled page, not per search
+        if stealth_async:
+            print("[DouyinBrowser] Applying Playwright Stealth...")
+            await stealth_async(page)
+        else:
+            await page.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+
     async def search(self, keyword):
         print(f"[DouyinBrowser] Converting keyword '{keyword}' to Playwright Search...")
-        print(f"[DouyinBrowser] Launching Browser (Visible={not self.headless})...")
-        
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=self.headless,
-                args=['--disable-blink-features=AutomationControlled', '--no-sandbox']
-            )
-            
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                viewport={"width": 1280, "height": 720}
-            )
-            
-            cookies = self._parse_cookies()
-            if cookies:
-                await context.add_cookies(cookies)
-
-            page = await context.new_page()
-            
-            if stealth_async:
-                print("[DouyinBrowser] Applying Playwright Stealth...")
-                await stealth_async(page)
-            else:
-                await page.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
 
+        # Warm page from the shared pool (Chromium is launched once per process)
+        async with self.pool.page(cookies=self._parse_cookies(), allow_images=DOUYIN_LOAD_COVERS) as page:
             encoded = urllib.parse.quote(keyword)
             url = f"https://www.douyin.com/search/{encoded}?source=normal_search&type=video"
-            
+
+            # XHR capture: the search page fetches its results as JSON, grab those
+            captured = []
+            async def on_response(response):
+                if not any(p in response.url for p in SEARCH_XHR_PATHS): return
+                try:
+                    captured.extend(parse_search_payload(await response.json()))
+                except Exception as e:
+                    print(f"[DouyinBrowser] Could not parse search XHR: {e}")
+            if self.capture == "xhr":
+                page.on("response", on_response)
+
             results = []
             try:
                 print(f"[DouyinBrowser] Navigating to {url}")
@@ -245,7 +327,7 @@ class DouyinBrowser:
                             print("[DouyinBrowser] Detected iframe via Selector!")
                             captcha_detected = True
                             
-                    if captcha_detected: break
+                    if captcha_detected or captured: break
                     if i % 2 == 0: print(f"[DouyinBrowser] Scanning... {i}/15")
                     await asyncio.sleep(1)
                 
@@ -264,6 +346,9 @@ class DouyinBrowser:
                 # Wait for ANY text content or specific video links
                 # We relax the check to just look for links with /video/
                 for i in range(30):
+                    if captured:
+                        print(f"[DouyinBrowser] Captured {len(captured)} results from search XHR.")
+                        break
                     # Check for video links directly
                     if await page.query_selector('a[href*="/video/"]'):
                         print("[DouyinBrowser] Video links detected!")
@@ -272,81 +357,39 @@ class DouyinBrowser:
                     if i % 5 == 0: print(f"[DouyinBrowser] Waiting... {30-i}s")
                     await asyncio.sleep(1)
 
-                if cards_found:
-                    # Find all video links directly
-                    video_links = await page.query_selector_all('a[href*="/video/"]')
-                    print(f"[DouyinBrowser] Found {len(video_links)} potential video links.")
-                    
-                    seen_urls = set()
-                    
-                    for link in video_links:
-                        try:
-                            href = await link.get_attribute('href')
-                            if not href: continue
-                            
-                            print(f"[DouyinBrowser] Checking Link: {href[:60]}...")
-                            
-                            if href.startswith("//"): href = "https:" + href
-                            elif href.startswith("/"): href = "https://www.douyin.com" + href
-                            
-                            # Deduplicate
-                            if href in seen_urls: continue
-                            seen_urls.add(href)
-                            
-                            # Extract ID
-                            import re
-                            vid_match = re.search(r'video/(\d+)', href)
-                            if not vid_match: 
-                                print(f"[DouyinBrowser] X No video ID in: {href}")
-                                continue
-                            vid = vid_match.group(1)
-                            
-                            # Try to get text/title from the link itself or parent
-                            text = await link.inner_text()
-                            if not text:
-                                # Try parent text
-                                parent = await link.evaluate_handle('el => el.parentElement')
-                                text = await parent.inner_text()
-                                
-                            print(f"[DouyinBrowser] -> ADDING VIDEO: {vid} | {text[:20]}")
-                            
-                            # Try to get image (recursive search)
-                            img_el = await link.query_selector('img')
-                            if not img_el:
-                                # Try slightly deeper or wait? Usually just 'img' works if present.
-                                # Check for style background?
-                                pass
-                                
-                            src = ""
-                            if img_el:
-                                src = await img_el.get_attribute('src')
-                                # Douyin sometimes uses data-src
-                                if not src:
-                                    src = await img_el.get_attribute('data-src')
-                            
-                            # Fallback if src is relative or protocol-less
-                            if src and src.startswith("//"): src = "https:" + src
-                            
-                            print(f"[DouyinBrowser] -> Image: {src[:40]}...")
+                if captured:
+                    # Deduplicate by id, XHR pages can overlap
+                    seen_ids = set()
+                    for item in captured:
+                        if item['id'] in seen_ids: continue
+                        seen_ids.add(item['id'])
+                        results.append(item)
+                elif cards_found:
+                    # One round trip for all cards instead of ~6 awaits per link
+                    cards = await page.evaluate(EXTRACT_CARDS_JS)
+                    print(f"[DouyinBrowser] Extracted {len(cards)} unique video cards.")
+
+                    for card in cards:
+                        text = card['text']
+                        results.append({
+                            "id": card['id'],
+                            "title": text.split('\n')[0][:50] if text else f"Video {card['id']}",
+                            "cover": card['cover'],
+                            "author": card['author'] or "Douyin User",
+                            "play": 0,
+                            "link": card['href']
+                        })
 
-                            results.append({
-                                "id": vid,
-                                "title": text.split('\n')[0][:50] if text else f"Video {vid}", 
-                                "cover": src,
-                                "author": "Douyin User", 
-                                "play": 0, 
-                                "link": href
-                            })
-                        except Exception as e:
-                            print(f"Link Parse Error: {e}")
-                            
             except Exception as e:
                 print(f"[DouyinBrowser] Search Error: {e}")
                 import traceback
                 traceback.print_exc()
-            
-            await browser.close()
-            return results
+            finally:
+                # The page goes back to the pool, don't leave our listener on it
+                if self.capture == "xhr":
+                    page.remove_listener("response", on_response)
+
+        return results
             # Singleton instance
 print("----------------------------------------------------------------")
 print("[DouyinBrowser] MODULE RELOADED SUCCESSFULLY.")
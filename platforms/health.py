@@ -0,0 +1,153 @@
+"""
+Per-endpoint health tracking and circuit breaking for outbound API calls.
+
+HttpClient reports every real (non-cached) call here, keyed by host + path.
+When an endpoint keeps failing (HTTP errors, timeouts or risk-control codes
+like -352/-412) its circuit opens: calls fail fast with CircuitOpenError for
+BREAKER_COOLDOWN seconds, so callers drop straight to their next strategy
+instead of paying a round trip. After the cool-down one probe call is let
+through (half-open); success closes the circuit, failure re-opens it with a
+longer cool-down.
+"""
+import os
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+BREAKER_ENABLED = os.getenv("BREAKER_ENABLED", "1") != "0"
+# Consecutive failures before the circuit opens
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "60"))
+BREAKER_MAX_COOLDOWN = float(os.getenv("BREAKER_MAX_COOLDOWN", "900"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Circuit open for {endpoint} (retry in {retry_in:.0f}s)")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def endpoint_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+class EndpointHealth:
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.state = CLOSED
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0  # calls short-circuited while open
+        self.consecutive_failures = 0
+        self.latency_ewma = None
+        self.last_error = None
+        self.opened_at = 0.0
+        self.cooldown = BREAKER_COOLDOWN
+        self.probe_in_flight = False
+
+    def allow(self, now: float) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, ok: bool, latency: float, error: str = None, now: float = None):
+        now = now or time.time()
+        self.calls += 1
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        if ok:
+            self.successes += 1
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                print(f"[Breaker] {self.endpoint} recovered, closing circuit")
+            self.state = CLOSED
+            self.cooldown = BREAKER_COOLDOWN
+            self.probe_in_flight = False
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == HALF_OPEN:
+            # Probe failed: back off longer before the next one
+            self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+            self._open(now)
+        elif self.state == CLOSED and self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+            self._open(now)
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.probe_in_flight = False
+        print(f"[Breaker] {self.endpoint} opened for {self.cooldown:.0f}s ({self.last_error})")
+
+    def snapshot(self, now: float) -> Dict:
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "success_rate": round(self.successes / self.calls, 3) if self.calls else None,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected": self.rejected,
+            "latency_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "last_error": self.last_error,
+            "retry_in": round(max(0.0, self.opened_at + self.cooldown - now), 1) if self.state == OPEN else 0.0,
+        }
+
+
+class HealthTracker:
+    def __init__(self):
+        self._endpoints: Dict[str, EndpointHealth] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, endpoint: str) -> EndpointHealth:
+        health = self._endpoints.get(endpoint)
+        if health is None:
+            health = self._endpoints[endpoint] = EndpointHealth(endpoint)
+        return health
+
+    def check(self, url: str):
+        """Raise CircuitOpenError if calls to this URL's endpoint should be skipped."""
+        if not BREAKER_ENABLED:
+            return
+        endpoint = endpoint_key(url)
+        now = time.time()
+        with self._lock:
+            health = self._get(endpoint)
+            if not health.allow(now):
+                raise CircuitOpenError(endpoint, health.opened_at + health.cooldown - now)
+
+    def record(self, url: str, ok: bool, latency: float, error: str = None):
+        with self._lock:
+            self._get(endpoint_key(url)).record(ok, latency, error)
+
+    def cancelled(self, url: str):
+        """A call was abandoned mid-flight; free the half-open probe slot if it held it."""
+        with self._lock:
+            health = self._endpoints.get(endpoint_key(url))
+            if health is not None and health.state == HALF_OPEN:
+                health.probe_in_flight = False
+
+    def snapshot(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            return {endpoint: h.snapshot(now) for endpoint, h in sorted(self._endpoints.items())}
+
+
+_tracker = HealthTracker()
+
+
+def get_health_tracker() -> HealthTracker:
+    return _tracker
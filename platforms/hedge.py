@@ -0,0 +1,192 @@
+"""
+Hedged fallback chains.
+
+A chain is an ordered list of (name, strategy) that each return an answer or
+None. Instead of waiting for every failing strategy in turn, the next one is
+started after HEDGE_DELAY seconds, or right away whenever a running one comes
+back empty; the first non-None answer wins and everything still running is
+cancelled (async) or ignored (sync, worker threads can't be interrupted).
+
+Each chain remembers which strategies answered recently and tries those
+first, so when e.g. the card API is risk-controlled the user search moves to
+the front until the card API starts working again.
+
+Strategies named in `last_resort` give degraded answers (e.g. no fan count):
+they always run last, are never promoted, and their answer is only used once
+nothing better is still running.
+"""
+import asyncio
+import concurrent.futures
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .tracing import span
+
+HEDGE_DELAY = float(os.getenv("HEDGE_DELAY", "0.4"))
+# How long a success / failure influences the order
+HEDGE_MEMORY_SECONDS = float(os.getenv("HEDGE_MEMORY_SECONDS", "600"))
+HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", "8"))
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_chains: Dict[str, "HedgedChain"] = {}
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+    return _executor
+
+
+class HedgedChain:
+    def __init__(self, name: str, hedge_delay: float = HEDGE_DELAY, memory: float = HEDGE_MEMORY_SECONDS,
+                 last_resort: Iterable[str] = ()):
+        self.name = name
+        self.hedge_delay = hedge_delay
+        self.memory = memory
+        self.last_resort = set(last_resort)
+        self.last_success: Dict[str, float] = {}
+        self.last_failure: Dict[str, float] = {}
+        self.stats = {"runs": 0, "hedged": 0, "exhausted": 0, "wins": {}}
+
+    # --- Ordering ---
+
+    def order(self, strategies: List[Tuple[str, Callable]]) -> List[Tuple[str, Callable]]:
+        """Recent winners first (most recent first), recently failing ones after
+        the rest, last-resort strategies at the very end (in default order)."""
+        now = time.time()
+
+        def rank(item):
+            index, (name, _) = item
+            if name in self.last_resort:
+                return (3, 0, index)
+            success = self.last_success.get(name, 0)
+            failure = self.last_failure.get(name, 0)
+            if now - success < self.memory and success >= failure:
+                return (0, -success, index)
+            if now - failure < self.memory:
+                return (2, 0, index)
+            return (1, 0, index)
+
+        return [s for _, s in sorted(enumerate(strategies), key=rank)]
+
+    def _better_running(self, running: Dict) -> bool:
+        return any(name not in self.last_resort for name in running.values())
+
+    def _record(self, name: str, ok: bool):
+        (self.last_success if ok else self.last_failure)[name] = time.time()
+        if ok:
+            self.stats["wins"][name] = self.stats["wins"].get(name, 0) + 1
+
+    # --- Async ---
+
+    async def run_async(self, strategies: List[Tuple[str, Callable]]):
+        """strategies: (name, zero-arg coroutine function). Returns the first
+        non-None answer, or None when every strategy came back empty."""
+        self.stats["runs"] += 1
+        pending_strategies = list(self.order(strategies))
+        running: Dict[asyncio.Task, str] = {}
+        fallback = None
+        launch = True
+        try:
+            while pending_strategies or running:
+                if pending_strategies and (launch or not running):
+                    name, factory = pending_strategies.pop(0)
+                    if running:
+                        self.stats["hedged"] += 1
+                    running[asyncio.ensure_future(self._traced(name, factory))] = name
+                timeout = self.hedge_delay if pending_strategies else None
+                done, _ = await asyncio.wait(list(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                launch = not done  # hedge delay elapsed
+                for task in done:
+                    name = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        print(f"[Hedge:{self.name}] {name} failed: {e}")
+                        result = None
+                    self._record(name, result is not None)
+                    if result is None:
+                        launch = True  # don't sit out the delay behind a strategy that already gave up
+                    elif name in self.last_resort and self._better_running(running):
+                        fallback = fallback or result
+                    else:
+                        return result
+            if fallback is not None:
+                return fallback
+            self.stats["exhausted"] += 1
+            return None
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def _traced(self, name: str, factory: Callable):
+        # Losers show up in the trace as cancelled spans
+        with span(f"hedge {self.name}:{name}"):
+            return await factory()
+
+    # --- Sync ---
+
+    def run(self, strategies: List[Tuple[str, Callable]]):
+        """Thread-based version of run_async for the sync (CLI) code paths.
+        Losers keep running in the background pool, their results are dropped."""
+        self.stats["runs"] += 1
+        pending_strategies = list(self.order(strategies))
+        executor = _get_executor()
+        running: Dict[concurrent.futures.Future, str] = {}
+        fallback = None
+        launch = True
+        try:
+            while pending_strategies or running:
+                if pending_strategies and (launch or not running):
+                    name, fn = pending_strategies.pop(0)
+                    if running:
+                        self.stats["hedged"] += 1
+                    running[executor.submit(fn)] = name
+                timeout = self.hedge_delay if pending_strategies else None
+                done, _ = concurrent.futures.wait(list(running), timeout=timeout,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                launch = not done
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"[Hedge:{self.name}] {name} failed: {e}")
+                        result = None
+                    self._record(name, result is not None)
+                    if result is None:
+                        launch = True
+                    elif name in self.last_resort and self._better_running(running):
+                        fallback = fallback or result
+                    else:
+                        return result
+            if fallback is not None:
+                return fallback
+            self.stats["exhausted"] += 1
+            return None
+        finally:
+            for future in running:
+                future.cancel()  # only helps if it hasn't started yet
+
+    def snapshot(self) -> Dict:
+        now = time.time()
+        return {
+            **self.stats,
+            "wins": dict(self.stats["wins"]),
+            "preferred": [name for name, t in sorted(self.last_success.items(), key=lambda kv: -kv[1])
+                          if now - t < self.memory and t >= self.last_failure.get(name, 0)
+                          and name not in self.last_resort],
+        }
+
+
+def get_hedged_chain(name: str, **kwargs) -> HedgedChain:
+    chain = _chains.get(name)
+    if chain is None:
+        chain = _chains[name] = HedgedChain(name, **kwargs)
+    return chain
+
+
+def hedge_stats() -> Dict:
+    return {name: chain.snapshot() for name, chain in _chains.items()}
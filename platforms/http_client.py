@@ -0,0 +1,268 @@
+"""
+Shared outbound HTTP layer for the platform classes.
+
+Every platform owns one HttpClient. The sync side is a pooled requests.Session
+(used by the CLI scripts), the async side is a lazily created httpx.AsyncClient
+with keep-alive so the web routes never block the event loop.
+"""
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+
+from .cache import get_response_cache
+from .cassette import get_cassette
+from .health import get_health_tracker
+from .metrics import HTTP_CACHE_LOOKUPS, METRICS_ENABLED, OUTBOUND_IN_FLIGHT, OUTBOUND_REQUESTS, OUTBOUND_SECONDS
+from .ratelimit import get_rate_limiter
+from .tracing import span
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# Max in-flight async requests per upstream host (keeps fan-outs polite)
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "6"))
+# Status codes meaning "slow down / you're blocked" (count as endpoint failures)
+HTTP_REJECT_STATUSES = {403, 412, 429}
+
+# All clients ever created, so the web app can close them on shutdown
+_clients: List["HttpClient"] = []
+
+
+class HttpClient:
+    """Pooled sync + async GET client. Headers are passed per call, like the
+    original `requests.get(url, headers=self.headers)` calls did.
+
+    `cache_ttls` maps endpoint URLs (without query) to seconds; responses
+    from those endpoints are served from the shared ResponseCache when
+    `is_cacheable(payload)` accepted them earlier.
+
+    Every real call is reported to the endpoint health tracker
+    (platforms/health.py); `is_rejected(payload)` lets a platform flag
+    risk-control answers that come back as HTTP 200. Calls to an endpoint
+    whose circuit is open raise CircuitOpenError without going out.
+
+    Before going out every call also waits for a token from the shared
+    per-host rate limiter (platforms/ratelimit.py), and rejections slow
+    that host down. Latency, outcome and cache lookups go to /metrics.
+
+    With HTTP_CASSETTE_MODE=record/replay the actual send is recorded to /
+    answered from a cassette (platforms/cassette.py); everything around it
+    (cache, limiter, breaker, metrics) behaves as usual.
+    """
+
+    def __init__(self, name: str, cache_ttls: Optional[Dict[str, float]] = None,
+                 is_cacheable: Optional[Callable[[Dict], bool]] = None,
+                 is_rejected: Optional[Callable[[Dict], bool]] = None, track_health: bool = True,
+                 rate_limit: bool = True, use_cassette: bool = True):
+        self.name = name
+        self.cache_ttls = cache_ttls or {}
+        self.is_cacheable = is_cacheable or (lambda data: True)
+        self.is_rejected = is_rejected
+        # Off for clients that hit arbitrary URLs (image proxy), not a fixed set of endpoints
+        self.health = get_health_tracker() if track_health else None
+        self.limiter = get_rate_limiter() if rate_limit else None
+        self.cache = get_response_cache() if self.cache_ttls else None
+        self.cassette = get_cassette() if use_cassette else None
+        self.session = requests.Session()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        _clients.append(self)
+
+    # --- Response Cache ---
+    def _cache_ttl(self, url: str, use_cache: bool) -> float:
+        if not use_cache or self.cache is None:
+            return 0
+        return self.cache_ttls.get(url.split("?", 1)[0], 0)
+
+    def _cached(self, url: str, params: Optional[Dict]):
+        cached = self.cache.get(url, params)
+        HTTP_CACHE_LOOKUPS.inc(platform=self.name, result="miss" if cached is None else "hit")
+        return cached
+
+    def _store(self, url: str, params: Optional[Dict], response, data, ttl: float):
+        # data: the body _decode already parsed, None if it isn't JSON (e.g. HTML challenge page)
+        if response.status_code == 200 and data is not None and self.is_cacheable(data):
+            self.cache.set(url, params, response.text, ttl)
+
+    def _decode(self, response, ttl: float):
+        """Parses a 200 JSON body once for _report and _store (HTML pages / images are skipped)."""
+        if response.status_code != 200 or not (ttl or self.is_rejected is not None or METRICS_ENABLED):
+            return None
+        content_type = response.headers.get("content-type", "")
+        if content_type and "json" not in content_type:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    # --- Endpoint Health / Rate Limit / Metrics ---
+    def _rejection(self, response, data) -> Optional[str]:
+        """Why the upstream told us off (blocked / slow down), or None."""
+        if response.status_code in HTTP_REJECT_STATUSES:
+            return f"HTTP {response.status_code}"
+        if self.is_rejected is not None and isinstance(data, dict) and self.is_rejected(data):
+            return f"code {data.get('code')}"
+        return None
+
+    def _metric_endpoint(self, url: str) -> str:
+        # Fixed API endpoints get their own series, arbitrary URLs (image proxy) only their host
+        parts = urlsplit(url)
+        return parts.path if self.health is not None else parts.netloc
+
+    def _report(self, url: str, started: float, response=None, error: Optional[Exception] = None, data=None):
+        latency = time.monotonic() - started
+        endpoint = self._metric_endpoint(url)
+        OUTBOUND_SECONDS.observe(latency, platform=self.name, endpoint=endpoint)
+        if error is not None:
+            OUTBOUND_REQUESTS.inc(platform=self.name, endpoint=endpoint, outcome=type(error).__name__)
+            if self.health is not None:
+                self.health.record(url, False, latency, type(error).__name__)
+            return
+        outcome = "success"
+        if response.status_code != 200:
+            outcome = f"http_{response.status_code}"
+        elif isinstance(data, dict):
+            # Bilibili answers with `code`, Douyin with `status_code`
+            code = data.get('code', data.get('status_code'))
+            if code not in (0, None):
+                outcome = f"code_{code}"
+        OUTBOUND_REQUESTS.inc(platform=self.name, endpoint=endpoint, outcome=outcome)
+        if self.health is None and self.limiter is None:
+            return
+        reason = self._rejection(response, data)
+        if self.limiter is not None:
+            # Only rejections slow the host down, a 5xx is not about our pace
+            self.limiter.feedback(url, reason is not None)
+        if self.health is not None:
+            if reason is None and response.status_code >= 500:
+                reason = f"HTTP {response.status_code}"
+            self.health.record(url, reason is None, latency, reason)
+
+    # --- Sync ---
+    def get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+            use_cache: bool = True, **kwargs):
+        ttl = self._cache_ttl(url, use_cache)
+        if ttl:
+            cached = self._cached(url, params)
+            if cached is not None:
+                return cached
+        kwargs.setdefault("timeout", HTTP_TIMEOUT)
+        if self.health is not None:
+            self.health.check(url)
+        if self.limiter is not None:
+            self.limiter.acquire(url)
+        started = time.monotonic()
+        OUTBOUND_IN_FLIGHT.inc(platform=self.name)
+        try:
+            if self.cassette is not None and self.cassette.replaying:
+                response = self.cassette.replay(url, params)
+            else:
+                response = self.session.get(url, params=params, headers=headers, **kwargs)
+                if self.cassette is not None:
+                    self.cassette.record(url, params, response, time.monotonic() - started)
+        except Exception as e:
+            self._report(url, started, error=e)
+            raise
+        finally:
+            OUTBOUND_IN_FLIGHT.dec(platform=self.name)
+        data = self._decode(response, ttl)
+        self._report(url, started, response, data=data)
+        if ttl:
+            self._store(url, params, response, data, ttl)
+        return response
+
+    # --- Async ---
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # httpx clients are bound to the loop they were created on, so rebuild
+        # if we are called from a different loop (e.g. asyncio.run in scripts)
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client.is_closed or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                timeout=HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+            self._async_loop = loop
+            self._host_slots = {}
+        return self._async_client
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(HTTP_PER_HOST_LIMIT)
+        return slot
+
+    async def aget(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                   use_cache: bool = True, **kwargs):
+        ttl = self._cache_ttl(url, use_cache)
+        if ttl:
+            cached = self._cached(url, params)
+            if cached is not None:
+                return cached
+        if self.health is not None:
+            self.health.check(url)
+        client = self.async_client
+        queued_at = started = time.monotonic()
+        with span(f"{self.name} GET {urlsplit(url).path}") as call_span:
+            try:
+                if self.limiter is not None:
+                    await self.limiter.acquire_async(url)
+                async with self._host_slot(url):
+                    started = time.monotonic()
+                    OUTBOUND_IN_FLIGHT.inc(platform=self.name)
+                    try:
+                        if self.cassette is not None and self.cassette.replaying:
+                            response = await self.cassette.replay_async(url, params)
+                        else:
+                            response = await client.get(url, params=params, headers=headers, **kwargs)
+                            if self.cassette is not None:
+                                self.cassette.record(url, params, response, time.monotonic() - started)
+                    finally:
+                        OUTBOUND_IN_FLIGHT.dec(platform=self.name)
+            except asyncio.CancelledError:
+                # e.g. lost a hedged race: says nothing about the endpoint
+                if self.health is not None:
+                    self.health.cancelled(url)
+                raise
+            except Exception as e:
+                self._report(url, started, error=e)
+                raise
+            if call_span:
+                # Time spent queued behind the rate limiter / host slot before going out
+                call_span.set(status=response.status_code, queued=round(started - queued_at, 3))
+        data = self._decode(response, ttl)
+        self._report(url, started, response, data=data)
+        if ttl:
+            self._store(url, params, response, data, ttl)
+        return response
+
+    async def aclose(self):
+        if self._async_client is not None and not self._async_client.is_closed:
+            await self._async_client.aclose()
+        self._async_client = None
+        self.session.close()
+
+
+async def aclose_all():
+    """Close every pooled client (called from the web app shutdown hook)."""
+    for client in _clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            print(f"[HttpClient] Close failed for {client.name}: {e}")
+    cassette = get_cassette()
+    if cassette is not None:
+        cassette.close()
@@ -0,0 +1,143 @@
+"""
+Import-cost profiler for web_app startup.
+
+install() puts a thin finder in front of sys.meta_path that times every
+module load from then on (like `python -X importtime`, but always on and
+readable at runtime). Loads before mark_started() count as startup, later
+ones as lazy (first use of Douyin, OpenCV, Playwright...). /debug/startup
+shows the report, and the heaviest startup packages are printed once the
+app is up.
+
+Only the finder lookup and two perf_counter() calls per module are added,
+and already-imported modules never reach it. Set IMPORT_PROFILE=0 to skip it.
+"""
+import importlib.abc
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+IMPORT_PROFILE = os.getenv("IMPORT_PROFILE", "1") != "0"
+
+_installed_at: Optional[float] = None
+_started_at: Optional[float] = None
+# module -> {"self": s, "total": s, "phase": "startup"|"lazy"}
+_modules: Dict[str, Dict] = {}
+_local = threading.local()
+
+
+class _TimedLoader:
+    """Wraps a module's loader; everything but create/exec passes through."""
+
+    def __init__(self, loader, name: str):
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        # Extension modules (cv2, numpy core) do their real work here
+        with _timed(self._name):
+            return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with _timed(self._name):
+            self._loader.exec_module(module)
+
+
+class _timed:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        # [name, started, time spent in nested imports]
+        stack.append([self.name, time.perf_counter(), 0.0])
+
+    def __exit__(self, *exc):
+        name, started, children = _local.stack.pop()
+        total = time.perf_counter() - started
+        if _local.stack:
+            _local.stack[-1][2] += total
+        entry = _modules.setdefault(name, {"self": 0.0, "total": 0.0,
+                                           "phase": "startup" if _started_at is None else "lazy"})
+        entry["self"] += total - children
+        entry["total"] += total
+        return False
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        if getattr(_local, "finding", False):
+            return None
+        _local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, fullname)
+                    return spec
+            return None
+        finally:
+            _local.finding = False
+
+
+def install():
+    global _installed_at
+    if not IMPORT_PROFILE or _installed_at is not None:
+        return
+    _installed_at = time.perf_counter()
+    sys.meta_path.insert(0, _TimingFinder())
+
+
+def mark_started():
+    """Startup is over: imports from now on are lazy ones."""
+    global _started_at
+    if _installed_at is not None and _started_at is None:
+        _started_at = time.perf_counter()
+
+
+def _packages(phase: str) -> List[Dict]:
+    # Self time summed per top-level package (fastapi, cv2, playwright...)
+    totals: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for name, entry in list(_modules.items()):
+        if entry["phase"] != phase:
+            continue
+        package = name.split(".", 1)[0]
+        totals[package] = totals.get(package, 0.0) + entry["self"]
+        counts[package] = counts.get(package, 0) + 1
+    return [{"package": p, "seconds": round(s, 4), "modules": counts[p]}
+            for p, s in sorted(totals.items(), key=lambda kv: -kv[1])]
+
+
+def report(top: int = 30) -> Dict:
+    if _installed_at is None:
+        return {"enabled": False}
+    modules = sorted(_modules.items(), key=lambda kv: -kv[1]["total"])
+    return {
+        "enabled": True,
+        "startup_seconds": round(_started_at - _installed_at, 3) if _started_at else None,
+        "startup_import_seconds": round(sum(e["self"] for e in _modules.values() if e["phase"] == "startup"), 3),
+        "lazy_import_seconds": round(sum(e["self"] for e in _modules.values() if e["phase"] == "lazy"), 3),
+        "startup_packages": _packages("startup")[:top],
+        "lazy_packages": _packages("lazy")[:top],
+        "slowest_modules": [{"module": name, "total": round(e["total"], 4), "self": round(e["self"], 4),
+                             "phase": e["phase"]} for name, e in modules[:top]],
+    }
+
+
+def print_summary(top: int = 8):
+    summary = report(top)
+    if not summary.get("enabled"):
+        return
+    heaviest = ", ".join(f"{p['package']} {p['seconds'] * 1000:.0f}ms" for p in summary["startup_packages"])
+    print(f"[Startup] Ready in {summary['startup_seconds']}s "
+          f"({summary['startup_import_seconds']}s imports). Heaviest: {heaviest}")
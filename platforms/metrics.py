@@ -0,0 +1,170 @@
+"""
+Minimal Prometheus-style metrics (text exposition format, no extra dependency).
+
+Counters, gauges and histograms live in one process-wide registry and are
+rendered by the web app's /metrics route. Updates are a dict lookup plus a
+few additions under a lock, cheap enough to leave on everywhere.
+
+Label values that would explode the number of series (e.g. one path per
+Douyin share link) are folded into "other" once a metric has
+METRICS_MAX_SERIES series.
+"""
+import bisect
+import os
+import threading
+from typing import Dict, List, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_MAX_SERIES = int(os.getenv("METRICS_MAX_SERIES", "500"))
+
+# Seconds; covers fast cache-backed routes up to slow /analyze runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._series: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        if key not in self._series and len(self._series) >= METRICS_MAX_SERIES:
+            key = ("other",) * len(self.labels)
+        return key
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key: Tuple, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            key = self._key(labels)
+            series = self._series.get(key)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum]
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def _render_series(self, key: Tuple, value) -> List[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound) if bound != float("inf") else "+Inf"}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {round(total, 6)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """Every registered metric in Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Shared metrics ---
+
+OUTBOUND_REQUESTS = Counter(
+    "outbound_requests_total", "Outbound API calls by outcome (success, code_<api code>, http_<status>, exception name)",
+    ("platform", "endpoint", "outcome"))
+OUTBOUND_SECONDS = Histogram(
+    "outbound_request_seconds", "Outbound API call latency", ("platform", "endpoint"))
+OUTBOUND_IN_FLIGHT = Gauge(
+    "outbound_requests_in_flight", "Outbound API calls currently waiting on the network", ("platform",))
+HTTP_CACHE_LOOKUPS = Counter(
+    "http_cache_lookups_total", "Response cache lookups made by the platform clients", ("platform", "result"))
+
+ROUTE_SECONDS = Histogram(
+    "http_request_seconds", "Web route latency (until the response starts)", ("route", "method", "status"))
+ROUTE_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Web requests currently being handled")
+
+CACHE_HIT_RATIO = Gauge(
+    "cache_hit_ratio", "Hit ratio of the shared caches since start", ("cache",))
+CACHE_EVENTS = Counter(
+    "cache_events_total", "Raw cache counters (hits, misses, stores, evictions...)", ("cache", "event"))
+
+
+def set_counter(counter: Counter, value: float, **labels):
+    """Mirror an externally kept running total (e.g. a stats dict) into a counter."""
+    if not METRICS_ENABLED:
+        return
+    with counter._lock:
+        counter._series[counter._key(labels)] = value
@@ -0,0 +1,162 @@
+"""
+Shared per-host token-bucket rate limiter with adaptive (AIMD) backoff.
+
+Every outbound API call takes a token from its host's bucket first (sync
+callers sleep, async callers await). Rates come from RATE_LIMITS, e.g.
+
+    RATE_LIMITS="api.bilibili.com=8:16,www.douyin.com=3:6"   # host=rate/s:burst
+
+and RATE_LIMIT_DEFAULT for every other host. When a host starts rejecting us
+(HTTP 412/429, risk-control codes) its rate is cut by RATE_LIMIT_BACKOFF,
+and every successful call adds a little back (RATE_LIMIT_RECOVERY of the
+configured rate) until it is at the configured rate again.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "10:20")
+RATE_LIMITS = os.getenv("RATE_LIMITS", "api.bilibili.com=8:16,www.douyin.com=4:8")
+# Multiply the rate by this on a rejection...
+RATE_LIMIT_BACKOFF = float(os.getenv("RATE_LIMIT_BACKOFF", "0.5"))
+# ...and add this fraction of the configured rate back per success
+RATE_LIMIT_RECOVERY = float(os.getenv("RATE_LIMIT_RECOVERY", "0.02"))
+# Never go below this fraction of the configured rate
+RATE_LIMIT_FLOOR = float(os.getenv("RATE_LIMIT_FLOOR", "0.05"))
+
+
+def _parse_spec(spec: str) -> Tuple[float, float]:
+    rate, _, burst = spec.partition(":")
+    rate = float(rate)
+    return rate, float(burst) if burst else max(1.0, rate)
+
+
+def _parse_limits(config: str) -> Dict[str, Tuple[float, float]]:
+    limits = {}
+    for entry in config.split(","):
+        host, _, spec = entry.strip().partition("=")
+        if host and spec:
+            limits[host] = _parse_spec(spec)
+    return limits
+
+
+class TokenBucket:
+    def __init__(self, host: str, rate: float, burst: float):
+        self.host = host
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "waited": 0, "wait_seconds": 0.0, "backoffs": 0, "refunded": 0}
+
+    def _reserve(self) -> float:
+        """Take a token (possibly going into debt) and return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.stats["acquired"] += 1
+            if wait:
+                self.stats["waited"] += 1
+                self.stats["wait_seconds"] += wait
+            return wait
+
+    def _refund(self, wait: float):
+        """Give back a reserved token whose caller never made the request."""
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+            self.stats["acquired"] -= 1
+            self.stats["waited"] -= 1
+            self.stats["wait_seconds"] -= wait
+            self.stats["refunded"] += 1
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Hedged loser / disconnected client: don't push everyone after us back
+                self._refund(wait)
+                raise
+
+    def on_rejected(self):
+        with self._lock:
+            self.rate = max(self.max_rate * RATE_LIMIT_FLOOR, self.rate * RATE_LIMIT_BACKOFF)
+            # Drop the saved-up burst too, it is what got us rejected
+            self.tokens = min(self.tokens, 0.0)
+            self.stats["backoffs"] += 1
+        print(f"[RateLimit] {self.host} rejected us, slowing to {self.rate:.2f} req/s")
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_LIMIT_RECOVERY)
+
+    def snapshot(self) -> Dict:
+        return {
+            **self.stats,
+            "wait_seconds": round(self.stats["wait_seconds"], 3),
+            "rate": round(self.rate, 3),
+            "max_rate": self.max_rate,
+            "burst": self.burst,
+        }
+
+
+class RateLimiter:
+    def __init__(self, limits: str = RATE_LIMITS, default: str = RATE_LIMIT_DEFAULT):
+        self.limits = _parse_limits(limits)
+        self.default = _parse_spec(default)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(host)
+                if bucket is None:
+                    rate, burst = self.limits.get(host, self.default)
+                    bucket = self._buckets[host] = TokenBucket(host, rate, burst)
+        return bucket
+
+    def acquire(self, url: str):
+        if RATE_LIMIT_ENABLED:
+            self.bucket(url).acquire()
+
+    async def acquire_async(self, url: str):
+        if RATE_LIMIT_ENABLED:
+            await self.bucket(url).acquire_async()
+
+    def feedback(self, url: str, rejected: bool):
+        if not RATE_LIMIT_ENABLED:
+            return
+        bucket = self.bucket(url)
+        if rejected:
+            bucket.on_rejected()
+        else:
+            bucket.on_success()
+
+    def snapshot(self) -> Dict:
+        return {host: b.snapshot() for host, b in sorted(self._buckets.items())}
+
+
+_limiter = RateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    return _limiter
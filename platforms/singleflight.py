@@ -0,0 +1,90 @@
+"""
+In-process single-flight for the async platform methods.
+
+When two users analyze the same track at once (or a popular /creator page is
+hit repeatedly) the same search / card / arc-search call would go out several
+times in parallel. Methods decorated with @coalesce share one in-flight task
+per (instance, method, arguments): the first caller runs it, everyone who
+arrives before it finishes awaits the same result.
+
+Only concurrent calls are merged, there is no caching here (that is the
+ResponseCache's job).
+"""
+import asyncio
+import copy
+import functools
+import os
+from typing import Dict, Hashable
+
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "1") != "0"
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, list] = {}  # key -> [task, followers]
+        # per method: {"calls": n, "coalesced": n}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, name: str, field: str):
+        entry = self.stats.setdefault(name, {"calls": 0, "coalesced": 0})
+        entry[field] += 1
+
+    async def do(self, key: Hashable, name: str, coro_factory):
+        self._count(name, "calls")
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self._count(name, "coalesced")
+            flight[1] += 1
+        else:
+            task = asyncio.ensure_future(coro_factory())
+            flight = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shielded so one caller disconnecting doesn't cancel it for the others
+        result = await asyncio.shield(flight[0])
+        # Callers are free to mutate what they get back, so don't hand out the same object twice
+        return copy.deepcopy(result) if flight[1] else result
+
+    def snapshot(self) -> Dict:
+        calls = sum(s["calls"] for s in self.stats.values())
+        coalesced = sum(s["coalesced"] for s in self.stats.values())
+        return {
+            "calls": calls,
+            "coalesced": coalesced,
+            "coalesced_ratio": round(coalesced / calls, 3) if calls else 0.0,
+            "inflight": len(self._inflight),
+            "methods": {name: dict(s) for name, s in self.stats.items()},
+        }
+
+
+_singleflight = SingleFlight()
+
+
+def get_singleflight() -> SingleFlight:
+    return _singleflight
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def coalesce(func):
+    """Decorator for `async def method(self, ...)` on a platform class."""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        if not SINGLEFLIGHT_ENABLED:
+            return await func(self, *args, **kwargs)
+        key = (id(self), name, _freeze(args), _freeze(kwargs))
+        try:
+            hash(key)
+        except TypeError:
+            return await func(self, *args, **kwargs)
+        return await _singleflight.do(key, name, lambda: func(self, *args, **kwargs))
+
+    return wrapper
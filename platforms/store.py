@@ -0,0 +1,347 @@
+"""
+Local store for everything we learn about creators.
+
+SQLite (WAL) with four tables:
+- creators:  latest profile per (platform, mid) + when its videos were last refreshed / sampled
+- videos:    every video we have seen, updated in place (latest play count)
+- snapshots: one row per analysis (fans / avg views / posting frequency at that time)
+- video_samples: compact (video, hour-ish timestamp) -> play/like time series,
+  filled by the background collector in platforms/collector.py
+
+The platforms write to it from their user-info and recent-videos methods.
+Recent-videos refreshes are incremental (see IncrementalRefresh): when we
+already know a creator we page newest-first with a small page size and stop
+as soon as we reach a video we have stored, then answer from the store.
+"""
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+CREATOR_STORE_ENABLED = os.getenv("CREATOR_STORE_ENABLED", "1") != "0"
+CREATOR_STORE_DB = Path(os.getenv("CREATOR_STORE_DB", ".cache/creators.sqlite3"))
+# Serve recent videos straight from the store if refreshed this recently
+CREATOR_STORE_FRESH_SECONDS = int(os.getenv("CREATOR_STORE_FRESH_SECONDS", "600"))
+# Page size for refreshes of creators we already know (usually only 0-2 new videos)
+CREATOR_STORE_PAGE_SIZE = int(os.getenv("CREATOR_STORE_PAGE_SIZE", "5"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS creators (
+    platform TEXT NOT NULL, mid TEXT NOT NULL,
+    name TEXT, fans INTEGER, sign TEXT, avatar TEXT,
+    updated_at REAL, videos_refreshed_at REAL, sampled_at REAL,
+    PRIMARY KEY (platform, mid)
+);
+CREATE TABLE IF NOT EXISTS videos (
+    platform TEXT NOT NULL, bvid TEXT NOT NULL, mid TEXT NOT NULL,
+    title TEXT, play INTEGER, created INTEGER, pic TEXT, length TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (platform, bvid)
+);
+CREATE INDEX IF NOT EXISTS videos_by_creator ON videos(platform, mid, created DESC);
+CREATE TABLE IF NOT EXISTS snapshots (
+    platform TEXT NOT NULL, mid TEXT NOT NULL, fetched_at REAL NOT NULL,
+    fans INTEGER, avg_views INTEGER, weekly_freq REAL, video_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS snapshots_by_creator ON snapshots(platform, mid, fetched_at);
+CREATE TABLE IF NOT EXISTS video_samples (
+    platform TEXT NOT NULL, bvid TEXT NOT NULL, ts INTEGER NOT NULL,
+    play INTEGER, likes INTEGER,
+    PRIMARY KEY (platform, bvid, ts)
+) WITHOUT ROWID;
+"""
+
+# Columns added after the first release of the schema: (table, column, type)
+MIGRATIONS = [
+    ("creators", "sampled_at", "REAL"),
+]
+
+VIDEO_FIELDS = ("bvid", "title", "play", "created", "pic", "length")
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None  # e.g. fans shown as "1.2w" or "未知"
+
+
+class CreatorStore:
+    def __init__(self, db_path: Path = CREATOR_STORE_DB):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        for table, column, kind in MIGRATIONS:
+            columns = {r[1] for r in self._db.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+        self._lock = threading.Lock()
+
+    def _execute(self, sql: str, args: Iterable = ()):
+        with self._lock:
+            return self._db.execute(sql, tuple(args)).fetchall()
+
+    # --- Creators ---
+
+    def upsert_creator(self, platform: str, info: Dict):
+        if not info or not info.get('mid'):
+            return
+        self._execute(
+            "INSERT INTO creators (platform, mid, name, fans, sign, avatar, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(platform, mid) DO UPDATE SET name = excluded.name, fans = COALESCE(excluded.fans, fans),"
+            " sign = excluded.sign, avatar = excluded.avatar, updated_at = excluded.updated_at",
+            (platform, str(info['mid']), info.get('name'), _int_or_none(info.get('fans')),
+             info.get('sign'), info.get('avatar'), time.time()),
+        )
+
+    def get_creator(self, platform: str, mid) -> Optional[Dict]:
+        rows = self._execute("SELECT * FROM creators WHERE platform = ? AND mid = ?", (platform, str(mid)))
+        return dict(rows[0]) if rows else None
+
+    # --- Videos ---
+
+    def upsert_videos(self, platform: str, mid, videos: List[Dict]):
+        now = time.time()
+        rows = [(platform, v['bvid'], str(mid), v.get('title'), _int_or_none(v.get('play')),
+                 _int_or_none(v.get('created')), v.get('pic'), v.get('length'), now) for v in videos]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT INTO videos (platform, bvid, mid, title, play, created, pic, length, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(platform, bvid) DO UPDATE SET title = excluded.title, play = excluded.play,"
+                    " pic = excluded.pic, length = excluded.length, updated_at = excluded.updated_at",
+                    rows,
+                )
+                self._db.execute(
+                    "INSERT INTO creators (platform, mid, videos_refreshed_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT(platform, mid) DO UPDATE SET videos_refreshed_at = excluded.videos_refreshed_at",
+                    (platform, str(mid), now),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def recent_videos(self, platform: str, mid, limit: int) -> List[Dict]:
+        rows = self._execute(
+            f"SELECT {', '.join(VIDEO_FIELDS)} FROM videos WHERE platform = ? AND mid = ?"
+            " ORDER BY created DESC LIMIT ?",
+            (platform, str(mid), limit),
+        )
+        return [dict(r) for r in rows]
+
+    def latest_created(self, platform: str, mid) -> Optional[int]:
+        rows = self._execute("SELECT MAX(created) FROM videos WHERE platform = ? AND mid = ?", (platform, str(mid)))
+        return rows[0][0] if rows else None
+
+    def known_ids(self, platform: str, ids: List[str]) -> set:
+        if not ids:
+            return set()
+        marks = ",".join("?" * len(ids))
+        rows = self._execute(f"SELECT bvid FROM videos WHERE platform = ? AND bvid IN ({marks})", [platform, *ids])
+        return {r[0] for r in rows}
+
+    def videos_refreshed_at(self, platform: str, mid) -> float:
+        rows = self._execute("SELECT videos_refreshed_at FROM creators WHERE platform = ? AND mid = ?",
+                             (platform, str(mid)))
+        return (rows[0][0] or 0.0) if rows else 0.0
+
+    # --- Snapshots ---
+
+    def add_snapshot(self, platform: str, mid, stats: Dict, fans=None, video_count: int = 0):
+        if fans is None:
+            creator = self.get_creator(platform, mid)
+            fans = creator['fans'] if creator else None
+        self._execute(
+            "INSERT INTO snapshots (platform, mid, fetched_at, fans, avg_views, weekly_freq, video_count)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (platform, str(mid), time.time(), _int_or_none(fans), _int_or_none(stats.get('avg_views_5')),
+             stats.get('weekly_freq'), video_count),
+        )
+
+    def snapshots(self, platform: str, mid, limit: int = 100) -> List[Dict]:
+        rows = self._execute(
+            "SELECT fetched_at, fans, avg_views, weekly_freq, video_count FROM snapshots"
+            " WHERE platform = ? AND mid = ? ORDER BY fetched_at DESC LIMIT ?",
+            (platform, str(mid), limit),
+        )
+        return [dict(r) for r in rows]
+
+    # --- View Samples ---
+
+    def due_for_sampling(self, tracked_since: int, sampled_before: float, limit: int) -> List[tuple]:
+        """(platform, mid) of creators with videos newer than tracked_since,
+        least recently sampled first."""
+        rows = self._execute(
+            "SELECT c.platform, c.mid FROM creators c"
+            " WHERE COALESCE(c.sampled_at, 0) < ? AND EXISTS (SELECT 1 FROM videos v"
+            "   WHERE v.platform = c.platform AND v.mid = c.mid AND v.created >= ?)"
+            " ORDER BY COALESCE(c.sampled_at, 0) LIMIT ?",
+            (sampled_before, tracked_since, limit),
+        )
+        return [(r[0], r[1]) for r in rows]
+
+    def add_samples(self, platform: str, mid, videos: List[Dict], tracked_since: int):
+        """Append one sample per tracked video and bump the stored play counts."""
+        now = time.time()
+        samples = [(platform, v['bvid'], int(now), _int_or_none(v.get('play')), _int_or_none(v.get('like')))
+                   for v in videos if (_int_or_none(v.get('created')) or 0) >= tracked_since]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO video_samples (platform, bvid, ts, play, likes) VALUES (?, ?, ?, ?, ?)",
+                    samples,
+                )
+                self._db.executemany(
+                    "UPDATE videos SET play = ?, updated_at = ? WHERE platform = ? AND bvid = ?",
+                    [(s[3], now, platform, s[1]) for s in samples if s[3] is not None],
+                )
+                self._db.execute(
+                    "INSERT INTO creators (platform, mid, sampled_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT(platform, mid) DO UPDATE SET sampled_at = excluded.sampled_at",
+                    (platform, str(mid), now),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return len(samples)
+
+    def mark_sampled(self, platform: str, mid):
+        # Failed samples still move to the back of the queue
+        self._execute("UPDATE creators SET sampled_at = ? WHERE platform = ? AND mid = ?",
+                      (time.time(), platform, str(mid)))
+
+    def video_curve(self, platform: str, bvid: str, since: float = 0) -> List[Dict]:
+        rows = self._execute(
+            "SELECT ts, play, likes FROM video_samples WHERE platform = ? AND bvid = ? AND ts >= ? ORDER BY ts",
+            (platform, bvid, since),
+        )
+        return [dict(r) for r in rows]
+
+    def creator_curve(self, platform: str, mid, since: float = 0) -> List[Dict]:
+        """Total plays of the creator's tracked videos per hour bucket."""
+        rows = self._execute(
+            "SELECT bucket, SUM(play) AS play, SUM(likes) AS likes FROM ("
+            "  SELECT (s.ts / 3600) * 3600 AS bucket, s.bvid, MAX(s.play) AS play, MAX(s.likes) AS likes"
+            "  FROM video_samples s JOIN videos v ON v.platform = s.platform AND v.bvid = s.bvid"
+            "  WHERE s.platform = ? AND v.mid = ? AND s.ts >= ? GROUP BY bucket, s.bvid"
+            ") GROUP BY bucket ORDER BY bucket",
+            (platform, str(mid), since),
+        )
+        return [{"ts": r[0], "play": r[1], "likes": r[2]} for r in rows]
+
+    def creator_video_ids(self, platform: str, mid, tracked_since: int) -> List[str]:
+        rows = self._execute("SELECT bvid FROM videos WHERE platform = ? AND mid = ? AND created >= ?"
+                             " ORDER BY created DESC", (platform, str(mid), tracked_since))
+        return [r[0] for r in rows]
+
+    def snapshot(self) -> Dict:
+        counts = {}
+        for table in ("creators", "videos", "snapshots", "video_samples"):
+            counts[table] = self._execute(f"SELECT COUNT(*) FROM {table}")[0][0]
+        return counts
+
+
+class IncrementalRefresh:
+    """Paging plan for one recent-videos refresh.
+
+        refresh = IncrementalRefresh(store, "bilibili", mid, limit)
+        if refresh.cached is not None: return refresh.cached
+        for page in range(refresh.max_pages):
+            videos = fetch(page, refresh.page_size)
+            if videos is None or not refresh.feed(videos): break
+        return refresh.finish()
+
+    Async callers use `await IncrementalRefresh.create_async(...)`, `feed_async`
+    and `finish_async`, which run the same sqlite work in a thread so one
+    creator's refresh doesn't stall every other request on the event loop.
+    """
+
+    def __init__(self, store: Optional[CreatorStore], platform: str, mid, limit: int):
+        self.store = store
+        self.platform = platform
+        self.mid = mid
+        self.limit = limit
+        self.collected: List[Dict] = []
+        self.cached = None
+        self.newest = None
+        self.stored_ids = set()
+        if store is not None:
+            stored = store.recent_videos(platform, mid, limit)
+            fresh = time.time() - store.videos_refreshed_at(platform, mid) < CREATOR_STORE_FRESH_SECONDS
+            if stored and fresh:
+                self.cached = stored
+            elif stored:
+                self.newest = stored[0]['created']
+                self.stored_ids = {v['bvid'] for v in stored}
+
+        # Unknown creator: one full page, same as before. Known: small pages until we catch up.
+        self.page_size = limit if self.newest is None else min(limit, CREATOR_STORE_PAGE_SIZE)
+        self.max_pages = math.ceil(limit / self.page_size) if self.page_size else 1
+
+    @classmethod
+    async def create_async(cls, store: Optional[CreatorStore], platform: str, mid, limit: int) -> "IncrementalRefresh":
+        return await asyncio.to_thread(cls, store, platform, mid, limit)
+
+    def feed(self, videos: List[Dict]) -> bool:
+        """Add one page. Returns True if the next page is still needed."""
+        self.collected.extend(videos)
+        more = len(videos) >= self.page_size and len(self.collected) < self.limit
+        if self.newest is None:
+            return more
+        caught_up = (any(_int_or_none(v.get('created')) is not None and int(v['created']) <= self.newest for v in videos)
+                     or self.store.known_ids(self.platform, [v['bvid'] for v in videos]))
+        # Only stop once stored + fetched cover `limit`: a short stored history gets topped up from older pages
+        if caught_up and len(self.stored_ids | {v['bvid'] for v in self.collected}) >= self.limit:
+            return False
+        return more
+
+    async def feed_async(self, videos: List[Dict]) -> bool:
+        if self.newest is None:
+            return self.feed(videos)
+        return await asyncio.to_thread(self.feed, videos)
+
+    def finish(self) -> List[Dict]:
+        if self.store is None:
+            return self.collected[:self.limit]
+        if self.collected:
+            try:
+                self.store.upsert_videos(self.platform, self.mid, self.collected)
+            except sqlite3.Error as e:
+                print(f"[CreatorStore] Write failed: {e}")
+                return self.collected[:self.limit]
+        # Stored rows cover older videos we didn't refetch (and API failures)
+        return self.store.recent_videos(self.platform, self.mid, self.limit)
+
+    async def finish_async(self) -> List[Dict]:
+        if self.store is None:
+            return self.finish()
+        return await asyncio.to_thread(self.finish)
+
+
+_store: Optional[CreatorStore] = None
+
+
+def get_creator_store() -> Optional[CreatorStore]:
+    """Process-wide store (None when disabled or the DB can't be opened)."""
+    global _store
+    if not CREATOR_STORE_ENABLED:
+        return None
+    if _store is None:
+        try:
+            _store = CreatorStore()
+        except sqlite3.Error as e:
+            print(f"[CreatorStore] Disabled: {e}")
+            return None
+    return _store
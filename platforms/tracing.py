@@ -0,0 +1,178 @@
+"""
+Lightweight per-request tracing for the analyze pipeline.
+
+A trace is opened around one /analyze request (or job / SSE stream); spans
+opened anywhere below it nest automatically through a contextvar, which
+asyncio copies into every task created under it, so the concurrent
+per-candidate pipelines each hang off the request. Finished traces stay in
+a bounded ring buffer (TRACE_BUFFER_SIZE) and are rendered as a waterfall
+on /debug/traces.
+
+Outside a trace `span()` is a no-op, so library code can be instrumented
+unconditionally.
+"""
+import contextvars
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") != "0"
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "100"))
+# Spans beyond this are dropped (a runaway fan-out shouldn't eat the buffer)
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "2000"))
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace", "id", "parent_id", "name", "attrs", "start", "end", "error")
+
+    def __init__(self, trace: "Trace", span_id: int, parent_id: Optional[int], name: str, attrs: Dict):
+        self.trace = trace
+        self.id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter() - trace.t0
+        self.end = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter() - self.trace.t0
+
+
+class Trace:
+    def __init__(self, name: str, attrs: Dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self.root = self.start_span(name, None, attrs)
+
+    def start_span(self, name: str, parent_id: Optional[int], attrs: Dict) -> Optional[Span]:
+        with self._lock:
+            if len(self.spans) >= TRACE_MAX_SPANS:
+                self.dropped += 1
+                return None
+            span = Span(self, len(self.spans), parent_id, name, attrs)
+            self.spans.append(span)
+            return span
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.root.end
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "attrs": self.root.attrs,
+            "started_at": self.started_at,
+            "duration": round(self.duration, 3) if self.duration is not None else None,
+            "error": self.root.error,
+            "spans": len(self.spans),
+        }
+
+    def to_dict(self) -> Dict:
+        """Spans in waterfall order (depth-first, siblings by start time)."""
+        children: Dict[Optional[int], List[Span]] = {}
+        for span in self.spans:
+            children.setdefault(span.parent_id, []).append(span)
+        ordered = []
+
+        def walk(span: Span, depth: int):
+            end = span.end if span.end is not None else time.perf_counter() - self.t0
+            ordered.append({
+                "id": span.id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "depth": depth,
+                "start": round(span.start, 4),
+                "duration": round(end - span.start, 4),
+                "open": span.end is None,
+                "error": span.error,
+                "attrs": span.attrs,
+            })
+            for child in sorted(children.get(span.id, []), key=lambda s: s.start):
+                walk(child, depth + 1)
+
+        walk(self.root, 0)
+        return {**self.summary(), "dropped": self.dropped, "spans": ordered}
+
+
+class Tracer:
+    def __init__(self, size: int = TRACE_BUFFER_SIZE):
+        self._traces = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, name: str, **attrs):
+        """Open a new trace (the root span) for the current request."""
+        if not TRACE_ENABLED:
+            yield None
+            return
+        trace = Trace(name, attrs)
+        with self._lock:
+            self._traces.append(trace)
+        with _activate(trace.root) as root:
+            yield root
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            for trace in self._traces:
+                if trace.id == trace_id:
+                    return trace
+        return None
+
+    def recent(self) -> List[Dict]:
+        with self._lock:
+            traces = list(self._traces)
+        return [t.summary() for t in reversed(traces)]
+
+
+@contextmanager
+def _activate(span: Span):
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = type(e).__name__
+        raise
+    finally:
+        span.finish()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Closed from another context (e.g. an abandoned stream being
+            # finalized), nothing of ours to restore there
+            pass
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Child span of whatever span is current; no-op outside a trace."""
+    parent = _current_span.get()
+    child = parent.trace.start_span(name, parent.id, attrs) if parent is not None else None
+    if child is None:
+        yield None
+        return
+    with _activate(child):
+        yield child
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
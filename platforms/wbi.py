@@ -0,0 +1,165 @@
+"""
+WBI signing key cache for BilibiliPlatform.
+
+img_key/sub_key (and the mixin key derived from them) only rotate about once a
+day, so instead of hitting /x/web-interface/nav before every signed request we
+keep them for WBI_KEY_TTL seconds, refresh in the background shortly before
+they expire and persist them to disk so restarted workers start warm.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+WBI_KEY_TTL = int(os.getenv("WBI_KEY_TTL", str(6 * 3600)))
+# Start a background refresh once the keys are this close to expiry
+WBI_REFRESH_AHEAD = int(os.getenv("WBI_REFRESH_AHEAD", "600"))
+WBI_KEY_CACHE_FILE = Path(os.getenv("WBI_KEY_CACHE_FILE", ".cache/wbi_keys.json"))
+
+# API codes meaning "your w_rid is wrong" -> keys rotated under us
+WBI_SIGNATURE_ERROR_CODES = {-403}
+
+
+class WbiKeyManager:
+    """Caches WBI keys for one BilibiliPlatform instance.
+
+    The platform provides the actual nav fetchers (`_fetch_wbi_keys` and
+    `_fetch_wbi_keys_async`) and `get_mixin_key`; this class only decides
+    when to call them.
+    """
+
+    def __init__(self, platform, ttl: int = WBI_KEY_TTL, refresh_ahead: int = WBI_REFRESH_AHEAD,
+                 cache_file: Optional[Path] = WBI_KEY_CACHE_FILE):
+        self.platform = platform
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl)
+        self.cache_file = cache_file
+        self.img_key = None
+        self.sub_key = None
+        self.mixin_key = None
+        self.fetched_at = 0.0
+        self._sync_lock = threading.Lock()
+        self._async_lock = None
+        self._refreshing = False
+        # Background refresh task, referenced so the loop can't collect it mid-refresh
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._load()
+
+    # --- State ---
+
+    def _set(self, img_key, sub_key, fetched_at=None):
+        self.img_key, self.sub_key = img_key, sub_key
+        self.mixin_key = self.platform.get_mixin_key(img_key + sub_key)
+        self.fetched_at = fetched_at or time.time()
+
+    def _age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def _is_valid(self) -> bool:
+        return bool(self.img_key) and self._age() < self.ttl
+
+    def _needs_refresh(self) -> bool:
+        return self._age() >= self.ttl - self.refresh_ahead
+
+    def invalidate(self):
+        """Drop cached keys (e.g. after the API rejected a signature)."""
+        self.fetched_at = 0.0
+
+    def is_signature_error(self, response) -> bool:
+        try:
+            return response.json().get('code') in WBI_SIGNATURE_ERROR_CODES
+        except Exception:
+            return False
+
+    def get_mixin_key(self, img_key: str, sub_key: str) -> str:
+        if self.mixin_key and (img_key, sub_key) == (self.img_key, self.sub_key):
+            return self.mixin_key
+        return self.platform.get_mixin_key(img_key + sub_key)
+
+    # --- Disk Persistence ---
+
+    def _load(self):
+        if not self.cache_file or not self.cache_file.exists():
+            return
+        try:
+            data = json.loads(self.cache_file.read_text())
+            if time.time() - data['fetched_at'] < self.ttl:
+                self._set(data['img_key'], data['sub_key'], data['fetched_at'])
+                print(f"[WBI] Loaded cached keys from '{self.cache_file}'")
+        except Exception as e:
+            print(f"[WBI] Ignoring unreadable key cache: {e}")
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps({
+                "img_key": self.img_key,
+                "sub_key": self.sub_key,
+                "fetched_at": self.fetched_at,
+            }))
+            tmp.replace(self.cache_file)
+        except Exception as e:
+            print(f"[WBI] Failed to persist keys: {e}")
+
+    def _store(self, keys: Tuple) -> Tuple:
+        img_key, sub_key = keys
+        if img_key and sub_key:
+            self._set(img_key, sub_key)
+            self._save()
+        return keys
+
+    # --- Sync Access ---
+
+    def get_keys(self) -> Tuple:
+        if self._is_valid():
+            if self._needs_refresh() and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh_in_thread, daemon=True).start()
+            return self.img_key, self.sub_key
+
+        with self._sync_lock:
+            if self._is_valid():
+                return self.img_key, self.sub_key
+            return self._store(self.platform._fetch_wbi_keys())
+
+    def _refresh_in_thread(self):
+        try:
+            with self._sync_lock:
+                self._store(self.platform._fetch_wbi_keys())
+        finally:
+            self._refreshing = False
+
+    # --- Async Access ---
+
+    async def get_keys_async(self) -> Tuple:
+        if self._is_valid():
+            if self._needs_refresh() and not self._refreshing:
+                self._refreshing = True
+                self._refresh_task = asyncio.create_task(self._refresh_in_task())
+                self._refresh_task.add_done_callback(self._refresh_done)
+            return self.img_key, self.sub_key
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        # Concurrent candidates wait for the one nav request instead of each firing their own
+        async with self._async_lock:
+            if self._is_valid():
+                return self.img_key, self.sub_key
+            return self._store(await self.platform._fetch_wbi_keys_async())
+
+    async def _refresh_in_task(self):
+        try:
+            self._store(await self.platform._fetch_wbi_keys_async())
+        finally:
+            self._refreshing = False
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._refresh_task = None
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[WBI] Background key refresh failed: {task.exception()}")
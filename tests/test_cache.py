@@ -0,0 +1,45 @@
+import time
+
+from platforms.cache import ResponseCache, cache_key
+
+
+def test_cache_key_strips_signing_params():
+    signed = cache_key("https://api.example.com/x/space/wbi/arc/search?mid=1&wts=1700000000&w_rid=abc",
+                       {"pn": 1})
+    assert signed == "api.example.com/x/space/wbi/arc/search?mid=1&pn=1"
+    assert cache_key("https://www.douyin.com/aweme/v1/web/aweme/post/",
+                     {"sec_user_id": "x", "X-Bogus": "1", "a_bogus": "2", "msToken": "3"}) == \
+        "www.douyin.com/aweme/v1/web/aweme/post/?sec_user_id=x"
+
+
+def test_cache_key_ignores_param_order_but_not_values():
+    a = cache_key("https://h/p", {"b": 2, "a": 1})
+    assert a == cache_key("https://h/p?a=1", {"b": "2"})
+    assert a != cache_key("https://h/p", {"a": 1, "b": 3})
+    assert cache_key("https://h/p", {"keyword": "AI"}) != cache_key("https://h/p", {"keyword": "ai"})
+
+
+def test_memory_tier_expiry_and_lru():
+    cache = ResponseCache(max_entries=2, db_path=None)
+    cache.set("https://h/a", None, '{"a": 1}', ttl=60)
+    cache.set("https://h/b", None, '{"b": 1}', ttl=-1)
+    assert cache.get("https://h/a").json() == {"a": 1}
+    assert cache.get("https://h/b") is None  # expired
+
+    cache.set("https://h/c", None, "{}", ttl=60)
+    cache.get("https://h/a")
+    cache.set("https://h/d", None, "{}", ttl=60)
+    assert cache.get("https://h/a") is not None
+    assert cache.get("https://h/c") is None  # least recently used
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db = tmp_path / "responses.sqlite3"
+    cache = ResponseCache(db_path=db)
+    cache.set("https://h/a", {"wts": time.time()}, '{"a": 1}', ttl=60)
+
+    reopened = ResponseCache(db_path=db)
+    response = reopened.get("https://h/a", {"wts": 1})
+    assert response.json() == {"a": 1}
+    assert response.from_cache
+    assert reopened.stats["disk_hits"] == 1
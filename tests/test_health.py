@@ -0,0 +1,77 @@
+import pytest
+
+from platforms import health
+from platforms.health import CLOSED, HALF_OPEN, OPEN, CircuitOpenError, EndpointHealth, HealthTracker
+
+
+@pytest.fixture(autouse=True)
+def breaker_config(monkeypatch):
+    monkeypatch.setattr(health, "BREAKER_ENABLED", True)
+    monkeypatch.setattr(health, "BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(health, "BREAKER_COOLDOWN", 10.0)
+    monkeypatch.setattr(health, "BREAKER_MAX_COOLDOWN", 25.0)
+
+
+def _fail(h, n, now=1000.0):
+    for _ in range(n):
+        h.record(False, 0.1, "boom", now=now)
+
+
+def test_opens_after_consecutive_failures():
+    h = EndpointHealth("api/x")
+    _fail(h, 2)
+    h.record(True, 0.1, now=1000.0)  # a success resets the streak
+    _fail(h, 2)
+    assert h.state == CLOSED
+    _fail(h, 1)
+    assert h.state == OPEN
+    assert not h.allow(1005.0)
+    assert h.rejected == 1
+
+
+def test_half_open_lets_one_probe_through():
+    h = EndpointHealth("api/x")
+    _fail(h, 3)
+    assert h.allow(1010.0)
+    assert h.state == HALF_OPEN
+    assert not h.allow(1010.0)  # second caller waits for the probe
+
+
+def test_failed_probe_doubles_cooldown_up_to_max():
+    h = EndpointHealth("api/x")
+    _fail(h, 3)
+    h.allow(1010.0)
+    h.record(False, 0.1, "still down", now=1010.0)
+    assert (h.state, h.cooldown) == (OPEN, 20.0)
+    assert not h.allow(1025.0)
+    h.allow(1030.0)
+    h.record(False, 0.1, "still down", now=1030.0)
+    assert h.cooldown == 25.0
+
+
+def test_successful_probe_closes_and_resets_cooldown():
+    h = EndpointHealth("api/x")
+    _fail(h, 3)
+    h.allow(1010.0)
+    h.record(False, 0.1, now=1010.0)
+    h.allow(1030.0)
+    h.record(True, 0.1, now=1030.0)
+    assert (h.state, h.cooldown, h.consecutive_failures) == (CLOSED, 10.0, 0)
+
+
+def test_tracker_raises_and_cancelled_frees_probe(monkeypatch):
+    tracker = HealthTracker()
+    url = "https://api.example.com/x/card?mid=1"
+    for _ in range(3):
+        tracker.record(url, False, 0.1, "boom")
+    with pytest.raises(CircuitOpenError):
+        tracker.check(url)
+
+    # Same endpoint regardless of the query string
+    endpoint = tracker._endpoints["api.example.com/x/card"]
+    endpoint.opened_at -= 10.0
+    tracker.check(url + "&pn=2")  # probe
+    with pytest.raises(CircuitOpenError):
+        tracker.check(url)
+    tracker.cancelled(url)
+    tracker.check(url)  # abandoned probe doesn't wedge the endpoint half-open
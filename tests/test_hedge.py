@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+from platforms.hedge import HedgedChain
+
+
+def _strategy(result, delay=0.0, log=None, name=None):
+    async def run():
+        if log is not None:
+            log.append(("start", name, time.monotonic()))
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(("cancelled", name, time.monotonic()))
+            raise
+        return result
+    return run
+
+
+def _names(strategies):
+    return [name for name, _ in strategies]
+
+
+def test_order_prefers_recent_winners_and_keeps_last_resort_last():
+    chain = HedgedChain("t", last_resort=["video_search"])
+    strategies = [("card", None), ("user_search", None), ("video_search", None)]
+    assert _names(chain.order(strategies)) == ["card", "user_search", "video_search"]
+
+    chain._record("card", False)
+    chain._record("video_search", True)
+    assert _names(chain.order(strategies)) == ["user_search", "card", "video_search"]
+
+    chain._record("user_search", True)
+    chain._record("card", True)
+    assert _names(chain.order(strategies)) == ["card", "user_search", "video_search"]
+    assert chain.snapshot()["preferred"] == ["card", "user_search"]
+
+
+def test_forgets_after_memory():
+    chain = HedgedChain("t", memory=0.0)
+    chain._record("a", False)
+    assert _names(chain.order([("a", None), ("b", None)])) == ["a", "b"]
+
+
+def test_first_answer_wins_and_losers_are_cancelled():
+    log = []
+
+    async def main():
+        chain = HedgedChain("t", hedge_delay=0.05)
+        result = await chain.run_async([
+            ("slow", _strategy("slow", 1.0, log, "slow")),
+            ("fast", _strategy("fast", 0.01, log, "fast")),
+        ])
+        await asyncio.sleep(0)
+        return chain, result
+
+    chain, result = asyncio.run(main())
+    assert result == "fast"
+    assert ("cancelled", "slow") in [(event, name) for event, name, _ in log]
+    assert chain.stats["hedged"] == 1
+
+
+def test_empty_answer_launches_next_without_waiting_for_delay():
+    log = []
+    chain = HedgedChain("t", hedge_delay=5.0)
+    started = time.monotonic()
+    result = asyncio.run(chain.run_async([
+        ("a", _strategy(None, 0.0, log, "a")),
+        ("b", _strategy("b", 0.0, log, "b")),
+    ]))
+    assert result == "b"
+    assert time.monotonic() - started < 1.0
+
+
+def test_last_resort_waits_for_better_strategies():
+    chain = HedgedChain("t", hedge_delay=0.01, last_resort=["degraded"])
+    result = asyncio.run(chain.run_async([
+        ("full", _strategy("full", 0.2)),
+        ("degraded", _strategy("degraded", 0.0)),
+    ]))
+    assert result == "full"
+
+    result = asyncio.run(chain.run_async([
+        ("full", _strategy(None, 0.2)),
+        ("degraded", _strategy("degraded", 0.0)),
+    ]))
+    assert result == "degraded"
+
+
+def test_exhausted_returns_none():
+    chain = HedgedChain("t", hedge_delay=0.01)
+    assert asyncio.run(chain.run_async([("a", _strategy(None)), ("b", _strategy(None))])) is None
+    assert chain.stats["exhausted"] == 1
+
+
+def test_sync_run_matches_async_semantics():
+    chain = HedgedChain("t", hedge_delay=0.01, last_resort=["degraded"])
+
+    def slow_full():
+        time.sleep(0.2)
+        return "full"
+
+    def failing():
+        raise RuntimeError("risk control")
+
+    assert chain.run([("failing", failing), ("full", slow_full), ("degraded", lambda: "degraded")]) == "full"
+    assert chain.last_failure.keys() == {"failing"}
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from job_queue import DONE, FAILED, JobQueue, job_key
+
+
+def test_keywords_are_case_insensitive():
+    assert job_key("bilibili", "  AI Tools ") == job_key("bilibili", "ai tools")
+    assert job_key("bilibili", "ai") != job_key("douyin", "ai")
+
+
+def test_links_are_case_sensitive():
+    # Share short codes differ only by case
+    assert job_key("douyin", "https://v.douyin.com/iRNBho6/") != job_key("douyin", "https://v.douyin.com/irnbho6/")
+
+
+async def _wait(queue, job_id, timeout=5.0):
+    for _ in range(int(timeout / 0.01)):
+        job = queue.get(job_id, with_result=True)
+        if job["status"] in (DONE, FAILED):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never finished")
+
+
+def test_submit_runs_dedups_and_reuses(tmp_path):
+    calls = []
+
+    async def runner(platform, track):
+        calls.append((platform, track))
+        await asyncio.sleep(0.05)
+        if track == "bad":
+            raise ValueError("no creators found")
+        return {"track": track, "creators": []}
+
+    async def main():
+        queue = JobQueue(runner, workers=1, db_path=tmp_path / "jobs.sqlite3")
+        # No start(): the first submit starts the workers
+        first = queue.submit("bilibili", "AI")
+        joined = queue.submit("bilibili", "ai")
+        assert joined["job_id"] == first["job_id"]
+        done = await _wait(queue, first["job_id"])
+        reused = queue.submit("bilibili", "AI ")
+        failed = await _wait(queue, queue.submit("bilibili", "bad")["job_id"])
+        await queue.stop()
+        return queue, done, reused, failed
+
+    queue, done, reused, failed = asyncio.run(main())
+    assert calls == [("bilibili", "AI"), ("bilibili", "bad")]
+    assert done["result"] == {"track": "AI", "creators": []}
+    assert reused["status"] == DONE
+    assert (failed["status"], failed["error"]) == (FAILED, "no creators found")
+    assert (queue.stats["joined"], queue.stats["reused"]) == (1, 1)
+
+
+def test_submit_without_runner_raises_before_insert(tmp_path):
+    async def main():
+        queue = JobQueue(None, db_path=tmp_path / "jobs.sqlite3")
+        with pytest.raises(RuntimeError):
+            queue.submit("bilibili", "ai")
+        return queue._execute("SELECT COUNT(*) FROM jobs")[0][0]
+
+    assert asyncio.run(main()) == 0
+
+
+def test_unfinished_jobs_are_requeued_on_start(tmp_path):
+    db = tmp_path / "jobs.sqlite3"
+
+    async def crashed():
+        queue = JobQueue(None, db_path=db)
+        queue._execute("INSERT INTO jobs (id, key, platform, track, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                       ("j1", job_key("douyin", "ai"), "douyin", "ai", "running", 0.0))
+
+    async def restarted():
+        async def runner(platform, track):
+            return {"ok": True}
+        queue = JobQueue(runner, db_path=db)
+        queue.start()
+        job = await _wait(queue, "j1")
+        await queue.stop()
+        return job
+
+    asyncio.run(crashed())
+    assert asyncio.run(restarted())["result"] == {"ok": True}
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from platforms import ratelimit
+from platforms.ratelimit import RateLimiter, TokenBucket, _parse_limits
+
+
+@pytest.fixture(autouse=True)
+def aimd_config(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_BACKOFF", 0.5)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_RECOVERY", 0.1)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_FLOOR", 0.1)
+
+
+def test_parse_limits():
+    assert _parse_limits("a.com=8:16, b.com=4,broken") == {"a.com": (8.0, 16.0), "b.com": (4.0, 4.0)}
+
+
+def test_burst_then_debt():
+    bucket = TokenBucket("h", rate=10.0, burst=2)
+    assert bucket._reserve() == 0.0
+    assert bucket._reserve() == 0.0
+    assert bucket._reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket._reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_rejection_halves_rate_and_drops_burst():
+    bucket = TokenBucket("h", rate=10.0, burst=5)
+    bucket.on_rejected()
+    assert bucket.rate == 5.0
+    assert bucket.tokens <= 0
+    for _ in range(10):
+        bucket.on_rejected()
+    assert bucket.rate == pytest.approx(1.0)  # floor: 10% of max
+
+
+def test_success_recovers_additively_up_to_max():
+    bucket = TokenBucket("h", rate=10.0, burst=5)
+    bucket.on_rejected()
+    bucket.on_success()
+    assert bucket.rate == pytest.approx(6.0)
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate == 10.0
+
+
+def test_cancelled_waiter_refunds_its_token():
+    async def main():
+        bucket = TokenBucket("h", rate=10.0, burst=1)
+        await bucket.acquire_async()
+        waiters = [asyncio.ensure_future(bucket.acquire_async()) for _ in range(5)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        # Only our own token is owed, not the five abandoned ones
+        assert bucket._reserve() <= 0.1
+        assert bucket.stats["refunded"] == 5
+
+    asyncio.run(main())
+
+
+def test_limiter_buckets_per_host():
+    limiter = RateLimiter("api.example.com=2:3", "10:20")
+    bucket = limiter.bucket("https://api.example.com/x?y=1")
+    assert (bucket.rate, bucket.burst) == (2.0, 3.0)
+    assert limiter.bucket("https://api.example.com/z") is bucket
+    assert limiter.bucket("https://other.example.com/").rate == 10.0
@@ -0,0 +1,105 @@
+import asyncio
+
+from platforms import singleflight
+from platforms.singleflight import SingleFlight, coalesce
+
+
+class Platform:
+    def __init__(self):
+        self.calls = 0
+
+    @coalesce
+    async def lookup(self, key, delay=0.05):
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return {"key": key, "videos": [1, 2, 3]}
+
+
+def test_concurrent_calls_share_one_execution():
+    async def main():
+        platform = Platform()
+        results = await asyncio.gather(*(platform.lookup("a") for _ in range(5)), platform.lookup("b"))
+        return platform, results
+
+    platform, results = asyncio.run(main())
+    assert platform.calls == 2
+    assert [r["key"] for r in results] == ["a"] * 5 + ["b"]
+
+
+def test_followers_get_their_own_copy():
+    async def main():
+        platform = Platform()
+        return await asyncio.gather(platform.lookup("a"), platform.lookup("a"))
+
+    first, second = asyncio.run(main())
+    first["videos"].append(4)
+    assert second["videos"] == [1, 2, 3]
+
+
+def test_sequential_calls_are_not_cached():
+    async def main():
+        platform = Platform()
+        await platform.lookup("a", delay=0)
+        await platform.lookup("a", delay=0)
+        return platform.calls
+
+    assert asyncio.run(main()) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def main():
+        platform = Platform()
+        leader = asyncio.ensure_future(platform.lookup("a"))
+        follower = asyncio.ensure_future(platform.lookup("a"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        return platform, leader, result
+
+    platform, leader, result = asyncio.run(main())
+    assert leader.cancelled()
+    assert result["key"] == "a"
+    assert platform.calls == 1
+
+
+def test_unhashable_arguments_bypass_coalescing():
+    async def main():
+        platform = Platform()
+        await asyncio.gather(platform.lookup(["a"]), platform.lookup(["a"]))
+        return platform.calls
+
+    # Lists are frozen to tuples, so these still coalesce
+    assert asyncio.run(main()) == 1
+
+    async def unhashable():
+        platform = Platform()
+        await asyncio.gather(platform.lookup(bytearray(b"a")), platform.lookup(bytearray(b"a")))
+        return platform.calls
+
+    assert asyncio.run(unhashable()) == 2
+
+
+def test_stats_and_cleanup():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def main():
+        await asyncio.gather(*(flight.do("k", "work", work) for _ in range(3)))
+
+    asyncio.run(main())
+    snapshot = flight.snapshot()
+    assert (snapshot["calls"], snapshot["coalesced"], snapshot["inflight"]) == (3, 2, 0)
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(singleflight, "SINGLEFLIGHT_ENABLED", False)
+
+    async def main():
+        platform = Platform()
+        await asyncio.gather(platform.lookup("a"), platform.lookup("a"))
+        return platform.calls
+
+    assert asyncio.run(main()) == 2
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from platforms import store as store_module
+from platforms.store import CreatorStore, IncrementalRefresh
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, "CREATOR_STORE_PAGE_SIZE", 5)
+    # Stored videos are never fresh enough to skip the refresh, unless a test says otherwise
+    monkeypatch.setattr(store_module, "CREATOR_STORE_FRESH_SECONDS", 0)
+    return CreatorStore(tmp_path / "creators.sqlite3")
+
+
+def _videos(newest, count):
+    # newest first, like the arc search / post APIs
+    return [{"bvid": f"BV{i}", "title": f"v{i}", "play": i, "created": 1000 + i}
+            for i in range(newest, newest - count, -1)]
+
+
+def _run(refresh, upstream):
+    pages = 0
+    for page in range(refresh.max_pages):
+        pages += 1
+        if not refresh.feed(upstream[page * refresh.page_size:(page + 1) * refresh.page_size]):
+            break
+    return pages, [v["bvid"] for v in refresh.finish()]
+
+
+def test_unknown_creator_fetches_one_full_page(store):
+    refresh = IncrementalRefresh(store, "bilibili", "m", 10)
+    assert (refresh.cached, refresh.page_size, refresh.max_pages) == (None, 10, 1)
+    pages, ids = _run(refresh, _videos(30, 30))
+    assert pages == 1
+    assert ids == [f"BV{i}" for i in range(30, 20, -1)]
+
+
+def test_fresh_store_skips_upstream(store, monkeypatch):
+    store.upsert_videos("bilibili", "m", _videos(30, 10))
+    monkeypatch.setattr(store_module, "CREATOR_STORE_FRESH_SECONDS", 600)
+    refresh = IncrementalRefresh(store, "bilibili", "m", 10)
+    assert [v["bvid"] for v in refresh.cached] == [f"BV{i}" for i in range(30, 20, -1)]
+
+
+def test_known_creator_stops_at_first_known_page(store):
+    store.upsert_videos("bilibili", "m", _videos(30, 10))
+    refresh = IncrementalRefresh(store, "bilibili", "m", 10)
+    assert refresh.page_size == 5
+    # Two new uploads since the last refresh
+    pages, ids = _run(refresh, _videos(32, 30))
+    assert pages == 1
+    assert ids == [f"BV{i}" for i in range(32, 22, -1)]
+
+
+def test_short_stored_history_is_topped_up(store):
+    # Stored from an earlier refresh with a smaller limit
+    store.upsert_videos("bilibili", "m", _videos(30, 3))
+    refresh = IncrementalRefresh(store, "bilibili", "m", 10)
+    pages, ids = _run(refresh, _videos(30, 30))
+    assert pages == 2
+    assert ids == [f"BV{i}" for i in range(30, 20, -1)]
+
+
+def test_creator_with_few_videos_stops_on_short_page(store):
+    store.upsert_videos("bilibili", "m", _videos(3, 3))
+    refresh = IncrementalRefresh(store, "bilibili", "m", 10)
+    pages, ids = _run(refresh, _videos(4, 4))
+    assert pages == 1
+    assert ids == ["BV4", "BV3", "BV2", "BV1"]
+
+
+def test_without_store():
+    refresh = IncrementalRefresh(None, "bilibili", "m", 3)
+    assert refresh.feed(_videos(10, 2)) is False  # short page
+    assert [v["bvid"] for v in refresh.finish()] == ["BV10", "BV9"]
+
+
+def test_async_variants_match_sync(store):
+    store.upsert_videos("bilibili", "m", _videos(30, 3))
+
+    async def main():
+        refresh = await IncrementalRefresh.create_async(store, "bilibili", "m", 10)
+        upstream = _videos(30, 30)
+        for page in range(refresh.max_pages):
+            if not await refresh.feed_async(upstream[page * 5:(page + 1) * 5]):
+                break
+        return await refresh.finish_async()
+
+    assert len(asyncio.run(main())) == 10
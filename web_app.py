@@ -1,19 +1,38 @@
+# Start timing imports before anything heavy loads (GET /debug/startup)
+from platforms import importcost
+importcost.install()
+
 from fastapi import FastAPI, Request, Form, Query
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
-import uvicorn
-import sys
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response, FileResponse, PlainTextResponse
+try:
+    # orjson is several times faster than json.dumps on the big /api result lists
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
+from typing import Optional
 import os
 import asyncio
-import requests
-import io
+import json
+import time
 from pathlib import Path
-from platforms.bilibili import BilibiliPlatform
-from platforms.douyin import DouyinPlatform
-from mcp_client import MCPConnector
-from cookie_manager import fetch_douyin_cookies
-from analyzer import generate_analysis_prompt
+from platforms.http_client import aclose_all
+from platforms.cache import get_response_cache
+from platforms.cassette import get_cassette
+from platforms.browser_pool import browser_pool_stats, shutdown_browser_pools
+from platforms.health import get_health_tracker
+from platforms.ratelimit import get_rate_limiter
+from platforms import metrics
+from platforms.tracing import get_tracer, span
+from platforms.hedge import hedge_stats
+from platforms.singleflight import get_singleflight
+from platforms.store import get_creator_store
+from platforms.collector import COLLECTOR_ENABLED, ViewCollector, creator_trend, video_trend
+from image_proxy import get_image_proxy, IMG_BROWSER_MAX_AGE
+from job_queue import get_job_queue
+from cookie_manager import get_douyin_cookie_jar
 from market_analyzer import generate_market_report
 
 # 计算根路径，避免从其他目录启动时找不到静态/模板文件
@@ -24,79 +43,217 @@ if not static_dir.exists():
     static_dir = BASE_DIR / "assets"
 
 app = FastAPI()
+
+@app.middleware("http")
+async def route_metrics(request: Request, call_next):
+    # Labelled by route template (/creator/{mid}), not the raw path
+    started = time.monotonic()
+    status_code = 500
+    metrics.ROUTE_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        metrics.ROUTE_IN_FLIGHT.dec()
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.ROUTE_SECONDS.observe(time.monotonic() - started, route=route, method=request.method,
+                                      status=str(status_code))
+
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
-# Initialize Platform
-# Initialize Platform
-bili = BilibiliPlatform()
-douyin = DouyinPlatform()
+# Platforms are built on first use: DouyinPlatform alone drags in the X-Bogus signer (aiohttp & co).
+# PLATFORMS limits which ones this instance serves at all.
+ENABLED_PLATFORMS = [p.strip() for p in os.getenv("PLATFORMS", "bilibili,douyin").split(",") if p.strip()]
+_platforms = {}
+# Latest Douyin Cookie header from the cookie file / jar, applied when DouyinPlatform gets built
+_douyin_cookies = None
+
+def _apply_douyin_cookies(cookies: str):
+    global _douyin_cookies
+    _douyin_cookies = cookies
+    if "douyin" in _platforms:
+        _platforms["douyin"].update_cookies(cookies)
+
+def get_platform(name: str):
+    """Platform instance for "bilibili" / "douyin", None if it is not enabled."""
+    if name not in ENABLED_PLATFORMS:
+        return None
+    if name not in _platforms:
+        if name == "bilibili":
+            from platforms.bilibili import BilibiliPlatform
+            _platforms[name] = BilibiliPlatform()
+        elif name == "douyin":
+            from platforms.douyin import DouyinPlatform
+            _platforms[name] = DouyinPlatform()
+            if _douyin_cookies:
+                _platforms[name].update_cookies(_douyin_cookies)
+        else:
+            return None
+    return _platforms[name]
+
+class _LazyPlatforms:
+    # What ViewCollector needs from its platform dict, without building them up front
+    def get(self, name):
+        return get_platform(name)
+
+def _platform_or_404(name: str):
+    api = get_platform("douyin" if name == "douyin" else "bilibili")
+    if api is None:
+        return None, JSONResponse({"error": f"Platform not enabled: {name}"}, status_code=404)
+    return api, None
+
+# Re-samples view counts of stored videos in the background (platforms/collector.py)
+collector = ViewCollector(_LazyPlatforms())
 
 @app.on_event("startup")
 async def startup_event():
-    # Auto-fetch Douyin Cookies if not provided
-    if not os.getenv("DOUYIN_COOKIE"):
+    # Douyin cookies: env > local file > persisted/auto-captured jar (never blocks startup).
+    # DouyinPlatform itself is still only built on first use and picks them up then.
+    if "douyin" not in ENABLED_PLATFORMS:
+        print(">> Douyin not in PLATFORMS, skipping cookies.")
+    elif os.getenv("DOUYIN_COOKIE"):
+        print(">> DOUYIN_COOKIE present in env.")
+    elif Path("douyin_cookie.txt").exists():
         # FALLBACK: Check for local cookie text file (from user manual input via UI or upload)
-        cookie_file = Path("douyin_cookie.txt")
-        if cookie_file.exists():
-            print(">> Found local 'douyin_cookie.txt'. Using it.")
-            with open(cookie_file, "r") as f:
-                cookies = f.read().strip()
-            douyin.update_cookies(cookies)
-        else:
-            print(">> No DOUYIN_COOKIE env or local file. Attempting automatic fetch...")
-            cookies = await fetch_douyin_cookies()
-            if cookies:
-                douyin.update_cookies(cookies)
-            else:
-                print(">> Failed to auto-fetch cookies. Douyin search may be limited.")
+        print(">> Found local 'douyin_cookie.txt'. Using it.")
+        with open("douyin_cookie.txt", "r") as f:
+            cookies = f.read().strip()
+        _apply_douyin_cookies(cookies)
     else:
-        print(">> DOUYIN_COOKIE present in env.")
+        # Cached cookies are applied right away, any browser capture runs in the background
+        print(">> No DOUYIN_COOKIE env or local file. Fetching cookies in the background...")
+        get_douyin_cookie_jar().start(_apply_douyin_cookies)
+
+    if COLLECTOR_ENABLED:
+        collector.start()
+    get_job_queue(_run_analysis_job).start()
+    importcost.mark_started()
+    importcost.print_summary()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Release pooled keep-alive connections and browsers
+    await collector.stop()
+    await get_job_queue().stop()
+    await get_douyin_cookie_jar().stop()
+    await aclose_all()
+    await shutdown_browser_pools()
+
+# --- STATUS ---
+@app.get("/status")
+async def status():
+    """Runtime health/caching info for operators."""
+    cache = get_response_cache()
+    store = get_creator_store()
+    return JSONResponse({
+        "response_cache": cache.snapshot() if cache else None,
+        "image_proxy": get_image_proxy().snapshot(),
+        "browser_pools": browser_pool_stats(),
+        "singleflight": get_singleflight().snapshot(),
+        "creator_store": store.snapshot() if store else None,
+        "collector": collector.snapshot(),
+        "jobs": get_job_queue().snapshot(),
+        "hedged_chains": hedge_stats(),
+        "endpoints": get_health_tracker().snapshot(),
+        "rate_limits": get_rate_limiter().snapshot(),
+        "cassette": get_cassette().snapshot() if get_cassette() else None,
+        "platforms": {"enabled": ENABLED_PLATFORMS, "loaded": sorted(_platforms)},
+        "douyin_cookies": get_douyin_cookie_jar().snapshot(),
+    })
+
+@app.get("/debug/startup")
+async def startup_cost(top: int = 30):
+    """Where startup time went, per package/module (platforms/importcost.py)."""
+    return JSONResponse(importcost.report(top))
+
+def _ratio(hits, total):
+    return hits / total if total else 0.0
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint (see platforms/metrics.py)."""
+    cache = get_response_cache()
+    if cache:
+        stats = cache.snapshot()
+        metrics.CACHE_HIT_RATIO.set(stats["hit_ratio"], cache="response")
+        for event in ("memory_hits", "disk_hits", "misses", "stores", "evictions"):
+            metrics.set_counter(metrics.CACHE_EVENTS, stats[event], cache="response", event=event)
+    stats = get_image_proxy().snapshot()
+    metrics.CACHE_HIT_RATIO.set(_ratio(stats["hits"], stats["hits"] + stats["revalidated"] + stats["fetched"]),
+                                cache="image_blobs")
+    metrics.CACHE_HIT_RATIO.set(_ratio(stats["variant_hits"], stats["variant_hits"] + stats["variants_built"]),
+                                cache="image_variants")
+    for event in ("hits", "revalidated", "fetched", "coalesced", "errors", "evictions", "variant_hits", "variants_built"):
+        metrics.set_counter(metrics.CACHE_EVENTS, stats[event], cache="image_proxy", event=event)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# --- TRACES (per-request waterfall, see platforms/tracing.py) ---
+@app.get("/debug/traces", response_class=HTMLResponse)
+async def trace_list(request: Request):
+    return templates.TemplateResponse("traces.html", {"request": request, "traces": get_tracer().recent(), "trace": None})
+
+@app.get("/debug/traces/{trace_id}", response_class=HTMLResponse)
+async def trace_detail(request: Request, trace_id: str, format: str = "html"):
+    trace = get_tracer().get(trace_id)
+    if trace is None:
+        return JSONResponse({"error": "Unknown or evicted trace"}, status_code=404)
+    if format == "json":
+        return JSONResponse(trace.to_dict())
+    return templates.TemplateResponse("traces.html", {"request": request, "traces": get_tracer().recent(),
+                                                      "trace": trace.to_dict()})
+
+# --- TRENDS (view-count time series from the collector) ---
+@app.get("/trends/{platform}/video/{bvid}")
+async def video_trend_api(platform: str, bvid: str, window: float = 24):
+    store = get_creator_store()
+    if store is None:
+        return JSONResponse({"error": "Creator store disabled"}, status_code=503)
+    return JSONResponse(await asyncio.to_thread(video_trend, store, platform, bvid, window))
+
+@app.get("/trends/{platform}/creator/{mid}")
+async def creator_trend_api(platform: str, mid: str, window: float = 24):
+    store = get_creator_store()
+    if store is None:
+        return JSONResponse({"error": "Creator store disabled"}, status_code=503)
+    return JSONResponse(await asyncio.to_thread(creator_trend, store, platform, mid, window))
 
 # --- IMAGE PROXY ---
 @app.get("/img_proxy")
-async def img_proxy(url: str = Query(..., description="Target Image URL")):
-    """Proxies images to bypass Bilibili Referer blocks."""
+async def img_proxy(request: Request, url: str = Query(..., description="Target Image URL"),
+                    width: Optional[int] = Query(None, description="Scale down to this width (px)"),
+                    quality: Optional[int] = Query(None, description="Encoder quality 1-100"),
+                    format: Optional[str] = Query(None, description="webp | jpeg | png | auto")):
+    """Proxies images to bypass Bilibili Referer blocks (disk-cached, see image_proxy.py)."""
     if not url or url == "None":
-         # Return a transparent 1x1 pixel or 404
-         return StreamingResponse(io.BytesIO(b""), media_type="image/png")
-    
-    try:
-        # Determine Referer based on domain
-        referer = "https://www.bilibili.com/"
-        if "douyin" in url or "amemv" in url or "tiktok" in url:
-            referer = "https://www.douyin.com/"
-        
-        # Request with browser headers
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Referer": referer
-        }
-        
-        # Use stream=True to save memory
-        # Disable verification for some CDNs if needed, but usually not required.
-        r = requests.get(url, headers=headers, stream=True, timeout=5)
-        
-        # Check if we got a valid image
-        if r.status_code != 200:
-            print(f"Proxy Failed ({r.status_code}) for: {url}")
-            return StreamingResponse(io.BytesIO(b""), media_type="image/png")
-
-        # Debug Image Response
-        ct = r.headers.get("content-type", "unknown")
-        cl = r.headers.get("content-length", "unknown")
-        print(f"PROXY SUCCESS: {url[:30]}... | Type: {ct} | Len: {cl} | Status: {r.status_code}")
-            
-        return StreamingResponse(r.raw, media_type=r.headers.get("content-type", "image/jpeg"))
-    except Exception as e:
-        print(f"Proxy Error: {e}")
-        return StreamingResponse(io.BytesIO(b""), media_type="image/png")
+         # Return an empty image
+         return Response(b"", media_type="image/png", headers={"Cache-Control": "no-store"})
+
+    # auto -> WebP for browsers that advertise it, JPEG otherwise
+    fmt = format
+    if fmt == "auto":
+        fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+
+    image = await get_image_proxy().get_variant(url, width=width, quality=quality, fmt=fmt)
+    if image is None:
+        return Response(b"", media_type="image/png", headers={"Cache-Control": "no-store"})
+
+    # Blobs are content-addressed, so the digest is a perfect ETag
+    etag = f'"{image.digest}"'
+    cache_headers = {"Cache-Control": f"public, max-age={IMG_BROWSER_MAX_AGE}", "ETag": etag}
+    if format == "auto":
+        cache_headers["Vary"] = "Accept"
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=cache_headers)
+    return FileResponse(image.path, media_type=image.content_type, headers=cache_headers)
 
 # Robust Placeholder (Data URI)
 PLACEHOLDER_IMG = "data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSI2MDAiIGhlaWdodD0iNDAwIiB2aWV3Qm94PSIwIDAgNjAwIDQwMCI+CiAgPHJlY3Qgd2lkdGg9IjYwMCIgaGVpZ2h0PSI0MDAiIGZpbGw9IiMxZTFlMWUiIC8+CiAgPHRleHQgeD0iNTAlIiB5PSI1MCUiIGRvbWluYW50LWJhc2VsaW5lPSJtaWRkbGUiIHRleHQtYW5jaG9yPSJtaWRkbGUiIGZvbnQtZmFtaWx5PSJzYW5zLXNlcmlmIiBmb250LXNpemU9IjI0IiBmaWxsPSIjZmZmZmZmIj5JbWFnZSBVbmF2YWlsYWJsZTwvdGV4dD4KPC9zdmc+"
 
 def format_fans(fans):
+    if fans is None: return "未知"
     if not fans: return "0"
     if isinstance(fans, str) and 'w' in fans: return fans
     try:
@@ -118,9 +275,16 @@ from typing import Optional
 @app.get("/creator/{mid}", response_class=HTMLResponse)
 @app.get("/creator/{mid}", response_class=HTMLResponse)
 async def creator_detail(request: Request, mid: str, name: Optional[str] = None, avatar: Optional[str] = None, platform: str = "bilibili"):
+    api, error = _platform_or_404(platform)
+    if error:
+        return error
+    context = await _creator_context(api, mid, name, avatar, platform)
+    return templates.TemplateResponse("creator.html", {"request": request, **context})
+
+async def _creator_context(api, mid, name, avatar, platform):
+    """Everything creator.html shows (also served as JSON on /api/creator/{mid})."""
     # 1. Get User Info (Robust)
-    api = douyin if platform == "douyin" else bili
-    user_card = api.get_user_info(mid)
+    user_card = await api.get_user_info_async(mid)
     
     warning = None
     if not user_card or user_card['name'] == "Unknown":
@@ -145,14 +309,7 @@ async def creator_detail(request: Request, mid: str, name: Optional[str] = None,
              }
 
     # 2. Get Recent Videos
-    # Pass known name to help searching if needed
-    # Pass known name to help searching if needed
-    known_name = name or (user_card.get('name') if user_card else None)
-    raw_videos = api.get_recent_posts(mid, limit=20) #, known_name=known_name) - Douyin might not need known_name fallback logic yet
-    try:
-        if platform == 'bilibili':
-             raw_videos = api.get_recent_videos(mid, limit=20, known_name=known_name)
-    except: pass
+    raw_videos = await api.get_recent_posts_async(mid, limit=20)
     
     videos_10 = raw_videos[:10] if raw_videos else []
     
@@ -162,10 +319,11 @@ async def creator_detail(request: Request, mid: str, name: Optional[str] = None,
         max_play = max(plays) if plays else 1
         avg_play = int(sum(plays) / len(plays)) if plays else 0
         if platform == 'bilibili':
-             stats = bili.calculate_stats(videos_10)
+             stats = api.calculate_stats(videos_10)
         else:
              # Basic stats for Douyin
              stats = {"weekly_freq": 1, "avg_views_5": avg_play}
+        await api.record_snapshot_async(mid, stats, fans=user_card.get('fans'), video_count=len(videos_10))
     else:
         plays = []
         max_play = 0
@@ -199,8 +357,7 @@ async def creator_detail(request: Request, mid: str, name: Optional[str] = None,
         user_card['face'] = 'https:' + user_card['face']
     user_card['fans'] = format_fans(user_card['fans'])
 
-    return templates.TemplateResponse("creator.html", {
-        "request": request,
+    return {
         "user": user_card,
         "videos": processed_videos,
         "avg_views": avg_play,
@@ -208,14 +365,170 @@ async def creator_detail(request: Request, mid: str, name: Optional[str] = None,
         "weekly_freq": stats.get('weekly_freq', 0),
         "warning": warning,
         "platform": platform
-    })
+    }
+
+# Max candidates analyzed at once in /analyze (per-host limits live in HttpClient)
+ANALYZE_CONCURRENCY = int(os.getenv("ANALYZE_CONCURRENCY", "8"))
+_candidate_semaphore = None
+
+def _candidate_slots():
+    global _candidate_semaphore
+    if _candidate_semaphore is None:
+        _candidate_semaphore = asyncio.Semaphore(ANALYZE_CONCURRENCY)
+    return _candidate_semaphore
+
+async def _analyze_candidate(api, platform_input, user, mid):
+    """Per-candidate pipeline: user info -> recent posts -> post detail -> card item.
+    Returns None when the candidate should be skipped."""
+    slots = _candidate_slots()
+    with span("wait_slot"):
+        await slots.acquire()
+    try:
+        # For Douyin, we got decent info from search. For Bilibili search_raw_videos returned videos, not users.
+        # BilibiliPlatform.search_users returns video results. We need to adapt it?
+        # WAIT: BilibiliPlatform.search_users returns raw_videos list!
+        # This is an Interface mismatch. 'search_users' should return USERS.
+        # DouyinPlatform.search_users returns USERS.
+        # I need to fix BilibiliPlatform.search_users to return USERS or handle the difference here.
+        # To minimize disruption on this step, I will handle the difference:
+        
+        if platform_input == 'bilibili':
+            # 'user' is actually a video dict here
+            # We need to fetch the user card
+             real_mid = user['mid']
+             with span("user_info"):
+                 user_card = await api.get_user_info_async(real_mid)
+             if not user_card: return None
+        else:
+             # Douyin: 'user' is already a user dict
+             real_mid = mid
+             user_card = user # Already has name, avatar, etc.
+
+        # 2. Get Recent Posts
+        clean_name = user_card.get('name')
+        print(f"  > Analyzing Candidate: {clean_name} ({real_mid})")
+
+        with span("recent_posts") as posts_span:
+            recent_posts = await api.get_recent_posts_async(real_mid, limit=10)
+            if posts_span:
+                posts_span.set(count=len(recent_posts or []))
+        
+        # Fallback Check
+        if not recent_posts:
+             print(f"    - Skipped: No recent posts found.")
+             return None
+             
+        # 3. Relevance/Stats/Filtering
+        # (Simplified filtering for now to ensure Douyin works)
+        
+        # Stats
+        if platform_input == 'bilibili':
+             user_stats = api.calculate_stats(recent_posts)
+        else:
+             # Basic Douyin stats
+             plays = [p['play'] for p in recent_posts]
+             avg_play = int(sum(plays)/len(plays)) if plays else 0
+             user_stats = {"weekly_freq": 1, "avg_views_5": avg_play} # TODO: Real stats
+        await api.record_snapshot_async(real_mid, user_stats, fans=user_card.get('fans'), video_count=len(recent_posts))
+        
+        # Prepare Item
+        latest_post = recent_posts[0]
+        latest_date_str = "N/A"
+        if latest_post.get('created'):
+             # Handle TS vs ISO string if needed. Bili is TS. Douyin is TS.
+             try:
+                 dt = datetime.datetime.fromtimestamp(int(latest_post['created']))
+                 latest_date_str = dt.strftime("%Y-%m-%d")
+             except: pass
+
+        # Content/Comments
+        # Douyin details are hard to get without specific API, use defaults
+        with span("post_detail", bvid=latest_post['bvid']):
+            detail = await api.get_post_detail_async(latest_post['bvid']) # bvid is aweme_id
+        content_context = detail.get('subtitles', '') if detail else ""
+        comments_str = "\n".join(detail.get('comments', [])) if detail else ""
+        
+        analysis_prompt = f"【内容摘要】{content_context[:120]}...\n\n【观众热评】\n{comments_str}"
+
+        # Fans formatting
+        raw_fans = user_card.get('fans', 0)
+        # Handle 'N/A' from Douyin Search
+        fans_display = format_fans(raw_fans) if raw_fans != "N/A" else "未知"
+
+        # Avatar Proxy
+        avatar_url = user_card.get('avatar', "")
+        if platform_input == 'bilibili':
+             # Ensure HTTPS if missing (though API usually provides it)
+             if avatar_url and avatar_url.startswith('//'):
+                  avatar_url = 'https:' + avatar_url
+        
+        cover_url = latest_post.get('pic', "")
+        if platform_input == 'bilibili' and cover_url and cover_url.startswith('//'):
+             cover_url = 'https:' + cover_url
+
+        item = {
+            "mid": real_mid,
+            "author": user_card['name'],
+            "avatar": avatar_url or PLACEHOLDER_IMG,
+            "fans": fans_display,
+            "intro": user_card.get('sign', ''),
+            "latest_date": latest_date_str,
+            "weekly_freq": user_stats.get('weekly_freq', 0),
+            "avg_views": user_stats.get('avg_views_5', 0),
+            "latest_video_title": latest_post.get('title', ''),
+            "latest_video_cover": cover_url or PLACEHOLDER_IMG,
+            "latest_video_url": f"https://www.douyin.com/video/{latest_post['bvid']}" if platform_input == 'douyin' else f"https://www.bilibili.com/video/{latest_post['bvid']}",
+            "analysis_prompt": analysis_prompt,
+            "subtitles_snippet": content_context[:200] + "...",
+            "comments_snippet": comments_str
+        }
+        return item
+    finally:
+        slots.release()
 
 @app.post("/analyze", response_class=HTMLResponse)
-async def analyze_track(request: Request, track: str = Form(...), platform_input: str = Form("bilibili")):
+async def analyze_track(request: Request, track: str = Form(...), platform_input: str = Form("bilibili"),
+                        stream: bool = Form(False), job: bool = Form(False)):
+    with get_tracer().trace("POST /analyze", track=track.strip(), platform=platform_input) as root:
+        response = await _analyze_track(request, track, platform_input, stream, job)
+    if root is not None:
+        # Look it up on /debug/traces/{id}
+        response.headers["X-Trace-Id"] = root.trace.id
+    return response
+
+async def _analyze_track(request, track, platform_input, stream, job):
     track = track.strip()
     print(f"Analyzing input: {track} on {platform_input}")
     
-    api = douyin if platform_input == "douyin" else bili
+    api, error = _platform_or_404(platform_input)
+    if error:
+        return error
+
+    context = await _analyze_direct(api, platform_input, track)
+    if context is None:
+        # --- NORMAL TRACK SEARCH ---
+        print("  > Detected Track Search")
+
+        if job:
+            # Run it in the background queue instead of inside this request
+            return JSONResponse(get_job_queue(_run_analysis_job).submit(platform_input, track), status_code=202)
+
+        if stream:
+            # Progressive page: the browser pulls the cards from /analyze/stream
+            return templates.TemplateResponse("results.html", {
+                "request": request,
+                "track": track,
+                "results": [],
+                "platform": platform_input,
+                "stream": True
+            })
+
+        context = await _analyze_track_search(api, platform_input, track)
+    return templates.TemplateResponse("results.html", {"request": request, **context})
+
+async def _analyze_direct(api, platform_input, track):
+    """Douyin links and Douyin keyword search answer right away (results.html context).
+    None means: run the normal track search."""
     analyzed_creators = []
     
     # --- QUERY TYPE DETECTION (Quick Hack for Bilibili Video Links) ---
@@ -237,7 +550,7 @@ async def analyze_track(request: Request, track: str = Form(...), platform_input
             # Resolve Short Links
             if "v.douyin.com" in target_url:
                 print(f"  > Analyzing Short Link via HTML Scrape: {target_url}")
-                detail = api.get_video_via_html(target_url)
+                detail = await api.get_video_via_html_async(target_url)
                 
                 if detail:
                     date_str = "N/A"
@@ -263,12 +576,11 @@ async def analyze_track(request: Request, track: str = Form(...), platform_input
                         "comments_snippet": ""
                     }
                     analyzed_creators.append(item)
-                    return templates.TemplateResponse("results.html", {
-                        "request": request, 
+                    return {
                         "track": f"Link: {detail['id']}", 
                         "results": analyzed_creators, 
                         "platform": platform_input
-                    })
+                    }
 
             # For long links (www.douyin.com/video/...)
             vid = None
@@ -278,7 +590,7 @@ async def analyze_track(request: Request, track: str = Form(...), platform_input
             
             if vid:
                 print(f"  > Extracted Douyin Video ID: {vid}")
-                detail = api.get_post_detail(vid)
+                detail = await api.get_post_detail_async(vid)
                 if detail:
                     item = {
                         "mid": detail['author']['mid'],
@@ -297,52 +609,54 @@ async def analyze_track(request: Request, track: str = Form(...), platform_input
                         "comments_snippet": ""
                     }
                     analyzed_creators.append(item)
-                    return templates.TemplateResponse("results.html", {
-                        "request": request, 
+                    return {
                         "track": f"Link: {vid}", 
                         "results": analyzed_creators, 
                         "platform": platform_input
-                    })
+                    }
         
         # --- IF NO LINK -> RUN SEARCH ---
         else:
             print(f"  > Douyin Keyword Search: {track}")
             from platforms.douyin_browser import douyin_browser
-            browser_results = await douyin_browser.search(track)
+            with span("douyin_browser_search"):
+                browser_results = await douyin_browser.search(track)
             
             if not browser_results:
                  # Logic for 0 results
-                 return templates.TemplateResponse("results.html", {
-                        "request": request, 
+                 return {
                         "track": track, 
                         "results": [], 
                         "error": "Douyin Search found 0 results.",
                         "platform": platform_input
-                 })
+                 }
                  
             import urllib.parse
             
             for vid_item in browser_results:
                  # Encode URLs to pass safely through img_proxy query params
-                 safe_avatar = urllib.parse.quote(vid_item.get('cover', '')) # Using video cover as avatar? No, separate logic.
-                 # Wait, logic above uses Ui-Avatars which is safe.
-                 # But the VIDEO COVER needs encoding.
-                 
-                 safe_cover = urllib.parse.quote(cover_url) if cover_url else ""
-                 
+                 # (Douyin CDN URLs carry their own query strings)
+                 cover_url = vid_item.get('cover', '')
+                 safe_cover = urllib.parse.quote(cover_url) if cover_url else PLACEHOLDER_IMG
+                 avatar_url = vid_item.get('author_avatar', '')
+                 safe_avatar = urllib.parse.quote(avatar_url) if avatar_url else "https://ui-avatars.com/api/?name=Douyin&background=0D8ABC&color=fff"
+
+                 created = vid_item.get('created')
+                 latest_date = datetime.datetime.fromtimestamp(created).strftime('%Y-%m-%d') if created else "N/A"
+                 fans = vid_item.get('author_fans')
+
                  item = {
-                    "mid": vid_item['author'],
+                    # sec_uid when the XHR capture gave us one, so the creator page works
+                    "mid": vid_item.get('author_id') or vid_item['author'],
                     "author": vid_item['author'],
-                    # "avatar": "https://ui-avatars.com/api/?name=Douyin&background=0D8ABC&color=fff", # UI Avatars is reliable
-                    # actually let's use the nice one
-                     "avatar": "https://ui-avatars.com/api/?name=Douyin&background=0D8ABC&color=fff",
-                    "fans": "Unknown",
+                    "avatar": safe_avatar,
+                    "fans": format_fans(fans) if fans is not None else "Unknown",
                     "intro": f"Search Result: {vid_item['title']}",
-                    "latest_date": "N/A",
-                    "weekly_freq": "1", # Dummy
-                    "avg_views": "0",   # Dummy
+                    "latest_date": latest_date,
+                    "weekly_freq": "1", # Single search hit
+                    "avg_views": vid_item.get('play') or vid_item.get('digg') or 0,
                     "latest_video_title": vid_item['title'],
-                    "latest_video_cover": safe_cover, 
+                    "latest_video_cover": safe_cover,
                     "latest_video_url": vid_item.get('link', '#'),
                     "analysis_prompt": vid_item['title'],
                     "subtitles_snippet": "Douyin Video Result",
@@ -350,12 +664,11 @@ async def analyze_track(request: Request, track: str = Form(...), platform_input
                  }
                  analyzed_creators.append(item)
             
-            return templates.TemplateResponse("results.html", {
-                "request": request, 
+            return {
                 "track": track, 
                 "results": analyzed_creators, 
                 "platform": platform_input
-            })
+            }
             
 
     
@@ -363,8 +676,6 @@ async def analyze_track(request: Request, track: str = Form(...), platform_input
     elif platform_input == "bilibili":
         print(f"  > Bilibili Keyword Search: {track}")
         # ... existing logic ...
-        candidates = api.search_users(track)
-        
         # Helper to get video info (Should be in API)
         # Using raw request for now to reuse legacy logic quickly, or strictly use API
         # Let's use the API if possible, but BilibiliPlatform.get_post_detail returns simplified dict.
@@ -374,147 +685,206 @@ async def analyze_track(request: Request, track: str = Form(...), platform_input
         # candidates are effectively 'raw_videos' for b_search
         pass
 
-    # --- NORMAL TRACK SEARCH ---
-    print("  > Detected Track Search")
+    return None
 
+async def _analyze_track_search(api, platform_input, track):
+    analyzed_creators = []
+    market_report = {}
+    async for event, payload in _track_search_events(api, platform_input, track):
+        if event == "report":
+            market_report, sorted_creators = payload
+            analyzed_creators.extend(sorted_creators)
+
+    return {
+        "track": track,
+        "results": analyzed_creators,
+        "market_report": market_report,
+        "platform": platform_input
+    }
+
+def _build_market_report(analyzed_creators):
+    try:
+        if analyzed_creators:
+            market_report = generate_market_report(analyzed_creators)
+            # Inject analysis into creators for easy access in template
+            if market_report and 'details' in market_report:
+                for c in analyzed_creators:
+                    c['market_analysis'] = market_report['details'].get(c['mid'], {})
+            return market_report
+    except Exception as e:
+        print(f"Market Report Error: {e}")
+    return {}
+
+async def _track_search_events(api, platform_input, track):
+    """Keyword track search as a stream of (event, payload):
+    ("candidates", n) once, ("card", item) as each pipeline finishes,
+    then ("report", (market_report, sorted_creators))."""
     # 1. Search Users/Creators (Generic)
     print(f"  > Searching {platform_input} for: {track}")
-    candidates = api.search_users(track) # Returns list of user dicts
+    with span("search", track=track) as search_span:
+        candidates = await api.search_users_async(track) # Returns list of user dicts
+        if search_span:
+            search_span.set(count=len(candidates))
     print(f"  > Found {len(candidates)} potential candidates.")
-    # DEBUG DIAGNOSTICS
-    print(f"DEBUG: API Instance: {api}")
-    if hasattr(api, 'sessdata'):
-        print(f"DEBUG: API Sessdata len: {len(api.sessdata)}")
-    else:
-        print("DEBUG: API has no sessdata attr")
-    
-    print(f"  > Processing {len(candidates)} raw results...")
 
+    # Phase 1: Collect Candidates & Basic filtering (dedup keeps search order)
+    unique_candidates = []
     seen_mids = set()
-    # Phase 1: Collect Candidates & Basic filtering
     for user in candidates:
         mid = str(user['mid'])
         if mid in seen_mids: continue
         seen_mids.add(mid)
-        
-        # For Douyin, we got decent info from search. For Bilibili search_raw_videos returned videos, not users.
-        # BilibiliPlatform.search_users returns video results. We need to adapt it?
-        # WAIT: BilibiliPlatform.search_users returns raw_videos list!
-        # This is an Interface mismatch. 'search_users' should return USERS.
-        # DouyinPlatform.search_users returns USERS.
-        # I need to fix BilibiliPlatform.search_users to return USERS or handle the difference here.
-        # To minimize disruption on this step, I will handle the difference:
-        
-        if platform_input == 'bilibili':
-            # 'user' is actually a video dict here
-            # We need to fetch the user card
-             real_mid = user['mid']
-             user_card = bili.get_user_info(real_mid)
-             if not user_card: continue
-        else:
-             # Douyin: 'user' is already a user dict
-             real_mid = mid
-             user_card = user # Already has name, avatar, etc.
+        unique_candidates.append((user, mid))
+    yield "candidates", len(unique_candidates)
 
-        # 2. Get Recent Posts
-        clean_name = user_card.get('name')
-        print(f"  > Analyzing Candidate: {clean_name} ({real_mid})")
+    # Phase 2: Run the per-candidate pipelines concurrently, emitting each card when it's ready
+    async def run(index, user, mid):
+        with span("candidate", mid=mid) as candidate_span:
+            item = await _analyze_candidate(api, platform_input, user, mid)
+            if candidate_span and item is None:
+                candidate_span.set(skipped=True)
+            return index, item
 
-        recent_posts = api.get_recent_posts(real_mid, limit=10)
-        
-        # Fallback Check
-        if not recent_posts:
-             print(f"    - Skipped: No recent posts found.")
-             continue
-             
-        # 3. Relevance/Stats/Filtering
-        # (Simplified filtering for now to ensure Douyin works)
-        
-        # Stats
-        if platform_input == 'bilibili':
-             user_stats = bili.calculate_stats(recent_posts)
-        else:
-             # Basic Douyin stats
-             plays = [p['play'] for p in recent_posts]
-             avg_play = int(sum(plays)/len(plays)) if plays else 0
-             user_stats = {"weekly_freq": 1, "avg_views_5": avg_play} # TODO: Real stats
-        
-        # Prepare Item
-        latest_post = recent_posts[0]
-        latest_date_str = "N/A"
-        if latest_post.get('created'):
-             # Handle TS vs ISO string if needed. Bili is TS. Douyin is TS.
-             try:
-                 dt = datetime.datetime.fromtimestamp(int(latest_post['created']))
-                 latest_date_str = dt.strftime("%Y-%m-%d")
-             except: pass
+    tasks = [asyncio.ensure_future(run(i, user, mid)) for i, (user, mid) in enumerate(unique_candidates)]
+    finished = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, item = await next_done
+            if item:
+                finished.append((index, item))
+                yield "card", item
+    finally:
+        # Client went away mid-stream: don't keep analyzing for nobody
+        for task in tasks:
+            task.cancel()
 
-        # Content/Comments
-        # Douyin details are hard to get without specific API, use defaults
-        detail = api.get_post_detail(latest_post['bvid']) # bvid is aweme_id
-        content_context = detail.get('subtitles', '') if detail else ""
-        comments_str = "\n".join(detail.get('comments', [])) if detail else ""
-        
-        analysis_prompt = f"【内容摘要】{content_context[:120]}...\n\n【观众热评】\n{comments_str}"
+    # Search order first, then a stable sort, so the final list matches the non-streaming one
+    analyzed_creators = [item for _, item in sorted(finished, key=lambda pair: pair[0])]
+    analyzed_creators.sort(key=lambda x: x['avg_views'], reverse=True)
 
-        # Fans formatting
-        raw_fans = user_card.get('fans', 0)
-        # Handle 'N/A' from Douyin Search
-        fans_display = format_fans(raw_fans) if raw_fans != "N/A" else "未知"
+    # --- STEP 4: GENERATE MARKET REPORT ---
+    with span("market_report", creators=len(analyzed_creators)):
+        market_report = _build_market_report(analyzed_creators)
+    yield "report", (market_report, analyzed_creators)
 
-        # Avatar Proxy
-        avatar_url = user_card.get('avatar', "")
-        if platform_input == 'bilibili':
-             # Ensure HTTPS if missing (though API usually provides it)
-             if avatar_url and avatar_url.startswith('//'):
-                  avatar_url = 'https:' + avatar_url
-        
-        cover_url = latest_post.get('pic', "")
-        if platform_input == 'bilibili' and cover_url and cover_url.startswith('//'):
-             cover_url = 'https:' + cover_url
+async def _run_analysis_job(platform_input, track):
+    """JobQueue runner: same routing as /analyze (Douyin links / keywords go through
+    _analyze_direct, the rest is the track search), as a JSON-able result."""
+    api = get_platform("douyin" if platform_input == "douyin" else "bilibili")
+    if api is None:
+        raise ValueError(f"Platform not enabled: {platform_input}")
+    with get_tracer().trace("job", track=track, platform=platform_input):
+        context = await _analyze_direct(api, platform_input, track)
+        if context is None:
+            context = await _analyze_track_search(api, platform_input, track)
+    result = {"results": context["results"], "market_report": context.get("market_report", {})}
+    if context.get("error"):
+        result["error"] = context["error"]
+    return result
 
-        item = {
-            "mid": real_mid,
-            "author": user_card['name'],
-            "avatar": avatar_url or PLACEHOLDER_IMG,
-            "fans": fans_display,
-            "intro": user_card.get('sign', ''),
-            "latest_date": latest_date_str,
-            "weekly_freq": user_stats.get('weekly_freq', 0),
-            "avg_views": user_stats.get('avg_views_5', 0),
-            "latest_video_title": latest_post.get('title', ''),
-            "latest_video_cover": cover_url or PLACEHOLDER_IMG,
-            "latest_video_url": f"https://www.douyin.com/video/{latest_post['bvid']}" if platform_input == 'douyin' else f"https://www.bilibili.com/video/{latest_post['bvid']}",
-            "analysis_prompt": analysis_prompt,
-            "subtitles_snippet": content_context[:200] + "...",
-            "comments_snippet": comments_str
-        }
-        analyzed_creators.append(item)
+@app.post("/jobs")
+async def submit_job(track: str = Form(...), platform_input: str = Form("bilibili")):
+    """Enqueue a keyword track analysis, returns the job id to poll."""
+    return JSONResponse(get_job_queue(_run_analysis_job).submit(platform_input, track.strip()), status_code=202)
 
-    # Sort
-    analyzed_creators.sort(key=lambda x: x['avg_views'], reverse=True)
-    
-    # --- STEP 4: GENERATE MARKET REPORT ---
-    try:
-        if analyzed_creators:
-            market_report = generate_market_report(analyzed_creators)
-            # Inject analysis into creators for easy access in template
-            if market_report and 'details' in market_report:
-                for c in analyzed_creators:
-                    c['market_analysis'] = market_report['details'].get(c['mid'], {})
-        else:
-             market_report = {}
-    except Exception as e:
-        print(f"Market Report Error: {e}")
-        market_report = {}
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = get_job_queue().get(job_id, with_result=True)
+    if job is None:
+        return JSONResponse({"error": "Unknown job"}, status_code=404)
+    return JSONResponse(job)
 
+@app.get("/jobs/{job_id}/results", response_class=HTMLResponse)
+async def job_results(request: Request, job_id: str):
+    """Finished job rendered like a normal /analyze page."""
+    job = get_job_queue().get(job_id, with_result=True)
+    if job is None:
+        return JSONResponse({"error": "Unknown job"}, status_code=404)
+    if job["status"] != "done":
+        return JSONResponse(job, status_code=202)
     return templates.TemplateResponse("results.html", {
-        "request": request, 
-        "track": track, 
-        "results": analyzed_creators,
-        "market_report": market_report,
-        "platform": platform_input
+        "request": request,
+        "track": job["track"],
+        "results": job["result"]["results"],
+        "market_report": job["result"]["market_report"],
+        "error": job["result"].get("error"),
+        "platform": job["platform"]
     })
 
+# --- JSON API (same data as the HTML pages, no template rendering) ---
+def _project(rows, fields: Optional[str]):
+    """fields=mid,author,avg_views -> keep only those keys of each row (unknown names are skipped)."""
+    if not fields:
+        return rows
+    keys = [f.strip() for f in fields.split(",") if f.strip()]
+    return [{k: row[k] for k in keys if k in row} for row in rows]
+
+@app.get("/api/analyze")
+async def api_analyze(track: str, platform_input: str = "bilibili", fields: Optional[str] = None):
+    """/analyze as JSON: {"track", "platform", "results": [...], "market_report": {...}}.
+    `fields` projects the rows in "results"."""
+    track = track.strip()
+    api, error = _platform_or_404(platform_input)
+    if error:
+        return error
+    with get_tracer().trace("GET /api/analyze", track=track, platform=platform_input) as root:
+        context = await _analyze_direct(api, platform_input, track)
+        if context is None:
+            context = await _analyze_track_search(api, platform_input, track)
+    context.setdefault("market_report", {})
+    context["results"] = _project(context["results"], fields)
+    response = FastJSONResponse(context)
+    if root is not None:
+        response.headers["X-Trace-Id"] = root.trace.id
+    return response
+
+@app.get("/api/creator/{mid}")
+async def api_creator(mid: str, platform: str = "bilibili", name: Optional[str] = None,
+                      avatar: Optional[str] = None, fields: Optional[str] = None):
+    """/creator/{mid} as JSON: {"user", "videos": [...], "avg_views", ...}. `fields` projects the rows in "videos"."""
+    api, error = _platform_or_404(platform)
+    if error:
+        return error
+    context = await _creator_context(api, mid, name, avatar, platform)
+    context["videos"] = _project(context["videos"], fields)
+    return FastJSONResponse(context)
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.get("/analyze/stream")
+async def analyze_stream(track: str, platform_input: str = "bilibili"):
+    """Server-Sent Events version of the keyword track search (used by results.html)."""
+    track = track.strip()
+    api, error = _platform_or_404(platform_input)
+    if error:
+        return error
+    card_template = templates.get_template("_creator_card.html")
+    report_template = templates.get_template("_market_report.html")
+
+    async def events():
+        with get_tracer().trace("GET /analyze/stream", track=track, platform=platform_input):
+            try:
+                async for event, payload in _track_search_events(api, platform_input, track):
+                    if event == "candidates":
+                        yield _sse("candidates", {"count": payload})
+                    elif event == "card":
+                        yield _sse("card", {"html": card_template.render(item=payload, platform=platform_input)})
+                    elif event == "report":
+                        market_report, creators = payload
+                        yield _sse("report", {
+                            "count": len(creators),
+                            "report_html": report_template.render(market_report=market_report),
+                            "cards_html": "".join(card_template.render(item=c, platform=platform_input) for c in creators),
+                        })
+            except Exception as e:
+                print(f"Stream Analysis Error: {e}")
+                yield _sse("error", {"message": str(e)})
+        yield _sse("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("web_app:app", host="127.0.0.1", port=8000, reload=True)